@@ -0,0 +1,89 @@
+// Sends files dropped on or selected in a '.chunked-upload' area to the /upload route as raw
+// binary chunks, then hands the returned upload handles to Dash through the 'upload-handles' store.
+(function () {
+    var CHUNK_SIZE = 4 * 1024 * 1024;
+
+    function uploadFile(platform, file) {
+        var uploadId = '';
+        var offset = 0;
+
+        function sendChunk() {
+            var chunk = file.slice(offset, offset + CHUNK_SIZE);
+            return fetch('/upload/' + platform, {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: {
+                    'Content-Type': 'application/octet-stream',
+                    'X-Upload-Id': uploadId,
+                    'X-Upload-Offset': String(offset),
+                    'X-Upload-Length': String(file.size),
+                    'X-File-Name': encodeURIComponent(file.name)
+                },
+                body: chunk
+            }).then(function (response) {
+                return response.json().then(function (result) {
+                    if (!response.ok) {
+                        throw new Error(result.error || response.statusText);
+                    }
+                    uploadId = result.handle;
+                    offset = result.size;
+                    if (result.complete) {
+                        return {handle: result.handle, filename: file.name};
+                    }
+                    return sendChunk();
+                });
+            });
+        }
+
+        return sendChunk();
+    }
+
+    function uploadFiles(zone, files) {
+        var platform = zone.getAttribute('data-platform');
+        var uploads = [];
+        var chain = Promise.resolve();
+        Array.prototype.forEach.call(files, function (file) {
+            chain = chain.then(function () {
+                return uploadFile(platform, file).then(function (upload) {
+                    uploads.push(upload);
+                });
+            });
+        });
+        chain.then(function () {
+            window.dash_clientside.set_props('upload-handles', {
+                data: {platform: platform, uploads: uploads}
+            });
+        }).catch(function (error) {
+            window.alert('Upload failed: ' + error.message);
+        });
+    }
+
+    document.addEventListener('click', function (event) {
+        var zone = event.target.closest('.chunked-upload');
+        if (!zone) {
+            return;
+        }
+        event.preventDefault();
+        var input = document.createElement('input');
+        input.type = 'file';
+        input.multiple = zone.getAttribute('data-multiple') === 'true';
+        input.addEventListener('change', function () {
+            uploadFiles(zone, input.files);
+        });
+        input.click();
+    });
+
+    document.addEventListener('dragover', function (event) {
+        if (event.target.closest('.chunked-upload')) {
+            event.preventDefault();
+        }
+    });
+
+    document.addEventListener('drop', function (event) {
+        var zone = event.target.closest('.chunked-upload');
+        if (zone) {
+            event.preventDefault();
+            uploadFiles(zone, event.dataTransfer.files);
+        }
+    });
+})();
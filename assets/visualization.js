@@ -0,0 +1,117 @@
+// Clientside callbacks of the visualization: draw the figure from the pre-aggregated counts in
+// the 'visualization-aggregate' store (see client_aggregate in src/components/data/rollups.py)
+// when the period range, the shown sources or the number of top entries change, the same way
+// the server draws it, without a round trip.
+(function () {
+    function sum(values) {
+        return values.reduce(function (total, value) { return total + value; }, 0);
+    }
+
+    function maxStackHeight(traces) {
+        var heights = {};
+        traces.forEach(function (trace) {
+            trace.x.forEach(function (x, i) {
+                heights[x] = (heights[x] || 0) + trace.y[i];
+            });
+        });
+        return Math.max.apply(null, [0].concat(Object.values(heights)));
+    }
+
+    // As stacked_bar_traces: one trace per source, the least counted ones added up as 'Other'
+    // when there are more than maxTraces
+    function stackedTraces(aggregate, first, last, sources) {
+        var x = aggregate.x.slice(first, last + 1);
+        var shown = [];
+        aggregate.labels.forEach(function (label, i) {
+            var y = aggregate.counts[i].slice(first, last + 1);
+            if ((!sources || sources.indexOf(label) !== -1) && sum(y) > 0) {
+                shown.push({type: 'bar', x: x, y: y, name: label});
+            }
+        });
+        if (shown.length <= aggregate.maxTraces) {
+            return shown;
+        }
+        var kept = shown.slice().sort(function (a, b) { return sum(b.y) - sum(a.y); })
+            .slice(0, aggregate.maxTraces - 1);
+        var traces = shown.filter(function (trace) { return kept.indexOf(trace) !== -1; });
+        var other = x.map(function (_, i) {
+            return sum(shown.map(function (trace) { return kept.indexOf(trace) === -1 ? trace.y[i] : 0; }));
+        });
+        traces.push({type: 'bar', x: x, y: other, name: 'Other'});
+        return traces;
+    }
+
+    // As top_bar_traces: one trace per entry that is among the top n of a period, or one trace
+    // per rank plus 'Other' (packed_top_bar_traces) when that would be more than maxTraces
+    function topTraces(aggregate, first, last, n) {
+        var rows = [];
+        for (var row = first; row <= last; row++) {
+            rows.push({x: aggregate.x[row], top: aggregate.top[row].slice(0, n), total: aggregate.totals[row]});
+        }
+        var bars = new Map();
+        rows.forEach(function (row) {
+            row.top.forEach(function (entry) {
+                if (!bars.has(entry[0])) {
+                    bars.set(entry[0], {type: 'bar', x: [], y: [], name: aggregate.labels[entry[0]]});
+                }
+                bars.get(entry[0]).x.push(row.x);
+                bars.get(entry[0]).y.push(entry[1]);
+            });
+        });
+        if (bars.size <= aggregate.maxTraces) {
+            return Array.from(bars.values());
+        }
+
+        var x = rows.map(function (row) { return row.x; });
+        var traces = [];
+        for (var rank = 0; rank < n; rank++) {
+            var y = rows.map(function (row) { return row.top[rank] ? row.top[rank][1] : 0; });
+            if (sum(y) > 0) {
+                traces.push({
+                    type: 'bar', x: x, y: y, name: 'Top ' + (rank + 1),
+                    customdata: rows.map(function (row) { return row.top[rank] ? aggregate.labels[row.top[rank][0]] : ''; }),
+                    hovertemplate: '%{customdata}<br>%{x}: %{y}<extra></extra>'
+                });
+            }
+        }
+        var other = rows.map(function (row) {
+            return row.total - sum(row.top.map(function (entry) { return entry[1]; }));
+        });
+        if (sum(other) > 0) {
+            traces.push({type: 'bar', x: x, y: other, name: 'Other', marker: {color: 'lightgray'},
+                         hovertemplate: 'Other<br>%{x}: %{y}<extra></extra>'});
+        }
+        return traces;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        dataMirroring: {
+            renderFigure: function (aggregate, periodRange, sources, topN, figure) {
+                if (!aggregate) {
+                    return window.dash_clientside.no_update;
+                }
+                var first = periodRange ? periodRange[0] : 0;
+                var last = periodRange ? Math.min(periodRange[1], aggregate.x.length - 1) : aggregate.x.length - 1;
+                var traces = aggregate.kind === 'stacked'
+                    ? stackedTraces(aggregate, first, last, sources)
+                    : topTraces(aggregate, first, last, topN || 10);
+
+                var layout = JSON.parse(JSON.stringify(aggregate.layout));
+                if (figure && figure.layout && figure.layout.template) {
+                    layout.template = figure.layout.template;
+                }
+                if (aggregate.kind === 'top' && layout.title && layout.title.text) {
+                    layout.title.text = layout.title.text.replace(/Top \d+/, 'Top ' + topN);
+                }
+                if (layout.xaxis && layout.xaxis.categoryarray) {
+                    // Only the periods in range, in time order
+                    layout.xaxis.categoryarray = aggregate.x.slice(first, last + 1);
+                }
+                if (layout.yaxis && layout.yaxis.range) {
+                    layout.yaxis.range = [0, 1.2 * maxStackHeight(traces)];
+                }
+                return {data: traces, layout: layout};
+            }
+        }
+    });
+})();
@@ -0,0 +1,84 @@
+import importlib.util
+import os
+import resource
+from functools import lru_cache
+import pytest
+from benchmarks.generators import GENERATORS, to_data_uri
+from src.components import security_utils
+
+if importlib.util.find_spec('pytest_benchmark') is None:
+    # The suite needs the pytest-benchmark plugin, plain test runs leave this directory alone
+    collect_ignore_glob = ['test_*.py']
+
+# Record counts to benchmark, e.g. BENCHMARK_RECORDS=1000,100000,2000000
+BENCHMARK_RECORDS = [int(n) for n in os.getenv('BENCHMARK_RECORDS', '1000,100000').split(',')]
+
+# Timed rounds per benchmark; large record counts take seconds per round
+BENCHMARK_ROUNDS = int(os.getenv('BENCHMARK_ROUNDS', 3))
+
+# File names the uploads get, as in the real exports
+UPLOAD_FILENAMES = {'tiktok': ['user_data.json'], 'youtube': ['watch-history.json']}
+
+def pytest_generate_tests(metafunc):
+    if 'records' in metafunc.fixturenames:
+        metafunc.parametrize('records', BENCHMARK_RECORDS, ids=[f'{n}_records' for n in BENCHMARK_RECORDS])
+    # Tests run for every platform unless they parametrize 'platform' themselves
+    if 'platform' in metafunc.fixturenames and not any(
+            'platform' in marker.args[0] for marker in metafunc.definition.iter_markers('parametrize')):
+        metafunc.parametrize('platform', list(GENERATORS))
+
+@pytest.fixture(autouse=True)
+def unlimited_upload_size(monkeypatch):
+    # Synthetic exports of millions of records are far above the default MAX_FILE_SIZE; parse
+    # pool processes read it from the environment
+    monkeypatch.setattr(security_utils, 'MAX_FILE_SIZE', float('inf'))
+    monkeypatch.setenv('MAX_FILE_SIZE', str(2 ** 40))
+
+@lru_cache(maxsize=None)
+def make_uploads(platform, records):
+    """
+    Return (data URIs, file names) of a synthetic export, generated once per session.
+    """
+    document = GENERATORS[platform](records)
+    if platform == 'instagram':
+        return [to_data_uri(section) for section in document.values()], list(document)
+    return [to_data_uri(document)], UPLOAD_FILENAMES[platform]
+
+def _read_status(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+
+def measure_peak_rss(fn):
+    """
+    Run fn once and return (result, peak resident set size in MiB while it ran, RSS before it in MiB).
+
+    On Linux the kernel's high-water mark is reset before the call, so the peak belongs to fn;
+    elsewhere the peak of the whole process so far is reported. Memory of worker processes
+    (parallel Instagram parsing) is not included.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        result = fn()
+        return result, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, None
+    before = _read_status('VmRSS')
+    result = fn()
+    return result, _read_status('VmHWM'), before
+
+@pytest.fixture
+def run_benchmark(benchmark, platform, records):
+    """
+    Time fn over BENCHMARK_ROUNDS rounds, grouped by platform and size, and record its peak RSS.
+    """
+    def run(fn):
+        benchmark.group = f'{platform}-{records}'
+        _, peak, before = measure_peak_rss(fn)
+        benchmark.extra_info['records'] = records
+        benchmark.extra_info['peak_rss_mib'] = round(peak, 1)
+        if before is not None:
+            benchmark.extra_info['peak_rss_increase_mib'] = round(peak - before, 1)
+        return benchmark.pedantic(fn, rounds=BENCHMARK_ROUNDS, iterations=1)
+    return run
@@ -0,0 +1,144 @@
+"""
+Synthetic Data Download Packages shaped like the real exports, for benchmarks and sizing.
+
+Every generator is deterministic for a given seed and takes the number of records to create,
+from a thousand to several million. Timestamps are spread over the years before 2024 and
+channel/account names repeat, so rollups and categorical dtypes behave as on real data.
+
+Write a file for manual testing from the repository root:
+    python -m benchmarks.generators tiktok 1000000 user_data.json
+    python -m benchmarks.generators instagram 100000 instagram_export/
+"""
+import base64
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Seconds since the epoch of the first and last generated timestamp
+START = int(pd.Timestamp('2016-01-01').timestamp())
+END = int(pd.Timestamp('2024-01-01').timestamp())
+
+# Distinct channels/accounts that the generated records are spread over
+ACCOUNTS = 2000
+
+def _timestamps(n, rng):
+    return np.sort(rng.integers(START, END, n))[::-1]  # exports list the newest records first
+
+def _iso_times(timestamps):
+    # 'YYYY-MM-DDTHH:MM:SS' strings, much faster than strftime for millions of records
+    return np.datetime_as_string(timestamps.astype('datetime64[s]')).tolist()
+
+def _split(n, shares):
+    # Split n records over sections in the given proportions
+    counts = [int(n * share) for share in shares]
+    counts[0] += n - sum(counts)
+    return counts
+
+def make_tiktok_user_data(n, seed=0):
+    """
+    Return a TikTok user_data.json document with n records over browsing history, favorites
+    and likes, plus the unrelated sections the streaming parser has to skip.
+    """
+    rng = np.random.default_rng(seed)
+    browsing, favorite, liked = _split(n, [0.8, 0.05, 0.15])
+
+    def videos(count, date_key='Date', link_key='Link'):
+        dates = [time.replace('T', ' ') for time in _iso_times(_timestamps(count, rng))]
+        ids = rng.integers(6_800_000_000_000_000_000, 7_400_000_000_000_000_000, count, dtype=np.int64)
+        return [{date_key: date, link_key: f'https://www.tiktokv.com/share/video/{video_id}/'}
+                for date, video_id in zip(dates, ids)]
+
+    return {
+        'Activity': {
+            'Video Browsing History': {'VideoList': videos(browsing)},
+            'Favorite Videos': {'FavoriteVideoList': videos(favorite)},
+            'Like List': {'ItemFavoriteList': videos(liked)},
+            'Search History': {'SearchList': [{'Date': '2023-01-01 00:00:00', 'SearchTerm': f'term {i}'}
+                                              for i in range(min(n, 1000))]}
+        },
+        'Profile': {'Profile Information': {'ProfileMap': {'userName': 'donor'}}},
+        'Direct Messages': {'Chat History': {'ChatHistory': {}}}
+    }
+
+def make_instagram_sections(n, seed=0):
+    """
+    Return the five Instagram JSON files the app reads, keyed by file name, with n records
+    spread over them.
+    """
+    rng = np.random.default_rng(seed)
+    saved, liked, posts_seen, chaining_seen, videos_watched = _split(n, [0.1, 0.3, 0.35, 0.05, 0.2])
+
+    def items(count):
+        return zip(_timestamps(count, rng).tolist(), rng.integers(0, ACCOUNTS, count).tolist())
+
+    def seen(count):
+        return [{'string_map_data': {'Author': {'value': f'account_{account}'}, 'Time': {'timestamp': timestamp}}}
+                for timestamp, account in items(count)]
+
+    return {
+        'saved_posts.json': {'saved_saved_media': [
+            {'title': f'account_{account}',
+             'string_map_data': {'Saved on': {'href': f'https://www.instagram.com/p/{i}/', 'timestamp': timestamp}}}
+            for i, (timestamp, account) in enumerate(items(saved))]},
+        'liked_posts.json': {'likes_media_likes': [
+            {'title': f'account_{account}',
+             'string_list_data': [{'href': f'https://www.instagram.com/p/{i}/', 'value': '\U0001f44d', 'timestamp': timestamp}]}
+            for i, (timestamp, account) in enumerate(items(liked))]},
+        'posts_viewed.json': {'impressions_history_posts_seen': seen(posts_seen)},
+        'suggested_accounts_viewed.json': {'impressions_history_chaining_seen': [
+            {'string_map_data': {'Username': {'value': f'account_{account}'}, 'Time': {'timestamp': timestamp}}}
+            for timestamp, account in items(chaining_seen)]},
+        'videos_watched.json': {'impressions_history_videos_watched': seen(videos_watched)}
+    }
+
+def make_youtube_watch_history(n, seed=0):
+    """
+    Return a YouTube watch-history.json document with n watched videos. A few videos have no
+    channel any more, as in real exports of removed videos.
+    """
+    rng = np.random.default_rng(seed)
+    times = _iso_times(_timestamps(n, rng))
+    channels = rng.integers(0, ACCOUNTS, n).tolist()
+    history = []
+    for i, (time, channel) in enumerate(zip(times, channels)):
+        video = {
+            'header': 'YouTube',
+            'title': f'Watched video {i}',
+            'titleUrl': f'https://www.youtube.com/watch?v={i:011d}',
+            'time': time + '.000Z',
+            'products': ['YouTube']
+        }
+        if i % 50:
+            video['subtitles'] = [{'name': f'Channel {channel}', 'url': f'https://www.youtube.com/channel/UC{channel:022d}'}]
+        history.append(video)
+    return history
+
+def to_json_bytes(document):
+    return json.dumps(document).encode('utf-8')
+
+def to_data_uri(document):
+    """
+    Encode a document the way dcc.Upload hands it to the callbacks.
+    """
+    return 'data:application/json;base64,' + base64.b64encode(to_json_bytes(document)).decode('ascii')
+
+GENERATORS = {
+    'tiktok': make_tiktok_user_data,
+    'instagram': make_instagram_sections,
+    'youtube': make_youtube_watch_history
+}
+
+if __name__ == '__main__':
+    platform, records, path = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+    document = GENERATORS[platform](records)
+    if platform == 'instagram':
+        # The path is a directory that receives one file per section
+        os.makedirs(path, exist_ok=True)
+        for filename, section in document.items():
+            with open(os.path.join(path, filename), 'wb') as f:
+                f.write(to_json_bytes(section))
+    else:
+        with open(path, 'wb') as f:
+            f.write(to_json_bytes(document))
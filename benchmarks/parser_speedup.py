@@ -0,0 +1,56 @@
+"""
+Compare the columnar YouTube/Instagram extraction with the previous per-row approach,
+which called pd.to_datetime once per record while building a list of dicts.
+
+Run from the repository root:
+    python -m benchmarks.parser_speedup [number_of_records]
+"""
+import io
+import json
+import sys
+import time
+import pandas as pd
+from src.components.data.youtube_processing import parse_youtube_contents
+from src.components.data.insta_processing import flatten_instagram_data
+from benchmarks.generators import make_youtube_watch_history, make_instagram_sections
+
+def per_row_youtube(watch_history):
+    return pd.DataFrame([{
+        'Title': video.get('title', 'No Title'),
+        'Link': video.get('titleUrl', 'No URL'),
+        'Date': pd.to_datetime(video.get('time', 'No Date')),
+        'Channel Name': video.get('subtitles', [{}])[0].get('name', 'No Channel Name'),
+        'Channel URL': video.get('subtitles', [{}])[0].get('url', 'No Channel URL')
+    } for video in watch_history])
+
+def per_row_instagram(data):
+    return pd.DataFrame([{
+        'title': item.get('title', 'No Title'),
+        'href': like_data.get('href', ''),
+        'timestamp': pd.to_datetime(like_data.get('timestamp', 0), unit='s'),
+        'category': 'likes_media_likes',
+        'file_name': 'liked_posts.json'
+    } for item in data['likes_media_likes'] for like_data in item.get('string_list_data', [])])
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def main(n):
+    watch_history = make_youtube_watch_history(n)
+    youtube_bytes = json.dumps(watch_history).encode()
+    instagram = make_instagram_sections(n)['liked_posts.json']
+
+    # Both YouTube variants include the JSON parse so the comparison is end to end
+    youtube_before = timed(lambda: per_row_youtube(json.loads(youtube_bytes)))
+    youtube_after = timed(lambda: parse_youtube_contents(io.BytesIO(youtube_bytes)))
+    instagram_before = timed(per_row_instagram, instagram)
+    instagram_after = timed(flatten_instagram_data, instagram)
+
+    print(f"{n} records")
+    print(f"YouTube   per-row: {youtube_before:8.3f}s  columnar: {youtube_after:8.3f}s  speedup: {youtube_before / youtube_after:5.1f}x")
+    print(f"Instagram per-row: {instagram_before:8.3f}s  columnar: {instagram_after:8.3f}s  speedup: {instagram_before / instagram_after:5.1f}x")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,81 @@
+"""
+Time every stage an upload goes through, per platform and number of records, and record the
+peak RSS of each stage to size worker memory.
+
+Run from the repository root (needs pytest-benchmark):
+    python -m pytest benchmarks
+    BENCHMARK_RECORDS=1000,1000000 BENCHMARK_ROUNDS=1 python -m pytest benchmarks --benchmark-json=bench.json
+"""
+from functools import lru_cache
+import pytest
+from benchmarks.conftest import make_uploads
+from src.components import jobs
+from src.components.callbacks import parse_contents, parse_uploads, create_figure, create_cube, GRANULARITY_OPTIONS
+from src.components.data.general_utils import open_upload_source, create_data_table, optimize_dtypes, iter_urls_for_4cat
+from src.components.exports import iter_csv_chunks, iter_encoded
+
+@lru_cache(maxsize=None)
+def parsed_frame(platform, records):
+    uploads, filenames = make_uploads(platform, records)
+    return optimize_dtypes(parse_contents(platform, uploads, filenames=filenames))
+
+def test_decode(run_benchmark, platform, records):
+    uploads, _ = make_uploads(platform, records)
+
+    def decode():
+        for upload in uploads:
+            with open_upload_source(upload) as f:
+                while f.read(1024 * 1024):
+                    pass
+
+    run_benchmark(decode)
+
+def test_parse(run_benchmark, platform, records):
+    uploads, filenames = make_uploads(platform, records)
+
+    df = run_benchmark(lambda: optimize_dtypes(parse_contents(platform, uploads, filenames=filenames)))
+    assert len(df) == records
+
+@pytest.mark.parametrize('platform', ['instagram'])
+@pytest.mark.parametrize('parse_pool', [False, True], ids=['serial', 'parse_pool'])
+def test_parse_multi_file_upload(run_benchmark, monkeypatch, platform, records, parse_pool):
+    # The sections of an upload one after another, as in a background job, or as one task each
+    # in a parse pool with a worker per file; the first, untimed run starts the pool
+    uploads, filenames = make_uploads(platform, records)
+    monkeypatch.setattr(jobs, 'BACKGROUND_CALLBACKS', not parse_pool)
+    monkeypatch.setattr(jobs, 'PARSE_EXECUTOR_WORKERS', len(uploads))
+    monkeypatch.setattr(jobs, '_parse_executor', None)
+    try:
+        df = run_benchmark(lambda: parse_uploads(platform, uploads, filenames))
+    finally:
+        if jobs._parse_executor is not None:
+            jobs._parse_executor.shutdown()
+    assert len(df) == records
+
+def test_figure(run_benchmark, benchmark, platform, records):
+    df = parsed_frame(platform, records)
+
+    fig = run_benchmark(lambda: create_figure(platform, df))
+    benchmark.extra_info['figure_bytes'] = len(fig.to_json())
+
+def test_figure_from_cube(run_benchmark, platform, records):
+    # What the granularity selector does: re-render from the rollup cube at every granularity
+    cube = create_cube(platform, parsed_frame(platform, records))
+
+    run_benchmark(lambda: [create_figure(platform, None, cube, freq) for freq in GRANULARITY_OPTIONS[platform]])
+
+def test_table(run_benchmark, platform, records):
+    df = parsed_frame(platform, records)
+
+    run_benchmark(lambda: create_data_table(df))
+
+def test_csv_export(run_benchmark, platform, records):
+    df = parsed_frame(platform, records)
+
+    run_benchmark(lambda: sum(len(chunk) for chunk in iter_encoded(iter_csv_chunks(df))))
+
+@pytest.mark.parametrize('platform', ['tiktok', 'youtube'])
+def test_url_export(run_benchmark, platform, records):
+    df = parsed_frame(platform, records)
+
+    run_benchmark(lambda: sum(len(chunk) for chunk in iter_urls_for_4cat(df)))
@@ -0,0 +1,44 @@
+"""
+Time how long a gunicorn worker takes from boot to its first answered request: a worker that
+imports the app itself, and one forked from a master that preloaded it (see gunicorn.conf.py).
+
+Run from the repository root (needs pytest-benchmark):
+    python -m pytest benchmarks/test_startup.py
+"""
+import gc
+import os
+import subprocess
+import sys
+import pytest
+from benchmarks.conftest import BENCHMARK_ROUNDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST = "main.server.test_client().get('/', base_url='https://localhost')"
+
+def test_worker_boot(benchmark):
+    benchmark.group = 'startup'
+    command = [sys.executable, '-c', f"import main; {FIRST_REQUEST}"]
+
+    benchmark.pedantic(subprocess.run, args=(command,), kwargs={'cwd': ROOT, 'check': True, 'capture_output': True},
+                       rounds=BENCHMARK_ROUNDS, iterations=1)
+
+@pytest.fixture
+def preloaded_main():
+    import main
+    main.preload()
+    yield main
+    gc.unfreeze()
+
+def test_preloaded_worker_boot(benchmark, preloaded_main):
+    benchmark.group = 'startup'
+
+    def fork_worker():
+        pid = os.fork()
+        if pid == 0:
+            response = preloaded_main.server.test_client().get('/', base_url='https://localhost')
+            os._exit(0 if response.status_code == 200 else 1)
+        _, status = os.waitpid(pid, 0)
+        return os.waitstatus_to_exitcode(status)
+
+    assert benchmark.pedantic(fork_worker, rounds=BENCHMARK_ROUNDS, iterations=1) == 0
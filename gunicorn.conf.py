@@ -0,0 +1,17 @@
+# gunicorn.conf.py, read by gunicorn from the working directory
+
+import os
+
+# Import the app once in the master and fork the workers from it, so workers boot (and restart)
+# without importing anything and share the imported modules copy-on-write
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() in ['true', '1', 't']
+
+# Request threads per worker (see WORKER_THREADS in main.py); more than one runs the gthread
+# worker, so downloads and progress polling keep flowing while another request is busy
+threads = int(os.getenv('WORKER_THREADS', 4))
+
+def when_ready(server):
+    # Runs in the master after the app was preloaded and before the first worker is forked
+    if server.cfg.preload_app:
+        import main
+        main.preload()
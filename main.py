@@ -1,20 +1,33 @@
+import gc
+import importlib
 import os
 import logging
+import time
 from dotenv import load_dotenv
-from flask import Flask, request, redirect, url_for, session, render_template_string
+from flask import Flask, request, redirect, url_for, session, render_template_string, jsonify, Response, g
 from dash import Dash
 from flask_talisman import Talisman
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from datetime import timedelta
+from urllib.parse import unquote
 from src.components.layout import create_layout
 from src.components.callbacks import register_callbacks
+from src.components.security_utils import get_session_key
+from src.components.uploads import create_upload, append_upload_chunk, save_upload
+from src.components.dataset_store import configure_dataset_store, load_session_dataset, DATASET_STORE_BACKEND
+from src.components.exports import iter_csv_chunks, iter_encoded, iter_binary_chunks, BINARY_EXPORTS
+from src.components.jobs import create_background_callback_manager, BACKGROUND_CALLBACKS
+from src.components.metrics import observe, count_bytes, render_metrics, METRICS_TOKEN
 
 # Load environment variables from .env file
 load_dotenv()
 
 DEBUG = os.getenv('DEBUG', 'False').lower() in ['true', '1', 't']
 PORT = int(os.getenv('PORT', 8051))
+
+# Threads serving requests in each worker process (gunicorn.conf.py); 1 runs one request at a time
+WORKER_THREADS = int(os.getenv('WORKER_THREADS', 4))
 ACCESS_CODE = os.getenv('ACCESS_CODE')
 
 logging.basicConfig(level=logging.WARNING, 
@@ -40,6 +53,13 @@ server.config.update(
     PERMANENT_SESSION_LIFETIME=timedelta(minutes=30)  # Session timeout for security
 )
 
+# Parsed datasets are kept per session for as long as the session itself lives
+if BACKGROUND_CALLBACKS and DATASET_STORE_BACKEND == 'memory':
+    logging.info("Background callbacks parse in separate processes, using the disk dataset store")
+    configure_dataset_store(backend='disk', ttl=int(server.config['PERMANENT_SESSION_LIFETIME'].total_seconds()))
+else:
+    configure_dataset_store(ttl=int(server.config['PERMANENT_SESSION_LIFETIME'].total_seconds()))
+
 # Set up rate limiting to prevent brute force attacks
 limiter = Limiter(
     get_remote_address,
@@ -47,10 +67,51 @@ limiter = Limiter(
     default_limits=["5 per minute"]  # Limit login attempts
 )
 
-app = Dash(__name__, server=server, url_base_pathname='/app/')
+app = Dash(__name__, server=server, url_base_pathname='/app/',
+           background_callback_manager=create_background_callback_manager())
+
+@limiter.request_filter
+def is_dash_request():
+    # Dash loads its bundles and polls background callbacks through these routes
+    prefix = app.config.requests_pathname_prefix
+    return request.path.startswith((prefix + '_dash-', prefix + 'assets/'))
 app.config.suppress_callback_exceptions = True
 
+@server.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@server.after_request
+def record_response_metrics(response):
+    # Dash callback requests are timed as a whole, which includes serializing the response
+    if request.path == app.config.requests_pathname_prefix + '_dash-update-component' and 'request_start' in g:
+        observe('data_mirroring_stage_duration_seconds', time.perf_counter() - g.request_start, stage='response')
+        if response.content_length is not None:
+            observe('data_mirroring_response_bytes', response.content_length, route='dash')
+    return response
+
+# Modules main.preload imports before gunicorn forks the workers; the app itself only imports
+# them on the first upload or download
+PRELOAD_MODULES = [
+    'src.components.data.general_utils',
+    'src.components.data.table_pages',
+    'src.components.data.tiktok_processing',
+    'src.components.data.insta_processing',
+    'src.components.data.youtube_processing',
+    'src.components.exports',
+]
+
+_app_ready = False
+
 def setup_app():
+    """
+    Build the layout and register the callbacks. Only the first call does anything, so
+    importing main more than once (or running it as a script) keeps a single set of callbacks.
+    """
+    global _app_ready
+    if _app_ready:
+        return
+    _app_ready = True
     logging.info("Setting up app layout")
     try:
         app.layout = create_layout()
@@ -65,6 +126,21 @@ def setup_app():
     except Exception as e:
         logging.error("Error registering callbacks: %s", e)
 
+def preload():
+    """
+    Prepare the app in the gunicorn master before it forks the workers (gunicorn --preload, see
+    gunicorn.conf.py): the parsing stack is imported once and shared copy-on-write by every
+    worker, so a new or restarted worker serves requests as soon as it is forked.
+    """
+    setup_app()
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+    # Workers must not inherit the master's SQLite connection; diskcache reconnects on first use
+    if app._background_manager is not None:
+        app._background_manager.handle.close()
+    # Keep the garbage collector of each worker from writing to, and so copying, the shared objects
+    gc.freeze()
+
 @server.route('/', methods=['GET', 'POST'])
 @limiter.limit("5 per minute")  # Apply rate limit to login route
 def login():
@@ -73,6 +149,7 @@ def login():
         if code == ACCESS_CODE:
             session['authenticated'] = True
             session.permanent = True  # Make the session permanent to apply timeout
+            get_session_key()  # Background callbacks can only read, not create, the session key
             return redirect('/app')
         else:
             return "Invalid Code", 403
@@ -98,18 +175,127 @@ def render_app():
         return redirect('/')
     return app.index()
 
+@server.route('/upload/<platform>', methods=['POST'])
+@limiter.limit("600 per minute")  # One request per chunk
+def upload(platform):
+    """
+    Receive an upload as raw binary chunks (or as multipart form data) and return a handle
+    that the Dash callbacks use to read the file from the upload directory.
+    """
+    if not session.get('authenticated'):
+        return jsonify(error="Not authenticated"), 403
+    owner = get_session_key()
+    try:
+        if request.mimetype == 'multipart/form-data':
+            uploads = [{'handle': save_upload(platform, f.filename, f.stream, owner), 'filename': f.filename}
+                       for f in request.files.getlist('file')]
+            return jsonify(platform=platform, uploads=uploads)
+
+        offset = int(request.headers.get('X-Upload-Offset', 0))
+        handle = request.headers.get('X-Upload-Id')
+        if not handle:
+            filename = unquote(request.headers.get('X-File-Name', ''))
+            handle = create_upload(platform, filename, int(request.headers['X-Upload-Length']), owner)
+        size, complete = append_upload_chunk(handle, owner, request.stream, offset)
+        if complete:
+            observe('data_mirroring_upload_bytes', size, platform=platform)
+        return jsonify(handle=handle, size=size, complete=complete)
+    except (KeyError, ValueError) as e:
+        logging.warning("Rejected upload chunk: %s", e)
+        return jsonify(error=str(e)), 400
+
+@server.route('/download/csv')
+@limiter.limit("30 per minute")
+def download_csv():
+    """
+    Stream the session dataset as CSV in row chunks (?compression=gzip for a gzip file).
+    """
+    if not session.get('authenticated'):
+        return "Not authenticated", 403
+    compression = request.args.get('compression')
+    if compression not in (None, 'gzip'):
+        return "Unsupported compression", 400
+    df = load_session_dataset()
+    if df is None:
+        return "No data to download, please upload your files again.", 404
+
+    filename = 'data.csv.gz' if compression else 'data.csv'
+    return Response(count_bytes(iter_encoded(iter_csv_chunks(df), compression), 'download_csv'),
+                    mimetype='application/gzip' if compression else 'text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@server.route('/download/<any(parquet, feather):file_format>')
+@limiter.limit("30 per minute")
+def download_binary(file_format):
+    """
+    Stream the session dataset as a Parquet or Feather file with its dtypes intact
+    (?compression= one of the format's compressions in BINARY_EXPORTS, zstd by default).
+    """
+    if not session.get('authenticated'):
+        return "Not authenticated", 403
+    filename, mimetype, compressions = BINARY_EXPORTS[file_format]
+    compression = request.args.get('compression', compressions[0])
+    if compression not in compressions:
+        return "Unsupported compression", 400
+    df = load_session_dataset()
+    if df is None:
+        return "No data to download, please upload your files again.", 404
+
+    return Response(count_bytes(iter_binary_chunks(df, file_format, compression), f'download_{file_format}'),
+                    mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@server.route('/download/urls')
+@limiter.limit("30 per minute")
+def download_urls():
+    """
+    Stream the links of the session dataset for 4CAT. By default links are canonicalized and
+    deduplicated; ?dedupe=0 keeps every link, ?ids=1 exports video IDs and ?batch_size=N puts
+    at most N links on each line.
+    """
+    if not session.get('authenticated'):
+        return "Not authenticated", 403
+    try:
+        batch_size = request.args.get('batch_size', type=int)
+        if batch_size is not None and batch_size < 1:
+            raise ValueError
+    except ValueError:
+        return "Invalid batch size", 400
+    df = load_session_dataset()
+    if df is None or 'Link' not in df.columns:
+        return "No data to download, please upload your files again.", 404
+
+    from src.components.data.general_utils import iter_urls_for_4cat
+    ids = request.args.get('ids', '0') == '1'
+    deduplicate = request.args.get('dedupe', '1') == '1'
+    filename = 'video_ids.txt' if ids else 'urls.txt'
+    return Response(count_bytes(iter_encoded(iter_urls_for_4cat(df, deduplicate=deduplicate, ids=ids, batch_size=batch_size)),
+                                'download_urls'),
+                    mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@server.route('/metrics')
+@limiter.exempt
+def metrics():
+    """
+    Prometheus histograms of stage durations, upload and response sizes and row counts,
+    added up over all workers and background jobs.
+    """
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return "Not authenticated", 403
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 def run_server():
     logging.info("Starting server")
     try:
-        server.run(debug=DEBUG, host='0.0.0.0', port=PORT)
+        server.run(debug=DEBUG, host='0.0.0.0', port=PORT, threaded=WORKER_THREADS > 1)
         logging.info(f"Server running on port {PORT}")
     except Exception as e:
         logging.error("Error starting server: %s", e)
         raise
 
-if __name__ == "__main__":
-    setup_app()
-    run_server()
-
 setup_app()
 application = server
+
+if __name__ == "__main__":
+    run_server()
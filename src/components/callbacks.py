@@ -1,17 +1,17 @@
 import logging
+import posixpath
+from contextlib import ExitStack
 import dash
-from dash import Output, Input, State, html, dcc, dash_table
+from dash import Output, Input, State, ClientsideFunction, html, dcc
 from dash.dependencies import ALL
 from dash.exceptions import PreventUpdate
-import pandas as pd
-from src.components.data.insta_processing import parse_instagram_files, create_engagement_graph
-from src.components.data.tiktok_processing import parse_tiktok_contents, create_video_history_graph, flatten_tiktok_data
-from src.components.data.youtube_processing import parse_youtube_contents, create_watch_history_graph
-from src.components.data.general_utils import create_data_table, create_download_buttons, extract_urls_for_4cat
-from src.components.utils.security_utils import save_temp_file, cleanup_temp_file
-
-# Global dataframe to store uploaded data
-df = pd.DataFrame()
+from src.components.data.upload_sources import decoded_size, picklable_source, open_archive_members, open_upload_source, LocalFile
+from src.components.security_utils import spool_upload, get_session_key, MAX_EXTRACTED_SIZE
+from src.components.uploads import CHUNKED_UPLOADS, open_upload, discard_upload
+from src.components.dataset_store import save_session_dataset, load_session_dataset, load_session_companion
+from src.components.jobs import BACKGROUND_CALLBACKS, get_parse_executor, run_parse_job, map_parse_jobs
+from src.components.parse_cache import parse_cache_key, get_cached_result, set_cached_result
+from src.components.metrics import timed, observe, METRICS
 
 def create_description(platform):
     descriptions = {
@@ -36,116 +36,520 @@ def create_description(platform):
         'marginBottom': '20px'
     })
 
-def create_visualization(platform, df):
+# pandas, plotly and the parsers are imported on first use instead of when a worker boots
+# (gunicorn --preload imports them once in the master, see main.preload)
+
+def create_cube(platform, df):
+    if platform == 'tiktok':
+        from src.components.data.tiktok_processing import video_history_cube
+        return video_history_cube(df)
+    elif platform == 'instagram':
+        from src.components.data.insta_processing import engagement_cube
+        return engagement_cube(df)
+    elif platform == 'youtube':
+        from src.components.data.youtube_processing import watch_history_cube
+        return watch_history_cube(df)
+
+# Granularities the figure of every platform can be shown at, the default first; top 10
+# charts are not offered per day
+GRANULARITY_OPTIONS = {
+    'tiktok': ['M', 'D', 'W', 'Q', 'Y'],
+    'instagram': ['Y', 'W', 'M', 'Q'],
+    'youtube': ['Y', 'W', 'M', 'Q']
+}
+
+def create_figure(platform, df, cube=None, freq=None):
+    freq = freq or GRANULARITY_OPTIONS[platform][0]
     if platform == 'tiktok':
-        fig = create_video_history_graph(df)
+        from src.components.data.tiktok_processing import create_video_history_graph
+        return create_video_history_graph(df, cube, freq)
     elif platform == 'instagram':
-        fig = create_engagement_graph(df)
+        from src.components.data.insta_processing import create_engagement_graph
+        return create_engagement_graph(df, cube, freq)
     elif platform == 'youtube':
-        fig = create_watch_history_graph(df)
-    return dcc.Graph(figure=fig)
+        from src.components.data.youtube_processing import create_watch_history_graph
+        return create_watch_history_graph(df, cube, freq)
+
+def create_aggregate(platform, cube, freq, fig):
+    """
+    Return the pre-aggregated counts that assets/visualization.js renders the figure from when
+    the period range, sources or number of top entries change, with the layout of fig. The
+    plotly template is left out, the browser keeps the one of the figure it already shows.
+    """
+    if platform == 'tiktok':
+        from src.components.data.tiktok_processing import video_history_aggregate
+        aggregate = video_history_aggregate(cube, freq)
+    elif platform == 'instagram':
+        from src.components.data.insta_processing import engagement_aggregate
+        aggregate = engagement_aggregate(cube, freq)
+    elif platform == 'youtube':
+        from src.components.data.youtube_processing import watch_history_aggregate
+        aggregate = watch_history_aggregate(cube, freq)
+    layout = fig.to_plotly_json()['layout']
+    layout.pop('template', None)
+    aggregate['layout'] = layout
+    return aggregate
+
+def period_range(aggregate):
+    """
+    Return the max, value and marks of the period range slider: positions are period indexes
+    and the first and last period are labelled.
+    """
+    last = max(len(aggregate['x']) - 1, 0)
+    marks = {0: str(aggregate['x'][0]), last: str(aggregate['x'][-1])} if aggregate['x'] else {}
+    return last, [0, last], marks
+
+def observe_payload_size(platform, payload):
+    # Only serialized when metrics are recorded, Dash serializes the payload again for the response
+    if METRICS:
+        from plotly.io.json import to_json_plotly
+        observe('data_mirroring_figure_bytes', len(to_json_plotly(payload)), platform=platform)
+    return payload
+
+def create_visualization(platform, fig, aggregate):
+    from src.components.data.rollups import GRANULARITIES, CLIENT_TOP_N
+    # update_aggregate re-aggregates the session's rollup cube when another granularity is picked;
+    # the other controls only change what the browser draws from the aggregate
+    options = GRANULARITY_OPTIONS[platform]
+    last, value, marks = period_range(aggregate)
+    control_style = {'fontFamily': 'Arial, sans-serif', 'color': '#4B5563', 'margin': '10px auto', 'maxWidth': '800px'}
+    stacked = aggregate['kind'] == 'stacked'
+    return html.Div([
+        dcc.Store(id='visualization-platform', data=platform),
+        dcc.Store(id='visualization-aggregate', data=aggregate),
+        dcc.RadioItems(
+            id='granularity-selector',
+            options=[{'label': f' {GRANULARITIES[freq]}', 'value': freq} for freq in sorted(options, key=list(GRANULARITIES).index)],
+            value=options[0],
+            inline=True,
+            inputStyle={'marginLeft': '12px'},
+            style={'textAlign': 'center', 'fontFamily': 'Arial, sans-serif', 'color': '#4B5563'}
+        ),
+        html.Div([
+            html.Label("Periods"),
+            dcc.RangeSlider(id='period-range', min=0, max=last, step=1, value=value, marks=marks, allowCross=False)
+        ], style=control_style),
+        # Both controls are always in the layout so the clientside callback has all its inputs
+        html.Div([
+            html.Label("Sources"),
+            dcc.Checklist(id='source-toggle', options=aggregate['labels'] if stacked else [],
+                          value=aggregate['labels'] if stacked else [], inline=True, inputStyle={'marginLeft': '12px'})
+        ], style=control_style if stacked else {'display': 'none'}),
+        html.Div([
+            html.Label("Entries per period"),
+            dcc.Slider(id='top-n', min=1, max=CLIENT_TOP_N, step=1, value=10,
+                       marks={n: str(n) for n in (1, 10, CLIENT_TOP_N)})
+        ], style={'display': 'none'} if stacked else control_style),
+        dcc.Graph(id='visualization-graph', figure=fig)
+    ])
+
+# Files the parsers read, looked up by name (in any folder) in uploaded ZIP archives
+DDP_FILES = {
+    'tiktok': ['user_data.json', 'user_data_tiktok.json'],
+    'instagram': ['saved_posts.json', 'liked_posts.json', 'posts_viewed.json', 'suggested_accounts_viewed.json', 'videos_watched.json'],
+    'youtube': ['watch-history.json']
+}
 
-def parse_contents(platform, contents_list, selected_sections=None):
+def open_archives(stack, sources, filenames, names):
+    """
+    Replace the ZIP archives among the upload sources by streams of their members named in
+    names. The archives and member streams are closed by the ExitStack.
+
+    :return: The sources and the file names that go with them, members by their base name
+    """
+    opened, opened_filenames = [], []
+    for source, filename in zip(sources, filenames):
+        if not filename.lower().endswith('.zip'):
+            opened.append(source)
+            opened_filenames.append(filename)
+            continue
+        archive, members = open_archive_members(source, names, MAX_EXTRACTED_SIZE)
+        stack.enter_context(archive)
+        opened.extend(stack.enter_context(member) for member in members)
+        opened_filenames.extend(posixpath.basename(member.name) for member in members)
+    return opened, opened_filenames
+
+def parse_contents(platform, contents_list, selected_sections=None, filenames=None, allow_empty=False):
     logging.debug(f"Parsing contents for platform: {platform} with selected sections: {selected_sections}")
-    
-    temp_files = []
+    import pandas as pd
+    if not contents_list:
+        return pd.DataFrame()
+    if filenames is None:
+        filenames = [f"{platform}_data.json"] * len(contents_list)
+
+    with ExitStack() as stack:
+        # Data URIs are decoded into private spooled buffers that the parsers read directly;
+        # the buffers are released when parsing is done, whatever happens. Any other string
+        # is rejected by spool_upload, only LocalFile sources are opened from disk
+        with timed('decode', platform=platform):
+            sources = [stack.enter_context(spool_upload(content, filename)) if isinstance(content, str)
+                       else stack.enter_context(open_upload_source(content)) if isinstance(content, LocalFile)
+                       else content
+                       for content, filename in zip(contents_list, filenames)]
+            # Only the members the parser needs are decompressed, while the parser reads them
+            if platform == 'instagram' and selected_sections is None:
+                selected_sections = list(DDP_FILES['instagram'])
+            names = selected_sections if platform == 'instagram' else DDP_FILES.get(platform, [])
+            sources, filenames = open_archives(stack, sources, filenames, names)
+
+        # Every uploaded file is parsed and the results are merged with a single concat
+        if platform == 'tiktok':
+            from src.components.data.tiktok_processing import parse_tiktok_contents, flatten_tiktok_data
+            if not selected_sections:
+                selected_sections = ['video_history', 'favorite_video', 'item_favorite']
+            frames = []
+            for source in sources:
+                with timed('parse', platform=platform):
+                    data = parse_tiktok_contents(source)
+                with timed('flatten', platform=platform):
+                    frames.append(flatten_tiktok_data(data, selected_sections))
+            return pd.concat(frames, ignore_index=True)
+        elif platform == 'instagram':
+            from src.components.data.insta_processing import parse_instagram_files
+            # Files named after an unselected section are not read at all
+            with timed('parse', platform=platform):
+                return parse_instagram_files(sources, selected_sections, filenames=filenames, allow_empty=allow_empty)
+        elif platform == 'youtube':
+            from src.components.data.youtube_processing import parse_youtube_contents
+            with timed('parse', platform=platform):
+                return pd.concat([parse_youtube_contents(source) for source in sources], ignore_index=True)
+        else:
+            raise ValueError("Unsupported platform")
+
+def optimize_upload(platform, df):
+    """
+    Convert a parsed upload to compact dtypes and record what that saves.
+    """
+    from src.components.data.general_utils import optimize_dtypes
+    with timed('optimize', platform=platform):
+        optimized = optimize_dtypes(df)
+    if METRICS:
+        # What the compact dtypes save; set MEMORY_REPORT for the per-column report
+        from src.components.dataset_store import dataset_size
+        observe('data_mirroring_dataset_bytes', dataset_size(df), platform=platform, dtypes='parsed')
+        observe('data_mirroring_dataset_bytes', dataset_size(optimized), platform=platform, dtypes='optimized')
+    return optimized
+
+def parse_upload(platform, sources, filenames):
+    """
+    Parse the uploaded files of one platform into a DataFrame with compact dtypes. This is the
+    CPU-heavy part of an upload, run through parse_uploads so it can leave the request thread.
+    """
+    return optimize_upload(platform, parse_contents(platform, sources, filenames=filenames))
+
+def parse_upload_file(platform, source, filename):
+    """
+    Parse one file of a multi-file upload, the task parse_uploads runs per file. A file without
+    any of the selected data gives an empty DataFrame.
+    """
+    return parse_contents(platform, [source], filenames=[filename], allow_empty=True)
+
+def parse_uploads(platform, sources, filenames):
+    """
+    Parse an upload like parse_upload, in the parse pool when there is one. The files of a
+    multi-file upload (the Instagram sections) are then parsed as one task each, so the upload
+    takes about as long as its largest file, and merged here with a single concat. Background
+    jobs have no pool and parse the files one after another.
+    """
+    if get_parse_executor() is None:
+        return parse_upload(platform, sources, filenames)
+    sources = [picklable_source(source) for source in sources]
+    if len(sources) < 2:
+        return run_parse_job(parse_upload, platform, sources, filenames)
+
+    import pandas as pd
+    frames = map_parse_jobs(parse_upload_file, [(platform, source, filename) for source, filename in zip(sources, filenames)])
+    df = pd.concat([frame for frame in frames if not frame.empty] or frames[:1], ignore_index=True)
+    if df.empty and platform == 'instagram':
+        # As parse_instagram_files does for files parsed together
+        raise ValueError("No relevant data found in the selected sections.")
+    return optimize_upload(platform, df)
+
+def append_to_session_dataset(platform, existing, new):
+    """
+    Append the records of a new upload that are not in the session dataset yet. The rollup
+    cube is updated from the appended rows instead of being recomputed over all rows.
+
+    :param existing: Session dataset, with the same columns as new
+    :param new: Parsed DataFrame of the new upload
+    :return: Tuple of (merged DataFrame, rollup cube of the merged rows, number of appended rows)
+    """
+    import pandas as pd
+    from src.components.data.appends import append_dataset
+    from src.components.data.rollups import merge_cubes, cube_to_frame
+    # The companions are missing when the store evicted them
+    index = load_session_companion('index')
+    cube = load_session_cube(platform, existing)
+    merged, added, merged_index = append_dataset(existing, new, index['hash'].to_numpy() if index is not None else None)
+    cube = merge_cubes(cube, create_cube(platform, added))
+    save_session_dataset(merged, index=pd.DataFrame({'hash': merged_index}), cube=cube_to_frame(*cube))
+    return merged, cube, len(added)
+
+def load_session_cube(platform, df):
+    """
+    Return the rollup cube stored with the session dataset, or build it from df when the
+    store no longer has it.
+    """
+    from src.components.data.rollups import cube_from_frame
+    cube = load_session_companion('cube')
+    return cube_from_frame(cube) if cube is not None else create_cube(platform, df)
+
+def open_uploads(upload_handles):
+    """
+    Open the files referenced by the handles that the chunked upload route returned.
+
+    :param upload_handles: Dict with the platform and a list of {'handle', 'filename'} entries
+    :return: Tuple of (platform, list of file names, list of open binary files)
+    """
+    owner = get_session_key()
+    filenames, files = [], []
     try:
-        for content in contents_list:
-            filename = f"{platform}_data.json"
-            temp_file_path = save_temp_file(content.encode('utf-8'), filename)
-            temp_files.append(temp_file_path)
-            
-            if platform == 'tiktok':
-                if not selected_sections:
-                    selected_sections = ['video_history', 'favorite_video', 'item_favorite']
-                parsed_data = parse_tiktok_contents(temp_file_path)
-                return flatten_tiktok_data(parsed_data, selected_sections)
-            elif platform == 'instagram':
-                if selected_sections is None:
-                    selected_sections = ['saved_posts.json', 'liked_posts.json', 'posts_viewed.json', 'suggested_accounts_viewed.json', 'videos_watched.json']
-                return parse_instagram_files([temp_file_path], selected_sections)
-            elif platform == 'youtube':
-                return parse_youtube_contents(temp_file_path)
-            else:
-                raise ValueError("Unsupported platform")
-    finally:
-        for temp_file in temp_files:
-            cleanup_temp_file(temp_file)
-
-    return pd.DataFrame()
+        for upload in upload_handles['uploads']:
+            meta, f = open_upload(upload['handle'], owner)
+            files.append(f)
+            filenames.append(meta['filename'])
+    except Exception:
+        for f in files:
+            f.close()
+        raise
+    return upload_handles['platform'], filenames, files
 
 def register_callbacks(app):
-    @app.callback(
+    upload_output_dependencies = (
         [Output('output-data-upload', 'children'),
          Output('download-container', 'children'),
          Output('visualization-container', 'children')],
-        [Input({'type': 'upload-data', 'platform': ALL}, 'contents')],
+        [Input({'type': 'upload-data', 'platform': ALL}, 'contents'),
+         Input('upload-handles', 'data')],
         [State({'type': 'upload-data', 'platform': ALL}, 'filename'),
-         State({'type': 'upload-data', 'platform': ALL}, 'id')]
+         State({'type': 'upload-data', 'platform': ALL}, 'id'),
+         State('append-upload', 'value')]
     )
-    def update_output(all_contents, all_filenames, all_ids):
+
+    def update_output(set_progress, all_contents, upload_handles, all_filenames, all_ids, append_upload):
         logging.info("update_output triggered")
-        if not all_contents:
+        if not any(all_contents) and not upload_handles:
             raise PreventUpdate
+        with timed('update_output'):
+            return build_output(set_progress, all_contents, upload_handles, all_filenames, all_ids, append_upload)
+
+    def build_output(set_progress, all_contents, upload_handles, all_filenames, all_ids, append_upload):
+        from src.components.data.general_utils import create_data_table, create_download_buttons
 
         children = []
         download_buttons = []
         visualization = None
 
-        global df  # Use global dataframe to store the uploaded data
-
-        for contents, filename_list, id in zip(all_contents, all_filenames, all_ids):
-            if contents and filename_list:
-                platform = id['platform']  # Extract platform from the id
+        if dash.ctx.triggered_id == 'upload-handles':
+            uploads = [(upload_handles['platform'], [u['filename'] for u in upload_handles['uploads']], upload_handles)]
+        else:
+            uploads = [(id['platform'], filename_list, contents)
+                       for contents, filename_list, id in zip(all_contents, all_filenames, all_ids)
+                       if contents and filename_list]
 
-                try:
-                    df = parse_contents(platform, [contents])
-                    logging.debug(f"Parsed {platform.capitalize()} DataFrame: {df.head()}")
-                    if not df.empty:
-                        children.append(create_description(platform))
-                        children.append(create_data_table(df))
-                        download_buttons = create_download_buttons(platform)
-                        visualization = create_visualization(platform, df)
+        for platform, filename_list, contents in uploads:
+            files = []
+            try:
+                set_progress(('1', '5', f"Reading {', '.join(filename_list)}"))
+                if isinstance(contents, dict):
+                    platform, filename_list, files = open_uploads(contents)
+                    sources = files
+                else:
+                    sources = contents
+                for source in sources:
+                    if isinstance(source, str):
+                        observe('data_mirroring_upload_bytes', decoded_size(source), platform=platform)
+                # Re-uploads of the same export skip parsing and the rollup cube
+                with timed('cache_lookup', platform=platform):
+                    cache_key = parse_cache_key(platform, sources)
+                    cached = get_cached_result(cache_key)
+                if cached is not None:
+                    df, cube = cached
+                else:
+                    df = parse_uploads(platform, sources, filename_list)
+                    set_progress(('2', '5', "Building the visualization"))
+                    with timed('rollup', platform=platform):
+                        cube = create_cube(platform, df) if not df.empty else None
+                    set_cached_result(cache_key, df, cube)
+                observe('data_mirroring_parsed_rows', len(df), platform=platform)
+                logging.debug(f"Parsed {platform.capitalize()} DataFrame: {df.head()}")
+                # Appending keeps the records of earlier uploads and adds only the new ones
+                existing = load_session_dataset() if append_upload and not df.empty else None
+                if existing is not None and list(existing.columns) != list(df.columns):
+                    logging.info(f"Replacing the session dataset, the {platform} upload has other columns")
+                    existing = None
+                if not df.empty:
+                    set_progress(('3', '5', "Preparing your data"))
+                    if existing is not None:
+                        uploaded = len(df)
+                        with timed('append', platform=platform):
+                            df, cube, appended = append_to_session_dataset(platform, existing, df)
+                        notice = html.P(f"Added {appended} new records to your data, {uploaded - appended} were already in it.",
+                                        className="info-message")
                     else:
-                        children.append(html.Div(f"No {platform.capitalize()} data found in the files.", className="error-message"))
-                except Exception as e:
-                    logging.error(f"Error processing files {filename_list}: {e}")
-                    children.append(html.Div([
-                        html.H5(', '.join(filename_list)),
-                        html.Div(f"An error occurred: {e}", className="error-message")
-                    ]))
+                        from src.components.data.rollups import cube_to_frame
+                        with timed('store', platform=platform):
+                            save_session_dataset(df, cube=cube_to_frame(*cube))
+                        notice = None
+                    set_progress(('4', '5', "Building the table"))
+                    children.append(create_description(platform))
+                    if notice is not None:
+                        children.append(notice)
+                    with timed('table', platform=platform):
+                        children.append(create_data_table(df))
+                    download_buttons = create_download_buttons(platform)
+                    with timed('figure', platform=platform):
+                        fig = create_figure(platform, df, cube)
+                        aggregate = create_aggregate(platform, cube, GRANULARITY_OPTIONS[platform][0], fig)
+                    observe_payload_size(platform, {'figure': fig, 'aggregate': aggregate})
+                    visualization = create_visualization(platform, fig, aggregate)
+                else:
+                    children.append(html.Div(f"No {platform.capitalize()} data found in the files.", className="error-message"))
+            except Exception as e:
+                logging.error(f"Error processing files {filename_list}: {e}")
+                children.append(html.Div([
+                    html.H5(', '.join(filename_list)),
+                    html.Div(f"An error occurred: {e}", className="error-message")
+                ]))
+            finally:
+                for f in files:
+                    f.close()
+                if isinstance(contents, dict):
+                    for upload in contents['uploads']:
+                        discard_upload(upload['handle'])
 
         logging.info(f"Returning children: {children}, download_buttons: {download_buttons}, visualization: {visualization}")
         return children, download_buttons, visualization
 
+    if BACKGROUND_CALLBACKS:
+        # Parse in a job process so the worker is free while the browser polls for progress
+        app.callback(
+            *upload_output_dependencies,
+            background=True,
+            progress=[Output('parse-progress', 'value'),
+                      Output('parse-progress', 'max'),
+                      Output('parse-progress-label', 'children')],
+            running=[(Output('parse-progress-container', 'style'),
+                      {'display': 'block', 'maxWidth': '800px', 'margin': 'auto', 'textAlign': 'center'},
+                      {'display': 'none'})],
+            cancel=[Input('btn-cancel-parse', 'n_clicks')],
+            prevent_initial_call=True
+        )(update_output)
+    else:
+        @app.callback(*upload_output_dependencies, prevent_initial_call=True)
+        def update_output_in_request(*args):
+            return update_output(lambda progress: None, *args)
+
     @app.callback(
-        Output('download-dataframe-csv', 'data'),
-        Input('btn-download-csv', 'n_clicks'),
+        [Output('data-table', 'data'),
+         Output('data-table', 'page_count'),
+         Output('data-table', 'page_current')],
+        [Input('data-table', 'page_current'),
+         Input('data-table', 'page_size'),
+         Input('data-table', 'sort_by'),
+         Input('data-table', 'filter_query')],
+        prevent_initial_call=True
+    )
+    def update_table_page(page_current, page_size, sort_by, filter_query):
+        from src.components.data.table_pages import query_page
+        df = load_session_dataset()
+        if df is None:
+            raise PreventUpdate
+        try:
+            with timed('table_page'):
+                page, page_count, page_current = query_page(df, page_current, page_size, sort_by, filter_query)
+        except (TypeError, ValueError) as e:
+            logging.warning(f"Invalid table query {filter_query!r}: {e}")
+            raise PreventUpdate
+        return page.to_dict('records'), page_count, page_current
+
+    @app.callback(
+        [Output('visualization-aggregate', 'data'),
+         Output('period-range', 'max'),
+         Output('period-range', 'value'),
+         Output('period-range', 'marks')],
+        Input('granularity-selector', 'value'),
+        State('visualization-platform', 'data'),
+        prevent_initial_call=True
+    )
+    def update_aggregate(freq, platform):
+        # Derived from the rollup cube, the dataset is only read when the store lost the cube
+        from src.components.data.rollups import cube_from_frame
+        cube = load_session_companion('cube')
+        if cube is not None:
+            cube = cube_from_frame(cube)
+        else:
+            df = load_session_dataset()
+            if df is None:
+                raise PreventUpdate
+            cube = create_cube(platform, df)
+        with timed('figure', platform=platform):
+            aggregate = create_aggregate(platform, cube, freq, create_figure(platform, None, cube, freq))
+        observe_payload_size(platform, aggregate)
+        return (aggregate, *period_range(aggregate))
+
+    # Period range, source and top N changes are drawn in the browser from the aggregate,
+    # see assets/visualization.js
+    app.clientside_callback(
+        ClientsideFunction(namespace='dataMirroring', function_name='renderFigure'),
+        Output('visualization-graph', 'figure'),
+        [Input('visualization-aggregate', 'data'),
+         Input('period-range', 'value'),
+         Input('source-toggle', 'value'),
+         Input('top-n', 'value')],
+        State('visualization-graph', 'figure'),
         prevent_initial_call=True
     )
+
+    @app.callback(
+        Output('page-content', 'children'),
+        Input('platform-selection', 'value')
+    )
     def update_page_content(selected_platform):
         logging.info("update_page_content triggered")
         if selected_platform is None:
             return html.Div(" ", className="info-message")
-        upload_component = html.Div([
-            dcc.Upload(
-                id={'type': 'upload-data', 'platform': selected_platform},
-                children=html.Div(['Drag and Drop or ', html.A('Select Files')]),
-                style={
-                    'width': '100%',
-                    'height': '60px',
-                    'lineHeight': '60px',
-                    'borderWidth': '2px',
-                    'borderStyle': 'dashed',
-                    'borderRadius': '10px',
-                    'textAlign': 'center',
-                    'margin': '10px',
-                    'backgroundColor': '#F9FAFB',
-                    'border': '2px dashed #CBD5E1'
-                },
-                multiple=True
-            )
-        ])
+        if CHUNKED_UPLOADS:
+            # Files are sent as raw binary chunks to /upload by assets/chunked_upload.js,
+            # which then writes the returned handles into the 'upload-handles' store.
+            upload_component = html.Div([
+                html.Div(
+                    ['Drag and Drop or ', html.A('Select Files')],
+                    className='chunked-upload',
+                    style={
+                        'width': '100%',
+                        'height': '60px',
+                        'lineHeight': '60px',
+                        'borderRadius': '10px',
+                        'textAlign': 'center',
+                        'margin': '10px',
+                        'backgroundColor': '#F9FAFB',
+                        'border': '2px dashed #CBD5E1',
+                        'cursor': 'pointer'
+                    },
+                    **{'data-platform': selected_platform, 'data-multiple': 'true'}
+                )
+            ])
+        else:
+            upload_component = html.Div([
+                dcc.Upload(
+                    id={'type': 'upload-data', 'platform': selected_platform},
+                    children=html.Div(['Drag and Drop or ', html.A('Select Files')]),
+                    style={
+                        'width': '100%',
+                        'height': '60px',
+                        'lineHeight': '60px',
+                        'borderWidth': '2px',
+                        'borderStyle': 'dashed',
+                        'borderRadius': '10px',
+                        'textAlign': 'center',
+                        'margin': '10px',
+                        'backgroundColor': '#F9FAFB',
+                        'border': '2px dashed #CBD5E1'
+                    },
+                    multiple=True
+                )
+            ])
 
         descriptions = {
             'instagram': "You can upload the following files for Instagram: saved_posts.json, liked_posts.json, posts_viewed.json, suggested_accounts_viewed.json, videos_watched.json. You can upload one file or select multiple files at the same time.",
@@ -153,7 +557,8 @@ def register_callbacks(app):
             'youtube': "You can upload the watch-history.json file for YouTube. The application will extract your watch history data, including video titles, links, watch dates, channel names, and channel URLs."
         }
 
-        description = html.P(descriptions[selected_platform], style={
+        description = html.P(descriptions[selected_platform] + " You can also upload the ZIP file you downloaded from the platform as it is, "
+                             "the application only reads the files listed above from it.", style={
             'textAlign': 'center',
             'color': '#4B5563',
             'fontFamily': 'Arial, sans-serif',
@@ -163,30 +568,16 @@ def register_callbacks(app):
             'marginBottom': '20px'
         })
 
+        # Read by update_output when the next upload arrives
+        append_option = dcc.Checklist(
+            id='append-upload',
+            options=[{'label': ' Add new uploads to the data I already uploaded', 'value': 'append'}],
+            value=[],
+            style={'textAlign': 'center', 'fontFamily': 'Arial, sans-serif', 'color': '#4B5563'}
+        )
+
         return html.Div([
             upload_component,
+            append_option,
             description
         ], className="upload-container")
-
-    @app.callback(
-        Output('download-dataframe-csv', 'data'),
-        Input('btn-download-csv', 'n_clicks'),
-        prevent_initial_call=True
-    )
-    def download_csv(n_clicks):
-        logging.info("download_csv triggered")
-        global df  # Access the global dataframe
-        if n_clicks:
-            return dcc.send_data_frame(df.to_csv, "data.csv")
-
-    @app.callback(
-        Output('download-urls-txt', 'data'),
-        Input('btn-download-urls', 'n_clicks'),
-        prevent_initial_call=True
-    )
-    def download_urls(n_clicks):
-        logging.info("download_urls triggered")
-        global df  # Access the global dataframe
-        if n_clicks:
-            urls = extract_urls_for_4cat(df)
-            return dict(content=urls, filename="urls.txt")
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# Columns that identify a record; rows of a later upload that match an earlier row on all of
+# the columns a platform has are not appended again
+DEDUP_COLUMNS = ['Link', 'href', 'title', 'Date', 'timestamp', 'Source', 'category']
+
+# Multiplier that mixes the column hashes of a row into one row hash
+_HASH_MIX = np.uint64(0x100000001B3)
+
+_MISSING_HASH = pd.util.hash_array(np.array([None], dtype=object))[0]
+
+def _column_hashes(values):
+    # Values hash the same whatever the dtype of the column, so a categorical in one upload
+    # matches plain strings in the next one
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        category_hashes = pd.util.hash_array(np.asarray(values.cat.categories, dtype=object))
+        return np.append(category_hashes, _MISSING_HASH)[values.cat.codes.to_numpy()]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        if values.dt.tz is not None:
+            values = values.dt.tz_convert(None)
+        return pd.util.hash_array(values.to_numpy(dtype='datetime64[ns]').view(np.int64))
+    return pd.util.hash_array(values.to_numpy(dtype=object))
+
+def row_hashes(df):
+    """
+    Return a 64-bit hash of the DEDUP_COLUMNS of every row.
+    """
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for column in DEDUP_COLUMNS:
+        if column in df.columns:
+            hashes = (hashes ^ _column_hashes(df[column])) * _HASH_MIX
+    return hashes
+
+def _sorted_unique(hashes):
+    # Sorting and dropping neighbours is several times faster than np.unique on random 64-bit hashes
+    hashes = np.sort(hashes)
+    return hashes[np.concatenate(([True], hashes[1:] != hashes[:-1]))] if len(hashes) else hashes
+
+def hash_index(df):
+    """
+    Return the hash index of a dataset: the sorted distinct row hashes.
+    """
+    return _sorted_unique(row_hashes(df))
+
+def _contains(index, hashes):
+    positions = np.searchsorted(index, hashes).clip(max=max(len(index) - 1, 0))
+    return index[positions] == hashes if len(index) else np.zeros(len(hashes), dtype=bool)
+
+def _align_categories(existing, new):
+    # Concatenating categoricals with different categories would fall back to object columns
+    for column in existing.columns:
+        if not isinstance(existing[column].dtype, pd.CategoricalDtype):
+            if isinstance(new[column].dtype, pd.CategoricalDtype):
+                new = new.assign(**{column: new[column].astype(existing[column].dtype)})
+            continue
+        added = pd.Index(new[column].dropna().unique()).difference(existing[column].cat.categories, sort=False)
+        if len(added):
+            existing = existing.assign(**{column: existing[column].cat.add_categories(added)})
+        new = new.assign(**{column: pd.Categorical(new[column], categories=existing[column].cat.categories)})
+    return existing, new
+
+def append_dataset(existing, new, index=None):
+    """
+    Append the rows of a new upload that are not in the existing dataset yet.
+
+    :param existing: Session dataset so far
+    :param new: Parsed rows of the new upload, with the same columns
+    :param index: Hash index of existing (see hash_index), built from existing when not given
+    :return: Tuple of (merged DataFrame, the rows that were appended, hash index of the merged DataFrame)
+    """
+    if list(existing.columns) != list(new.columns):
+        raise ValueError("The new upload has other columns than the existing dataset")
+    if index is None:
+        index = hash_index(existing)
+    hashes = row_hashes(new)
+    is_new = ~_contains(index, hashes)
+    added = new[is_new]
+    existing, added = _align_categories(existing, added)
+    merged = pd.concat([existing, added], ignore_index=True)
+    # Only the new hashes are sorted; they are then inserted into the index in one pass
+    new_hashes = _sorted_unique(hashes[is_new])
+    return merged, added, np.insert(index, np.searchsorted(index, new_hashes), new_hashes)
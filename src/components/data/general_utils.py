@@ -1,30 +1,188 @@
+import logging
+import os
 import pandas as pd
-from dash import html, dash_table, dcc
+from dash import html, dash_table
+from src.components.data.table_pages import query_page, TABLE_PAGE_SIZE
+# Upload readers live in a module without pandas, so the web app can import them at startup
+from src.components.data.upload_sources import DECODE_BLOCK_SIZE, decoded_size, DataURIReader, open_upload_source  # noqa: F401
+
+try:
+    import pyarrow  # noqa: F401  (optional, enables Arrow-backed string columns)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# String columns with at most this share of distinct values become categoricals
+CATEGORICAL_MAX_RATIO = 0.5
+
+# Store the remaining (high-cardinality) string columns as Arrow strings when pyarrow is installed
+ARROW_STRINGS = os.getenv('ARROW_STRINGS', 'False').lower() in ['true', '1', 't']
+
+# Log the memory usage of every column before and after optimize_dtypes at WARNING, so it shows at
+# the app's log level (otherwise it is only logged at INFO)
+MEMORY_REPORT = os.getenv('MEMORY_REPORT', 'False').lower() in ['true', '1', 't']
 
 def create_data_table(df):
+    # Pages are sliced, sorted and filtered on the server by the update_table_page callback
+    page, page_count, _ = query_page(df)
     return html.Div([
         dash_table.DataTable(
-            data=df.head(10).to_dict('records'),
+            id='data-table',
+            data=page.to_dict('records'),
             columns=[{'name': i, 'id': i} for i in df.columns],
+            page_action='custom',
+            page_current=0,
+            page_size=TABLE_PAGE_SIZE,
+            page_count=page_count,
+            sort_action='custom',
+            sort_mode='single',
+            sort_by=[],
+            filter_action='custom',
+            filter_query='',
             style_table={'overflowX': 'auto'},
             style_cell={'textAlign': 'left', 'fontFamily': 'Arial, sans-serif', 'padding': '10px'},
             style_header={'backgroundColor': '#F3F4F6', 'fontWeight': 'bold'},
             style_data_conditional=[{'if': {'row_index': 'odd'}, 'backgroundColor': '#F9FAFB'}]
         )
-    ], className='table-container')
+    ], className='paged-table-container')
 
 def create_download_buttons(platform):
-    buttons = [html.Button("Download CSV", id="btn-download-csv", className="download-btn")]
+    # The exports are streamed by the /download routes instead of passing through a callback
+    buttons = [html.A("Download CSV", id="btn-download-csv", href="/download/csv", download="data.csv", className="download-btn"),
+               html.A("Download Parquet", id="btn-download-parquet", href="/download/parquet", download="data.parquet", className="download-btn"),
+               html.A("Download Feather", id="btn-download-feather", href="/download/feather", download="data.feather", className="download-btn")]
     if platform in ['tiktok', 'youtube']:
-        buttons.append(html.Button("Download URLs for 4CAT processing", id="btn-download-urls", className="download-btn"))
+        buttons.append(html.A("Download URLs for 4CAT processing", id="btn-download-urls", href="/download/urls", download="urls.txt", className="download-btn"))
     return buttons
 
-def extract_urls_for_4cat(df):
+# Video IDs in TikTok share/web URLs and YouTube watch/short URLs
+TIKTOK_VIDEO_ID_PATTERN = r'tiktokv?\.com/(?:share/video/|@[^/?#]*/video/|v/)(\d+)'
+YOUTUBE_VIDEO_ID_PATTERN = r'(?:youtube\.com/(?:watch\?(?:[^#]*&)?v=|shorts/)|youtu\.be/)([\w-]{11})'
+
+def canonicalize_links(links, ids=False):
+    """
+    Reduce TikTok and YouTube links to one canonical form per video, vectorized.
+
+    :param links: Series of URLs (other URLs are only stripped of surrounding whitespace)
+    :param ids: Return bare video IDs instead of canonical URLs, None for links without one
+    :return: Series aligned with links
+    """
+    if isinstance(links.dtype, pd.CategoricalDtype):
+        # Run the regexes once per distinct link and map the results back through the codes
+        categories = canonicalize_links(pd.Series(links.cat.categories, dtype=object), ids=ids)
+        codes = links.cat.codes.to_numpy()
+        values = categories.to_numpy()[codes]
+        values[codes == -1] = None
+        return pd.Series(values, index=links.index, dtype=object)
+
+    links = links.astype(object).where(links.notna(), None)
+    text = links.astype(str).str.strip()
+    tiktok_ids = text.str.extract(TIKTOK_VIDEO_ID_PATTERN, expand=False)
+    youtube_ids = text.str.extract(YOUTUBE_VIDEO_ID_PATTERN, expand=False)
+    if ids:
+        return tiktok_ids.fillna(youtube_ids).astype(object).where(links.notna(), None)
+    canonical = ('https://www.tiktokv.com/share/video/' + tiktok_ids + '/').fillna(
+        'https://www.youtube.com/watch?v=' + youtube_ids)
+    return canonical.fillna(text).astype(object).where(links.notna(), None)
+
+def unique_links(df, ids=False):
+    """
+    Canonical links of the DataFrame without duplicates or placeholders ('No URL', 'N/A'),
+    in order of first appearance.
+
+    :param df: DataFrame with a 'Link' column
+    :param ids: Return bare video IDs instead of canonical URLs
+    :return: Series of unique links
+    """
+    canonical = canonicalize_links(df['Link'], ids=ids).dropna()
+    if not ids:
+        canonical = canonical[canonical.str.startswith('http')]
+    return canonical.drop_duplicates().reset_index(drop=True)
+
+def iter_urls_for_4cat(df, deduplicate=True, ids=False, batch_size=None, chunk_size=10000):
+    """
+    Stream the links of the DataFrame in the comma-separated format 4CAT imports.
+
+    :param df: DataFrame with a 'Link' column
+    :param deduplicate: Canonicalize links and drop duplicates across Browsing/Favorite/Liked
+    :param ids: Export video IDs instead of URLs (implies deduplicate)
+    :param batch_size: Put at most this many links per line, one 4CAT import per line
+    :param chunk_size: Links joined per yielded string when not batching
+    :return: Generator of strings
+    """
+    if deduplicate or ids:
+        links = unique_links(df, ids=ids)
+    else:
+        links = df['Link'].astype(str)
+    step = batch_size or chunk_size
+    for start in range(0, len(links), step):
+        chunk = ','.join(links.iloc[start:start + step])
+        if start == 0:
+            yield chunk
+        else:
+            yield ('\n' if batch_size else ',') + chunk
+
+def extract_urls_for_4cat(df, deduplicate=False, ids=False, batch_size=None):
     """
     Extract URLs from the DataFrame for further analysis with 4CAT.
     :param df: DataFrame containing the YouTube data
+    :param deduplicate: Canonicalize links and drop duplicates
+    :param ids: Export video IDs instead of URLs
+    :param batch_size: Put at most this many links per line
     :return: String with URLs separated by commas
     """
-    urls = df['Link'].tolist()
-    return ','.join(urls)
+    return ''.join(iter_urls_for_4cat(df, deduplicate=deduplicate, ids=ids, batch_size=batch_size))
+
+
+def memory_report(before, after):
+    """
+    Compare per-column memory usage of two versions of a DataFrame.
+
+    :param before: DataFrame before conversion
+    :param after: DataFrame after conversion
+    :return: DataFrame indexed by column with 'dtype', 'before', 'after' and 'saved' bytes
+    """
+    report = pd.DataFrame({
+        'dtype': after.dtypes.astype(str),
+        'before': before.memory_usage(deep=True, index=False),
+        'after': after.memory_usage(deep=True, index=False)
+    })
+    report.loc['total'] = ['', report['before'].sum(), report['after'].sum()]
+    report['saved'] = report['before'] - report['after']
+    return report
+
+def optimize_dtypes(df, categorical_max_ratio=CATEGORICAL_MAX_RATIO, arrow_strings=ARROW_STRINGS):
+    """
+    Convert the columns of a parsed DataFrame to compact dtypes.
+
+    Low-cardinality string columns (Source, category, file_name, Channel Name, ...) become
+    categoricals, datetime columns are normalized to nanosecond resolution and, if requested and
+    pyarrow is available, the remaining string columns are stored as Arrow strings.
+
+    :param df: DataFrame produced by one of the platform parsers
+    :param categorical_max_ratio: Maximum share of distinct values for a categorical column
+    :param arrow_strings: Store high-cardinality string columns as Arrow-backed strings
+    :return: New DataFrame with the same columns and values
+    """
+    if arrow_strings and not HAS_PYARROW:
+        logging.warning("ARROW_STRINGS is enabled but pyarrow is not installed")
+        arrow_strings = False
+
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.as_unit('ns')
+        elif pd.api.types.is_string_dtype(values) and pd.api.types.infer_dtype(values, skipna=True) == 'string':
+            if values.nunique(dropna=False) <= categorical_max_ratio * len(values):
+                values = values.astype('category')
+            elif arrow_strings:
+                values = values.astype(pd.StringDtype('pyarrow'))
+        columns[column] = values
 
+    optimized = pd.DataFrame(columns, index=df.index)
+    optimized.attrs = df.attrs
+    level = logging.WARNING if MEMORY_REPORT else logging.INFO
+    if logging.getLogger().isEnabledFor(level):
+        logging.log(level, "Memory usage per column in bytes:\n%s", memory_report(df, optimized).to_string())
+    return optimized
@@ -1,121 +1,252 @@
-import base64
+import io
 import json
+import ijson
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 from dash import html, dash_table, dcc
+from src.components.data.general_utils import open_upload_source
+from src.components.data.rollups import (GRANULARITIES, CLIENT_TOP_N, build_cube, cube_rollup, top_bar_traces, client_aggregate,
+                                         format_periods)
 
-def parse_instagram_contents(contents):
+# How each Instagram export file is flattened: the top-level key that holds its items and where
+# the title, href and timestamp of a row are found. A field is either a constant or a (path,
+# default) lookup in the item; with 'rows', every element of that list in an item is a row and
+# href and timestamp are looked up in the element instead.
+INSTAGRAM_SECTIONS = {
+    'saved_posts.json': {
+        'key': 'saved_saved_media',
+        'title': (('title',), 'No Title'),
+        'href': (('string_map_data', 'Saved on', 'href'), ''),
+        'timestamp': (('string_map_data', 'Saved on', 'timestamp'), 0)
+    },
+    'liked_posts.json': {
+        'key': 'likes_media_likes',
+        'rows': 'string_list_data',
+        'title': (('title',), 'No Title'),
+        'href': (('href',), ''),
+        'timestamp': (('timestamp',), 0)
+    },
+    'posts_viewed.json': {
+        'key': 'impressions_history_posts_seen',
+        'title': (('string_map_data', 'Author', 'value'), 'Unknown'),
+        'href': 'N/A',
+        'timestamp': (('string_map_data', 'Time', 'timestamp'), 0)
+    },
+    'suggested_accounts_viewed.json': {
+        'key': 'impressions_history_chaining_seen',
+        'title': (('string_map_data', 'Username', 'value'), 'Unknown'),
+        'href': 'N/A',
+        'timestamp': (('string_map_data', 'Time', 'timestamp'), 0)
+    },
+    'videos_watched.json': {
+        'key': 'impressions_history_videos_watched',
+        'title': (('string_map_data', 'Author', 'value'), 'Unknown'),
+        'href': 'N/A',
+        'timestamp': (('string_map_data', 'Time', 'timestamp'), 0)
+    }
+}
+
+def _compile_field(field):
+    if isinstance(field, str):
+        return lambda item: field
+    (*parents, last), default = field
+
+    def lookup(item):
+        for key in parents:
+            item = item.get(key, {})
+        return item.get(last, default)
+    return lookup
+
+def _compile_section(spec):
+    # Turn a section spec into a function from the section's items to its title, href and timestamp columns
+    title, href, timestamp = (_compile_field(spec[column]) for column in ('title', 'href', 'timestamp'))
+    rows = spec.get('rows')
+
+    def extract(items):
+        if rows is None:
+            return [title(item) for item in items], [href(item) for item in items], [timestamp(item) for item in items]
+        pairs = [(item, row) for item in items for row in item.get(rows, [])]
+        return ([title(item) for item, _ in pairs], [href(row) for _, row in pairs],
+                [timestamp(row) for _, row in pairs])
+    return extract
+
+# top-level key -> (file name, compiled extractor)
+_SECTION_EXTRACTORS = {spec['key']: (file_name, _compile_section(spec)) for file_name, spec in INSTAGRAM_SECTIONS.items()}
+
+def parse_instagram_contents(contents, selected_sections=None, peek=True):
     """
-    Parse base64 encoded contents to JSON.
-    
-    :param contents: base64 encoded string from uploaded file
+    Parse an uploaded Instagram JSON file.
+
+    :param contents: Data URI string, raw bytes, LocalFile or binary file-like object
+    :param selected_sections: File names of the sections to keep, None for all of them
+    :param peek: Look at the top-level key first and skip files of other sections without
+                 loading them (default); set to False to load the full document with json.load
     :return: Parsed JSON content
     """
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    return json.loads(decoded.decode('utf-8'))
-
-def parse_instagram_contents(contents):
     # Ensure contents is a single string, if it's a list, get the first element
     if isinstance(contents, list):
         contents = contents[0]
-    
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    return json.loads(decoded.decode('utf-8'))
-
-def flatten_instagram_data(data):
-    flat_instagram_data = []
-
-    # Process various Instagram data structures
-    for key in ['saved_saved_media', 'likes_media_likes', 'impressions_history_posts_seen', 
-                'impressions_history_chaining_seen', 'impressions_history_videos_watched']:
-        if key in data:
-            for item in data[key]:
-                if key == 'saved_saved_media':
-                    flat_instagram_data.append({
-                        'title': item.get('title', 'No Title'),
-                        'href': item['string_map_data'].get('Saved on', {}).get('href', ''),
-                        'timestamp': pd.to_datetime(item['string_map_data'].get('Saved on', {}).get('timestamp', 0), unit='s'),
-                        'category': key,
-                        'file_name': 'saved_posts.json'
-                    })
-                elif key == 'likes_media_likes':
-                    for like_data in item.get('string_list_data', []):
-                        flat_instagram_data.append({
-                            'title': item.get('title', 'No Title'),
-                            'href': like_data.get('href', ''),
-                            'timestamp': pd.to_datetime(like_data.get('timestamp', 0), unit='s'),
-                            'category': key,
-                            'file_name': 'liked_posts.json'
-                        })
-                elif key == 'impressions_history_posts_seen':
-                    flat_instagram_data.append({
-                        'title': item['string_map_data'].get('Author', {}).get('value', 'Unknown'),
-                        'href': 'N/A',
-                        'timestamp': pd.to_datetime(item['string_map_data'].get('Time', {}).get('timestamp', 0), unit='s'),
-                        'category': key,
-                        'file_name': 'posts_viewed.json'
-                    })
-                elif key == 'impressions_history_chaining_seen':
-                    flat_instagram_data.append({
-                        'title': item['string_map_data'].get('Username', {}).get('value', 'Unknown'),
-                        'href': 'N/A',
-                        'timestamp': pd.to_datetime(item['string_map_data'].get('Time', {}).get('timestamp', 0), unit='s'),
-                        'category': key,
-                        'file_name': 'suggested_accounts_viewed.json'
-                    })
-                elif key == 'impressions_history_videos_watched':
-                    flat_instagram_data.append({
-                        'title': item['string_map_data'].get('Author', {}).get('value', 'Unknown'),
-                        'href': 'N/A',
-                        'timestamp': pd.to_datetime(item['string_map_data'].get('Time', {}).get('timestamp', 0), unit='s'),
-                        'category': key,
-                        'file_name': 'videos_watched.json'
-                    })
-
-    return pd.DataFrame(flat_instagram_data)
-
-def parse_instagram_files(contents_list, selected_sections):
+
+    with open_upload_source(contents) as fileobj:
+        if peek:
+            keys = {key for key, (file_name, _) in _SECTION_EXTRACTORS.items()
+                    if selected_sections is None or file_name in selected_sections}
+            return load_instagram_sections(fileobj, keys)
+        return json.load(fileobj)
+
+# Bytes read to find the top-level key of an Instagram file, it is the first token of the file
+PEEK_SIZE = 64 * 1024
+
+def first_key(head):
+    """
+    Return the first top-level key of a JSON document from its first bytes, or None when it
+    cannot be found there.
+    """
+    try:
+        for prefix, event, value in ijson.parse(io.BytesIO(head)):
+            if prefix == '' and event == 'map_key':
+                return value
+    except ijson.JSONError:
+        pass
+    return None
+
+class _Replay(io.RawIOBase):
+    """
+    Binary stream of the bytes already read from a file object followed by the rest of it.
+    """
+
+    def __init__(self, head, fileobj):
+        self._head = memoryview(head)
+        self._fileobj = fileobj
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._head:
+            size = min(len(buffer), len(self._head))
+            buffer[:size] = self._head[:size]
+            self._head = self._head[size:]
+            return size
+        data = self._fileobj.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def load_instagram_sections(fileobj, keys):
+    """
+    Load the given top-level keys of an Instagram export file.
+
+    Every export file holds a single top-level key naming its section, so the file is routed
+    by peeking at its first key: a file of a section that is not wanted (or not known) is
+    skipped without reading the rest of it or building any of it.
+
+    :param fileobj: Binary file-like object containing the JSON document
+    :param keys: Top-level keys to keep
+    :return: Dict with the values of the keys found in the document
+    """
+    seekable = fileobj.seekable()
+    start = fileobj.tell() if seekable else None
+    head = fileobj.read(PEEK_SIZE)
+    key = first_key(head)
+    if key is not None and key not in keys:
+        return {}
+    # The document is read once, without a second full-size copy for the peeked head
+    if seekable:
+        fileobj.seek(start)
+        items = json.load(fileobj).items()
+    else:
+        items = ijson.kvitems(io.BufferedReader(_Replay(head, fileobj)), '', use_float=True)
+    return {key: value for key, value in items if key in keys}
+
+def flatten_instagram_data(data, selected_sections=None):
+    """
+    Flatten the sections of a parsed Instagram file into rows. Every top-level key is routed to
+    the extractor of its section; keys of sections that are not selected are skipped unread.
+
+    :param data: Parsed JSON content of one or more Instagram files
+    :param selected_sections: File names of the sections to keep, None for all of them
+    :return: DataFrame with title, href, timestamp, category and file_name columns
+    """
+    titles, hrefs, timestamps, categories, file_names = [], [], [], [], []
+    for key, (file_name, extract) in _SECTION_EXTRACTORS.items():
+        if key not in data or (selected_sections is not None and file_name not in selected_sections):
+            continue
+        section_titles, section_hrefs, section_timestamps = extract(data[key])
+        titles += section_titles
+        hrefs += section_hrefs
+        timestamps += section_timestamps
+        categories += [key] * len(section_titles)
+        file_names += [file_name] * len(section_titles)
+
+    return pd.DataFrame({
+        'title': titles,
+        'href': hrefs,
+        # Convert all epoch-second timestamps in a single vectorized call
+        'timestamp': pd.to_datetime(pd.Series(timestamps, dtype='float64'), unit='s'),
+        'category': categories,
+        'file_name': file_names
+    })
+
+def parse_instagram_file(contents, selected_sections):
+    """
+    Parse and flatten a single uploaded Instagram file, keeping only the selected sections.
+    """
+    return flatten_instagram_data(parse_instagram_contents(contents, selected_sections), selected_sections)
+
+def parse_instagram_files(contents_list, selected_sections, filenames=None, allow_empty=False):
     """
     Main function to parse the uploaded JSON files and return a merged DataFrame.
+    The files are parsed one after another and merged with a single concat; parse_uploads in
+    callbacks.py spreads the files of an upload over the parse pool instead.
     
-    :param contents_list: List of base64 encoded strings from uploaded files
+    :param contents_list: List of uploaded files (data URI strings or binary file objects)
     :param selected_sections: List of strings representing sections to process
+    :param filenames: Names of the uploaded files; files named after a section that is not
+                      selected are skipped without reading them
+    :param allow_empty: Return an empty DataFrame instead of raising when no file holds any of
+                        the selected sections, for a single file of a larger upload
     :return: DataFrame with processed data
     """
-    all_data = pd.DataFrame()
-    for contents in contents_list:
-        data = parse_instagram_contents(contents)
-        flat_instagram_data = flatten_instagram_data(data)
-        if not flat_instagram_data.empty:
-            filtered_data = flat_instagram_data[flat_instagram_data['file_name'].isin(selected_sections)]
-            all_data = pd.concat([all_data, filtered_data], ignore_index=True)
-    if not all_data.empty:
-        return all_data
+    if filenames is not None:
+        contents_list = [contents for contents, filename in zip(contents_list, filenames)
+                         if filename not in INSTAGRAM_SECTIONS or filename in selected_sections]
+    frames = [parse_instagram_file(contents, selected_sections) for contents in contents_list]
+    frames = [frame for frame in frames if not frame.empty]
+    if frames:
+        return pd.concat(frames, ignore_index=True)
+    elif allow_empty:
+        return pd.DataFrame()
     else:
         raise ValueError("No relevant data found in the selected sections.")
-    
-def create_engagement_graph(df):
+
+def engagement_cube(df):
+    """
+    Count engagement per day and title.
+    """
+    return build_cube(df['timestamp'], df['title'])
+
+def engagement_aggregate(cube, freq='Y'):
     """
-    Create a bar chart of the most engaged titles per year.
+    Counts behind create_engagement_graph for the clientside callbacks, see client_aggregate.
+    """
+    return client_aggregate(*cube_rollup(cube, freq), freq=freq, top_n=CLIENT_TOP_N)
+
+def create_engagement_graph(df, cube=None, freq='Y'):
+    """
+    Create a bar chart of the most engaged titles per period.
     
     :param df: DataFrame containing the Instagram data
+    :param cube: Result of engagement_cube(df) when it is already known
+    :param freq: Granularity of the periods, one of GRANULARITIES
     :return: Plotly Figure
     """
-    # Ensure the timestamp column is in datetime format
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-    # Aggregate engagement data by year and title
-    engagement_summary = df.groupby([df['timestamp'].dt.year, 'title']).size().reset_index(name='engagement_count')
-    
-    # Get top 10 titles per year
-    top_titles_per_year = engagement_summary.sort_values(['timestamp', 'engagement_count'], ascending=[True, False]) \
-                                            .groupby('timestamp').head(10)
-
-    fig = px.bar(top_titles_per_year, x='timestamp', y='engagement_count', color='title', 
-                 title='Most Engaged Titles Per Year',
-                 labels={'timestamp': 'Year', 'engagement_count': 'Engagement Count', 'title': 'Title'})
+    # Keep the top 10 titles of every period
+    periods, titles, counts = cube_rollup(cube if cube is not None else engagement_cube(df), freq)
+    fig = go.Figure(top_bar_traces(periods, titles, counts, n=10, freq=freq))
+    fig.update_layout(title=f'Most Engaged Titles Per {GRANULARITIES[freq]}', barmode='relative', xaxis_title=GRANULARITIES[freq],
+                      yaxis_title='Engagement Count', legend_title='Title')
+    # Keep the periods in time order; by default a category axis (quarters) follows the traces
+    fig.update_xaxes(categoryorder='array', categoryarray=format_periods(periods, freq))
     
     # Update layout for better appearance
     fig.update_layout({
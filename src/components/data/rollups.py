@@ -0,0 +1,292 @@
+import os
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Granularities a rollup cube can be viewed at, with their names in figure titles
+GRANULARITIES = {'D': 'Day', 'W': 'Week', 'M': 'Month', 'Q': 'Quarter', 'Y': 'Year'}
+
+# NumPy datetime units of the periods of every granularity (weeks by their Monday, quarters by their first month)
+PERIOD_UNITS = {'D': 'datetime64[D]', 'W': 'datetime64[D]', 'M': 'datetime64[M]', 'Q': 'datetime64[M]', 'Y': 'datetime64[Y]'}
+
+# Most bar traces a figure gets; groups beyond it are added up as 'Other' (stacked charts) or
+# packed into one trace per rank (top N charts), which keeps the figure JSON small
+FIGURE_MAX_TRACES = int(os.getenv('FIGURE_MAX_TRACES', 30))
+
+# Most groups per period a top N chart can be switched to in the browser (see client_aggregate)
+CLIENT_TOP_N = int(os.getenv('CLIENT_TOP_N', 20))
+
+def group_codes(values):
+    """
+    Return integer codes (-1 for missing values) and the labels they index.
+
+    :param values: Series of group values, categorical or not
+    :return: Tuple of (codes array, labels array)
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), np.asarray(values.cat.categories)
+    codes, labels = pd.factorize(values)
+    return codes, np.asarray(labels)
+
+def _count_entries(days, codes, counts, n_labels):
+    # Add up the counts of equal (day, code) pairs; the result is sorted by day, then code
+    keys = days * n_labels + codes
+    order = np.argsort(keys, kind='stable')
+    keys, counts = keys[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=np.int64)
+    counts = np.add.reduceat(counts, starts) if len(keys) else counts
+    days, codes = np.divmod(keys[starts], max(n_labels, 1))
+    return days.astype('datetime64[D]'), codes, counts
+
+def build_cube(dates, groups):
+    """
+    Count rows per day and group. The cube only holds the (day, group) pairs that occur, so
+    its size depends on the days and groups in the data, not on the number of rows, and every
+    granularity is derived from it by cube_rollup. Rows with a missing date or group are left out.
+
+    :param dates: Series of datetimes (timezone-aware dates are counted in UTC)
+    :param groups: Series of group values, aligned with dates
+    :return: Tuple of (days as datetime64[D] array, group labels, group codes array, counts array),
+             one entry per day and group, sorted by day
+    """
+    dates = pd.to_datetime(dates)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert(None)
+    days = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    codes, labels = group_codes(groups)
+
+    valid = ~np.isnat(days) & (codes >= 0)
+    days, codes, counts = _count_entries(days[valid].astype(np.int64), codes[valid].astype(np.int64),
+                                         np.ones(int(valid.sum()), dtype=np.int64), len(labels))
+    return days, labels, codes, counts
+
+def to_periods(days, freq):
+    """
+    Return the period each day falls in, as a datetime64 array in PERIOD_UNITS[freq].
+    """
+    if freq == 'W':
+        # Weeks start on Monday; the first day of the epoch was a Thursday
+        return days - (days.astype(np.int64) + 3) % 7
+    if freq == 'Q':
+        months = days.astype('datetime64[M]').astype(np.int64)
+        return (months - months % 3).astype('datetime64[M]')
+    return days.astype(PERIOD_UNITS[freq])
+
+def cube_rollup(cube, freq='M'):
+    """
+    Count the entries of a rollup cube per period and group. This takes one pass over the cube
+    entries, the rows the cube was built from are not needed.
+
+    :param cube: Result of build_cube
+    :param freq: One of GRANULARITIES
+    :return: Tuple of (periods as datetime64 array, group labels, counts array of shape [period, group]),
+             with only the periods that have at least one row
+    """
+    days, labels, codes, counts = cube
+    if not len(days):
+        return np.array([], dtype=PERIOD_UNITS[freq]), labels, np.zeros((0, len(labels)), dtype=np.int64)
+    # The days are sorted, so every period is one run of entries
+    periods = to_periods(days, freq)
+    starts = np.r_[True, periods[1:] != periods[:-1]]
+    rows = np.cumsum(starts) - 1
+    n_rows = int(rows[-1]) + 1
+    totals = np.bincount(rows * len(labels) + codes, weights=counts, minlength=n_rows * len(labels))
+    return periods[starts], labels, totals.astype(np.int64).reshape(n_rows, len(labels))
+
+def rollup(dates, groups, freq='M'):
+    """
+    Count rows per period and group, see build_cube and cube_rollup.
+
+    :param freq: One of GRANULARITIES
+    :return: Tuple of (periods as datetime64 array, group labels, counts array of shape [period, group])
+    """
+    return cube_rollup(build_cube(dates, groups), freq)
+
+def format_periods(periods, freq=None):
+    """
+    Return axis labels for rollup periods: integers for years, '2022-Q1' for quarters,
+    'YYYY-MM' for months and 'YYYY-MM-DD' for weeks (their Monday) and days.
+
+    :param freq: Granularity of the periods, by default the unit of their dtype
+    """
+    freq = freq or np.datetime_data(periods.dtype)[0]
+    if freq == 'Y':
+        return (periods.astype(np.int64) + 1970).tolist()
+    if freq == 'Q':
+        months = periods.astype('datetime64[M]').astype(np.int64)
+        return [f'{year}-Q{quarter}' for year, quarter in zip((months // 12 + 1970).tolist(), (months % 12 // 3 + 1).tolist())]
+    return np.datetime_as_string(periods, unit='M' if freq == 'M' else 'D').tolist()
+
+def ordered_columns(labels, totals, order=None):
+    """
+    Return the columns of the groups with any rows, those named in order first and in that order.
+    """
+    columns = {label: i for i, label in enumerate(labels)}
+    ordered = [columns[label] for label in (order or []) if label in columns]
+    ordered += [column for column in range(len(labels)) if column not in ordered]
+    return [column for column in ordered if totals[column] > 0]
+
+def stacked_bar_traces(periods, labels, counts, order=None, freq=None, max_traces=FIGURE_MAX_TRACES):
+    """
+    Create one bar trace per group with its count in every period. With more than max_traces
+    groups, the most counted ones keep their trace and the others are added up as 'Other'.
+
+    :param order: Labels that come first, in this order; groups without any rows are left out
+    :param freq: Granularity of the periods, see format_periods
+    :return: List of go.Bar traces
+    """
+    x = format_periods(periods, freq)
+    totals = counts.sum(axis=0)
+    ordered = ordered_columns(labels, totals, order)
+    if len(ordered) <= max_traces:
+        return [go.Bar(x=x, y=counts[:, column], name=str(labels[column])) for column in ordered]
+
+    kept = set(sorted(ordered, key=lambda column: -totals[column])[:max_traces - 1])
+    shown = [column for column in ordered if column in kept]
+    traces = [go.Bar(x=x, y=counts[:, column], name=str(labels[column])) for column in shown]
+    traces.append(go.Bar(x=x, y=counts.sum(axis=1) - counts[:, shown].sum(axis=1), name='Other'))
+    return traces
+
+def top_columns(counts, n):
+    """
+    Return the columns of the n highest counts in every row, highest first and equal counts by
+    column, like a stable argsort of the negated counts but with a partial selection per row.
+
+    :param counts: Array of shape [period, group]
+    :return: List of column arrays, one per row
+    """
+    n_columns = counts.shape[1]
+    if n >= n_columns:
+        return [np.lexsort((np.arange(n_columns), -row)) for row in counts]
+    # The n-th highest count of every row; higher counts are in, equal ones fill up by column
+    kth = np.partition(counts, n_columns - n, axis=1)[:, n_columns - n]
+    top = []
+    for row, threshold in zip(counts, kth):
+        above = np.flatnonzero(row > threshold)
+        columns = np.concatenate([above, np.flatnonzero(row == threshold)[:n - len(above)]])
+        top.append(columns[np.lexsort((columns, -row[columns]))])
+    return top
+
+def top_bar_traces(periods, labels, counts, n=10, freq=None, max_traces=FIGURE_MAX_TRACES):
+    """
+    Create bar traces for the n most counted groups of every period. Every group gets one
+    trace with a bar in each period where it is among the top n; traces are ordered by first
+    appearance going through the periods and then by count. When that would be more than
+    max_traces traces, the chart is packed instead, see packed_top_bar_traces.
+
+    :param freq: Granularity of the periods, see format_periods
+    :return: List of go.Bar traces
+    """
+    x = format_periods(periods, freq)
+    top = top_columns(counts, n)
+    shown = {column for row, columns in enumerate(top) for column in columns[counts[row, columns] > 0]}
+    if len(shown) > max_traces:
+        return packed_top_bar_traces(x, labels, counts, top)
+
+    bars = {}
+    for row, columns in enumerate(top):
+        for column in columns:
+            if counts[row, column] > 0:
+                bar = bars.setdefault(column, ([], []))
+                bar[0].append(x[row])
+                bar[1].append(int(counts[row, column]))
+    return [go.Bar(x=bar_x, y=bar_y, name=str(labels[column])) for column, (bar_x, bar_y) in bars.items()]
+
+def packed_top_bar_traces(x, labels, counts, top):
+    """
+    Create one trace per rank instead of one per group: the k-th trace holds the k-th most
+    counted group of every period, with the group names as hover data, and an 'Other' trace
+    holds the rest of every period. The number of traces no longer grows with the groups.
+
+    :param x: Axis labels of the periods
+    :param top: Result of top_columns(counts, n)
+    :return: List of go.Bar traces
+    """
+    n = max((len(columns) for columns in top), default=0)
+    values = np.zeros((len(x), n), dtype=np.int64)
+    names = np.full((len(x), n), '', dtype=object)
+    for row, columns in enumerate(top):
+        values[row, :len(columns)] = counts[row, columns]
+        names[row, :len(columns)] = [str(labels[column]) for column in columns]
+    names[values == 0] = ''
+
+    traces = [go.Bar(x=x, y=values[:, rank], customdata=names[:, rank], name=f'Top {rank + 1}',
+                     hovertemplate='%{customdata}<br>%{x}: %{y}<extra></extra>')
+              for rank in range(n) if values[:, rank].any()]
+    other = counts.sum(axis=1) - values.sum(axis=1)
+    if other.any():
+        traces.append(go.Bar(x=x, y=other, name='Other', marker_color='lightgray',
+                             hovertemplate='Other<br>%{x}: %{y}<extra></extra>'))
+    return traces
+
+def max_stack_height(traces):
+    """
+    Return the height of the highest stack of bars, e.g. to size the y-axis of a stacked chart.
+    """
+    heights = {}
+    for trace in traces:
+        for x, y in zip(trace.x, trace.y):
+            heights[x] = heights.get(x, 0) + y
+    return max(heights.values(), default=0)
+
+def client_aggregate(periods, labels, counts, freq=None, order=None, top_n=None, max_traces=FIGURE_MAX_TRACES):
+    """
+    Return a rollup as compact JSON data for the clientside callbacks in assets/visualization.js,
+    which filter, toggle and re-rank it in the browser the way stacked_bar_traces and
+    top_bar_traces do on the server.
+
+    :param order: Labels that come first in a stacked chart, see stacked_bar_traces
+    :param top_n: For top N charts, the most groups per period the browser can show; only those
+                  are kept, as [label index, count] pairs highest first, with the period totals
+    :return: Dict with the period labels ('x'), the group labels and their counts
+    """
+    x = format_periods(periods, freq)
+    if top_n is None:
+        columns = ordered_columns(labels, counts.sum(axis=0), order)
+        return {'kind': 'stacked', 'x': x, 'labels': [str(labels[column]) for column in columns],
+                'counts': counts[:, columns].T.tolist(), 'maxTraces': max_traces}
+
+    top = [columns[counts[row, columns] > 0] for row, columns in enumerate(top_columns(counts, top_n))]
+    used = np.unique(np.concatenate(top)) if top else np.array([], dtype=np.int64)
+    positions = np.zeros(len(labels), dtype=np.int64)
+    positions[used] = np.arange(len(used))
+    return {'kind': 'top', 'x': x, 'labels': [str(labels[column]) for column in used],
+            'top': [np.column_stack([positions[columns], counts[row, columns]]).tolist() for row, columns in enumerate(top)],
+            'totals': counts.sum(axis=1).tolist(), 'maxTraces': max_traces}
+
+def merge_cubes(first, second):
+    """
+    Add up two rollup cubes, e.g. of a dataset and of the rows appended to it. Labels of the
+    first cube keep their order and new labels of the second follow, as in a cube built over
+    the concatenated rows.
+
+    :return: Cube like build_cube
+    """
+    days_1, labels_1, codes_1, counts_1 = first
+    days_2, labels_2, codes_2, counts_2 = second
+    positions = {label: i for i, label in enumerate(labels_1)}
+    added = [label for label in labels_2 if label not in positions]
+    labels = np.asarray(list(labels_1) + added, dtype=object)
+    positions.update({label: len(labels_1) + i for i, label in enumerate(added)})
+    remap = np.array([positions[label] for label in labels_2], dtype=np.int64)
+
+    days, codes, counts = _count_entries(np.concatenate([days_1, days_2]).astype(np.int64),
+                                         np.concatenate([codes_1, remap[codes_2]]).astype(np.int64),
+                                         np.concatenate([counts_1, counts_2]), len(labels))
+    return days, labels, codes, counts
+
+def cube_to_frame(days, labels, codes, counts):
+    """
+    Return a rollup cube as a DataFrame with day, label and count columns, so it can be kept
+    in the dataset store. The labels are a categorical in their cube order.
+    """
+    return pd.DataFrame({'day': days.astype('datetime64[s]'),
+                         'label': pd.Categorical.from_codes(codes, categories=pd.Index(labels, dtype=object)),
+                         'count': counts})
+
+def cube_from_frame(frame):
+    """
+    Rebuild the (days, labels, codes, counts) of a rollup cube from cube_to_frame.
+    """
+    return (frame['day'].to_numpy().astype('datetime64[D]'), np.asarray(frame['label'].cat.categories, dtype=object),
+            frame['label'].cat.codes.to_numpy().astype(np.int64), frame['count'].to_numpy())
@@ -0,0 +1,209 @@
+import os
+import operator
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+# Rows shown per page of the data table
+TABLE_PAGE_SIZE = int(os.getenv('TABLE_PAGE_SIZE', 10))
+
+# Operators of the DataTable filter syntax with their symbol aliases
+FILTER_OPERATORS = [['ge ', '>='], ['le ', '<='], ['lt ', '<'], ['gt ', '>'], ['ne ', '!='], ['eq ', '='],
+                    ['contains '], ['datestartswith ']]
+
+COMPARISONS = {'ge': operator.ge, 'le': operator.le, 'lt': operator.lt, 'gt': operator.gt,
+               'ne': operator.ne, 'eq': operator.eq}
+
+# Length of a datestartswith prefix -> length of the date range it covers
+DATE_PREFIX_OFFSETS = {4: pd.DateOffset(years=1), 7: pd.DateOffset(months=1), 10: pd.DateOffset(days=1)}
+
+# id(df) -> (weak reference to df, {column: (ascending sort order, non-missing count, sorted datetime64 values)})
+_sort_orders = {}
+_sort_orders_lock = threading.Lock()
+
+def split_filter_part(filter_part):
+    """
+    Split one part of a DataTable filter query, e.g. '{Date} ge 2022-01-01', into its pieces.
+
+    :return: Tuple of (column, operator, value), or (None, None, None) if the part is not understood
+    """
+    for operator_type in FILTER_OPERATORS:
+        for operator_name in operator_type:
+            if operator_name in filter_part:
+                name_part, value_part = filter_part.split(operator_name, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ''
+                if v0 == value_part[-1:] and v0 in ("'", '"', '`'):
+                    value = value_part[1: -1].replace('\\' + v0, v0)
+                elif operator_type[0] in ('contains ', 'datestartswith '):
+                    # Text operators take the value as typed, '999' must not become '999.0'
+                    value = value_part
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                # Word operators need spaces after them in the filter string, but we don't want these later
+                return name, operator_type[0].strip(), value
+    return None, None, None
+
+def parse_filter_query(filter_query):
+    """
+    Return the (column, operator, value) conditions of a DataTable filter query.
+    """
+    if not filter_query:
+        return []
+    conditions = [split_filter_part(part) for part in filter_query.split(' && ')]
+    return [condition for condition in conditions if condition[0] is not None]
+
+def sort_order(df, column):
+    """
+    Return the row positions of df sorted by a column (missing values last), the number of
+    non-missing values and, for datetime columns, the sorted non-missing values as UTC datetime64.
+    This is computed once per DataFrame and column and then reused by every page request.
+    """
+    with _sort_orders_lock:
+        ref, orders = _sort_orders.get(id(df), (None, None))
+        if ref is None or ref() is not df:
+            orders = {}
+            _sort_orders[id(df)] = (weakref.ref(df, lambda _, key=id(df): _sort_orders.pop(key, None)), orders)
+        if column in orders:
+            return orders[column]
+    # Sorted outside the lock; concurrent page requests for the same column keep the first result
+    values = df[column].reset_index(drop=True)
+    order = values.sort_values(kind='stable', na_position='last').index.to_numpy(dtype=np.int64)
+    valid = int(values.notna().sum())
+    sorted_dates = None
+    if pd.api.types.is_datetime64_any_dtype(values):
+        sorted_dates = values.to_numpy(dtype='datetime64[ns]')[order[:valid]]
+    with _sort_orders_lock:
+        return orders.setdefault(column, (order, valid, sorted_dates))
+
+def _date_value(series, value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # '{Date} ge 2022' arrives as 2022.0
+    timestamp = pd.Timestamp(str(value))
+    if series.dt.tz is not None:
+        timestamp = timestamp.tz_localize(series.dt.tz) if timestamp.tzinfo is None else timestamp
+        timestamp = timestamp.tz_convert(None)
+    elif timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
+    return timestamp.to_datetime64().astype('datetime64[ns]')
+
+def _date_range(df, column, operator_name, value):
+    # Positions [lo, hi) in the sort order of a datetime column that satisfy the condition
+    _, valid, sorted_dates = sort_order(df, column)
+    series = df[column]
+    if operator_name == 'datestartswith':
+        text = str(value)
+        if len(text) not in DATE_PREFIX_OFFSETS:
+            raise ValueError(f"Unsupported date prefix: {text}")
+        start = pd.Timestamp(text)
+        end = start + DATE_PREFIX_OFFSETS[len(text)]
+        return (int(np.searchsorted(sorted_dates, _date_value(series, start), side='left')),
+                int(np.searchsorted(sorted_dates, _date_value(series, end), side='left')))
+    timestamp = _date_value(series, value)
+    lo, hi = 0, valid
+    if operator_name in ('ge', 'gt', 'eq'):
+        lo = int(np.searchsorted(sorted_dates, timestamp, side='right' if operator_name == 'gt' else 'left'))
+    if operator_name in ('le', 'lt', 'eq'):
+        hi = int(np.searchsorted(sorted_dates, timestamp, side='left' if operator_name == 'lt' else 'right'))
+    return lo, max(lo, hi)
+
+def _evaluate(values, operator_name, value):
+    if operator_name == 'contains':
+        return values.astype(str).str.contains(str(value), case=False, regex=False).to_numpy(dtype=bool)
+    if operator_name == 'datestartswith':
+        return values.astype(str).str.startswith(str(value)).to_numpy(dtype=bool)
+    try:
+        return np.asarray(COMPARISONS[operator_name](values, value), dtype=bool)
+    except TypeError:
+        # e.g. '{Title} ge 3': nothing matches instead of failing the page request
+        return np.zeros(len(values), dtype=bool)
+
+def condition_mask(df, column, operator_name, value):
+    """
+    Return a boolean mask of the rows that satisfy one filter condition. Categorical columns
+    are evaluated once per category instead of once per row.
+    """
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        category_mask = _evaluate(pd.Series(series.cat.categories), operator_name, value)
+        # Code -1 (missing) picks the appended value: a missing value only passes 'ne'
+        return np.append(category_mask, operator_name == 'ne')[series.cat.codes.to_numpy()]
+    if pd.api.types.is_datetime64_any_dtype(series) and operator_name != 'contains':
+        order, _, _ = sort_order(df, column)
+        lo, hi = _date_range(df, column, operator_name, value)
+        mask = np.zeros(len(df), dtype=bool)
+        mask[order[lo:hi]] = True
+        if operator_name == 'ne':
+            mask = ~mask & series.notna().to_numpy()
+        return mask
+    return _evaluate(series, operator_name, value)
+
+def query_rows(df, sort_by=None, filter_query=None):
+    """
+    Return the row positions of df that pass the filter, in display order.
+
+    Without a filter, or with only date conditions on the sort column, the rows are a slice of a
+    cached sort order; other filters build a vectorized mask over the rows.
+
+    :param sort_by: DataTable sort_by property, only the first column is used
+    :param filter_query: DataTable filter_query property
+    :return: Row positions as a NumPy array or range
+    """
+    # Sort and filter columns come from the client, the ones df does not have are ignored
+    conditions = [condition for condition in parse_filter_query(filter_query) if condition[0] in df.columns]
+    sort_column = sort_by[0].get('column_id') if sort_by else None
+    if sort_column not in df.columns:
+        sort_column = None
+    descending = sort_column is not None and sort_by[0].get('direction') == 'desc'
+
+    if sort_column is None:
+        if not conditions:
+            return range(len(df))
+        date_columns = {column for column, _, _ in conditions if pd.api.types.is_datetime64_any_dtype(df[column])}
+        if len(date_columns) == 1 and all(column in date_columns and op != 'ne' for column, op, _ in conditions):
+            # Date range filters alone are answered from the sorted dates
+            sort_column = date_columns.pop()
+
+    if sort_column is not None:
+        order, valid, _ = sort_order(df, sort_column)
+    else:
+        order, valid = np.arange(len(df)), len(df)
+
+    if conditions and all(column == sort_column and op != 'ne' and op != 'contains' for column, op, _ in conditions) \
+            and pd.api.types.is_datetime64_any_dtype(df[sort_column]):
+        lo, hi = 0, valid
+        for column, op, value in conditions:
+            condition_lo, condition_hi = _date_range(df, column, op, value)
+            lo, hi = max(lo, condition_lo), min(hi, condition_hi)
+        rows = order[lo:max(lo, hi)]
+        return rows[::-1] if descending else rows
+
+    if descending:
+        order = np.concatenate([order[:valid][::-1], order[valid:]])
+    if not conditions:
+        return order
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in conditions:
+        mask &= condition_mask(df, column, op, value)
+    return order[mask[order]]
+
+def query_page(df, page_current=0, page_size=TABLE_PAGE_SIZE, sort_by=None, filter_query=None):
+    """
+    Return one page of df for a DataTable with custom paging, sorting and filtering.
+
+    :return: Tuple of (page DataFrame, page count, page number actually shown)
+    """
+    # The page size comes from the client, it is kept to 1..TABLE_PAGE_SIZE rows
+    page_size = min(max(int(page_size or TABLE_PAGE_SIZE), 1), TABLE_PAGE_SIZE)
+    rows = query_rows(df, sort_by, filter_query)
+    page_count = max(1, -(-len(rows) // page_size))
+    page_current = min(max(int(page_current or 0), 0), page_count - 1)
+    start = page_current * page_size
+    return df.iloc[rows[start:start + page_size]], page_count, page_current
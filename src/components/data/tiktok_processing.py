@@ -1,59 +1,130 @@
 import logging
-import base64
 import json
+import ijson
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 from dash import html, dash_table, dcc
+from src.components.data.general_utils import open_upload_source
+from src.components.data.rollups import GRANULARITIES, build_cube, cube_rollup, stacked_bar_traces, client_aggregate
 
-def parse_tiktok_contents(contents):
+TIKTOK_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Item prefixes (in ijson notation) of the only lists flatten_tiktok_data reads.
+# Older exports use 'Favorite'/'Liked' instead of 'Favorite Videos'/'Like List'.
+TIKTOK_SECTION_PREFIXES = {
+    'Activity.Video Browsing History.VideoList.item': ('Video Browsing History', 'VideoList'),
+    'Activity.Favorite Videos.FavoriteVideoList.item': ('Favorite Videos', 'FavoriteVideoList'),
+    'Activity.Favorite.FavoriteVideoList.item': ('Favorite', 'FavoriteVideoList'),
+    'Activity.Like List.ItemFavoriteList.item': ('Like List', 'ItemFavoriteList'),
+    'Activity.Liked.ItemFavoriteList.item': ('Liked', 'ItemFavoriteList'),
+}
+
+def stream_tiktok_sections(fileobj):
+    """
+    Walk a TikTok user_data.json once and build only the lists used by flatten_tiktok_data.
+
+    Everything outside TIKTOK_SECTION_PREFIXES (messages, comments, settings, ...) is skipped
+    as parser events, so peak memory follows the size of the extracted lists instead of the file.
+
+    :param fileobj: Binary file-like object containing the JSON document
+    :return: Dict shaped like the original document, restricted to the extracted sections
+    """
+    activity = {}
+    builder = None
+    depth = 0
+    for prefix, event, value in ijson.parse(fileobj, use_float=True):
+        if builder is None:
+            if prefix not in TIKTOK_SECTION_PREFIXES or event in ('end_map', 'end_array'):
+                continue
+            section, list_key = TIKTOK_SECTION_PREFIXES[prefix]
+            target = activity.setdefault(section, {}).setdefault(list_key, [])
+            builder = ijson.ObjectBuilder()
+            depth = 0
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+        if depth == 0:
+            target.append(builder.value)
+            builder = None
+    return {'Activity': activity}
+
+def parse_tiktok_contents(contents, streaming=True):
+    """
+    Parse an uploaded TikTok user_data.json.
+
+    :param contents: Data URI string, raw bytes, LocalFile or binary file-like object
+    :param streaming: Use the event-based parser that only materializes the Activity lists
+                      (default); set to False to load the full document with json.loads
+    :return: Parsed JSON content
+    """
     # Ensure contents is a single string, if it's a list, get the first element
     if isinstance(contents, list):
         contents = contents[0]
-    
-    _, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    parsed_data = json.loads(decoded.decode('utf-8'))
+
+    with open_upload_source(contents) as fileobj:
+        if streaming:
+            parsed_data = stream_tiktok_sections(fileobj)
+        else:
+            parsed_data = json.load(fileobj)
     logging.debug(f"Parsed TikTok Data Keys: {parsed_data.keys()}")
     return parsed_data
 
 def flatten_tiktok_data(data, selected_sections):
     logging.debug(f"Flattening TikTok data for sections: {selected_sections}")
     flat_tiktok_data = []
+    sources = []
 
     if 'video_history' in selected_sections:
         video_history = data.get('Activity', {}).get('Video Browsing History', {}).get('VideoList', [])
-        for video in video_history:
-            video['Source'] = 'Browsing'
         flat_tiktok_data.extend(video_history)
+        sources.extend(['Browsing'] * len(video_history))
 
     if 'favorite_video' in selected_sections:
         favorite_video_history = data.get('Activity', {}).get('Favorite Videos', {}).get('FavoriteVideoList', [])
         if not favorite_video_history:
             favorite_video_history = data.get('Activity', {}).get('Favorite', {}).get('FavoriteVideoList', [])
-        for video in favorite_video_history:
-            video['Source'] = 'Favorite'
         flat_tiktok_data.extend(favorite_video_history)
+        sources.extend(['Favorite'] * len(favorite_video_history))
 
     if 'item_favorite' in selected_sections:
         item_favorite_list = data.get('Activity', {}).get('Like List', {}).get('ItemFavoriteList', [])
         if not item_favorite_list:
             item_favorite_list = data.get('Activity', {}).get('Liked', {}).get('ItemFavoriteList', [])
-        for video in item_favorite_list:
-            video['Source'] = 'Liked'
         flat_tiktok_data.extend(item_favorite_list)
+        sources.extend(['Liked'] * len(item_favorite_list))
 
     if flat_tiktok_data:
-        return pd.DataFrame(flat_tiktok_data)
+        tiktok_df = pd.DataFrame(flat_tiktok_data)
+        tiktok_df['Source'] = sources
+        if 'Date' in tiktok_df.columns:
+            # Parse all dates in one vectorized call with the known export format
+            tiktok_df['Date'] = pd.to_datetime(tiktok_df['Date'], format=TIKTOK_DATE_FORMAT, errors='coerce')
+        return tiktok_df
     else:
         raise ValueError("No relevant data found in the selected sections.")
     
-def create_video_history_graph(df):
-    df['Date'] = pd.to_datetime(df['Date'])
-    category_counts_per_date = df.groupby([df['Date'].dt.to_period('M'), 'Source']).size().unstack(fill_value=0)
-    category_counts_per_date = category_counts_per_date.reset_index()
-    category_counts_per_date['Date'] = category_counts_per_date['Date'].astype(str)
-    fig = px.bar(category_counts_per_date, x='Date', y=['Browsing', 'Favorite', 'Liked'], 
-                 title="Watched Videos per Month", labels={'value': 'Number of Videos', 'variable': 'Source'}, barmode='stack')
+def video_history_cube(df):
+    """
+    Count watched videos per day and source, the rollup cube behind create_video_history_graph.
+    """
+    return build_cube(df['Date'], df['Source'])
+
+# Sources in the order they are stacked
+SOURCE_ORDER = ['Browsing', 'Favorite', 'Liked']
+
+def video_history_aggregate(cube, freq='M'):
+    """
+    Counts behind create_video_history_graph for the clientside callbacks, see client_aggregate.
+    """
+    return client_aggregate(*cube_rollup(cube, freq), freq=freq, order=SOURCE_ORDER)
+
+def create_video_history_graph(df, cube=None, freq='M'):
+    periods, sources, counts = cube_rollup(cube if cube is not None else video_history_cube(df), freq)
+    fig = go.Figure(stacked_bar_traces(periods, sources, counts, order=SOURCE_ORDER, freq=freq))
+    fig.update_layout(title=f"Watched Videos per {GRANULARITIES[freq]}", barmode='stack', xaxis_title='Date',
+                      yaxis_title='Number of Videos', legend_title='Source')
     fig.update_layout({
         'plot_bgcolor': 'white',
         'paper_bgcolor': 'white',
@@ -0,0 +1,139 @@
+import binascii
+import io
+import os
+import posixpath
+import zipfile
+
+# Decoded bytes produced per base64 block when reading a data URI, a multiple of 3
+DECODE_BLOCK_SIZE = 3 * 64 * 1024
+
+def data_uri_payload_offset(contents):
+    """
+    Return the index where the base64 payload of a data URI starts, without splitting the string.
+    """
+    return contents.index(',', 0, 256) + 1
+
+def decoded_size(contents):
+    """
+    Return the number of bytes a base64 data URI decodes to, without decoding it.
+    """
+    payload_length = len(contents) - data_uri_payload_offset(contents)
+    return payload_length // 4 * 3 - contents.count('=', len(contents) - 2)
+
+class DataURIReader(io.RawIOBase):
+    """
+    Binary stream of the decoded bytes of a base64 data URI. The payload is decoded block by
+    block straight from the string, so it is never split off, copied or decoded as a whole.
+    """
+
+    def __init__(self, contents, block_size=DECODE_BLOCK_SIZE):
+        self._contents = contents
+        self._position = data_uri_payload_offset(contents)
+        self._chars_per_block = max(block_size // 3, 1) * 4
+        self._pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        if not self._pending:
+            if self._position >= len(self._contents):
+                return 0
+            chars = min(self._chars_per_block, max(-(-len(view) // 3), 1) * 4)
+            block = self._contents[self._position:self._position + chars]
+            self._position += chars
+            self._pending = memoryview(binascii.a2b_base64(block))
+        size = min(len(view), len(self._pending))
+        view[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def readall(self):
+        # Joining whole blocks once keeps the peak at about twice the decoded size
+        blocks = [bytes(self._pending)]
+        self._pending = memoryview(b'')
+        while self._position < len(self._contents):
+            blocks.append(binascii.a2b_base64(self._contents[self._position:self._position + self._chars_per_block]))
+            self._position += self._chars_per_block
+        return b''.join(blocks)
+
+class LocalFile:
+    """
+    A file on the server that the application itself handed to the parsers, e.g. a saved upload
+    reopened in a parse worker. Strings are never opened as paths: upload contents come from
+    the client, so only this wrapper marks a path as trusted.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __eq__(self, other):
+        return isinstance(other, LocalFile) and other.path == self.path
+
+    def __repr__(self):
+        return f'LocalFile({self.path!r})'
+
+def check_data_uri(contents):
+    """
+    Raise ValueError unless a string from the client is a data URI.
+    """
+    if not contents.startswith('data:'):
+        raise ValueError("Uploaded contents must be a data URI")
+
+def open_upload_source(contents):
+    """
+    Return a binary file-like object for an uploaded file.
+
+    :param contents: Data URI string from dcc.Upload, raw bytes, a LocalFile or an open binary file
+    :return: Binary file-like object with the decoded file contents
+    """
+    if isinstance(contents, LocalFile):
+        return open(contents.path, 'rb')
+    if isinstance(contents, str):
+        check_data_uri(contents)
+        return io.BufferedReader(DataURIReader(contents), buffer_size=DECODE_BLOCK_SIZE)
+    if isinstance(contents, (bytes, bytearray)):
+        return io.BytesIO(contents)
+    return contents
+
+def picklable_source(contents):
+    """
+    Return an upload source that can be sent to another process: files that live on disk are
+    reopened there as a LocalFile, other open files are read into bytes.
+    """
+    name = getattr(contents, 'name', None)
+    # Only real files: the name of e.g. a ZIP member could match an unrelated local file
+    if isinstance(name, str) and isinstance(getattr(contents, 'raw', contents), io.FileIO) and os.path.isfile(name):
+        return LocalFile(name)
+    if hasattr(contents, 'read'):
+        return contents.read()
+    return contents
+
+def open_archive_members(source, names, max_size):
+    """
+    Open the members of a ZIP archive whose file name, in any folder, is one of names. Only
+    the central directory is read here; every member is decompressed as a stream while it is
+    read and the other members are never read at all.
+
+    :param source: Seekable binary file or path of the archive
+    :param names: File names to look for, e.g. ['watch-history.json']
+    :param max_size: Maximum total uncompressed size of the opened members
+    :return: Tuple of (ZipFile, list of open member streams); close the members, then the ZipFile
+    """
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise ValueError("The file is not a valid ZIP archive")
+    try:
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and posixpath.basename(info.filename) in names]
+        if not members:
+            raise ValueError(f"None of {', '.join(names)} was found in the ZIP archive")
+        # Members can not decompress to more than their recorded size, so this bounds what is read
+        if sum(info.file_size for info in members) > max_size:
+            raise ValueError("The files in the ZIP archive are too large")
+        return archive, [archive.open(info) for info in members]
+    except Exception:
+        archive.close()
+        raise
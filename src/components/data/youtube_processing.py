@@ -1,60 +1,73 @@
-import base64
 import json
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 from dash import html, dash_table, dcc
+from src.components.data.general_utils import open_upload_source
+from src.components.data.rollups import (GRANULARITIES, CLIENT_TOP_N, build_cube, cube_rollup, top_bar_traces,
+                                         max_stack_height, client_aggregate, format_periods)
 
 def parse_youtube_contents(contents):
     # Ensure contents is a single string, if it's a list, get the first element
     if isinstance(contents, list):
         contents = contents[0]
         
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    data = json.loads(decoded.decode('utf-8'))  # Decode to string before JSON parsing
+    with open_upload_source(contents) as fileobj:
+        data = json.load(fileobj)
 
-    all_videos = []
+    titles, links, times, channel_names, channel_urls = [], [], [], [], []
 
-    # Extract watch history from the uploaded file
+    # Extract watch history from the uploaded file into plain column lists
     watch_history = data if isinstance(data, list) else data.get('watch-history', [])
     for video in watch_history:
-        video_details = {
-            'Title': video.get('title', 'No Title'),
-            'Link': video.get('titleUrl', 'No URL'),
-            'Date': pd.to_datetime(video.get('time', 'No Date')),  # Convert timestamp to datetime
-            'Channel Name': video.get('subtitles', [{}])[0].get('name', 'No Channel Name'),
-            'Channel URL': video.get('subtitles', [{}])[0].get('url', 'No Channel URL')
-        }
-        all_videos.append(video_details)
+        channel = video.get('subtitles', [{}])[0]
+        titles.append(video.get('title', 'No Title'))
+        links.append(video.get('titleUrl', 'No URL'))
+        times.append(video.get('time'))
+        channel_names.append(channel.get('name', 'No Channel Name'))
+        channel_urls.append(channel.get('url', 'No Channel URL'))
 
-    if all_videos:
-        youtube_df = pd.DataFrame(all_videos)
+    if titles:
+        youtube_df = pd.DataFrame({
+            'Title': titles,
+            'Link': links,
+            # Convert all ISO 8601 timestamps in a single vectorized call
+            'Date': pd.to_datetime(times, format='ISO8601', utc=True, errors='coerce'),
+            'Channel Name': channel_names,
+            'Channel URL': channel_urls
+        })
         return youtube_df
     else:
         raise ValueError("No relevant data found in the selected sections.")
 
-def create_watch_history_graph(df):
+def watch_history_cube(df):
+    """
+    Count watches per day and channel, leaving out videos without a channel.
+    """
+    channels = df['Channel Name'].where(df['Channel Name'] != 'No Channel Name')
+    return build_cube(df['Date'], channels)
+
+def watch_history_aggregate(cube, freq='Y'):
+    """
+    Counts behind create_watch_history_graph for the clientside callbacks, see client_aggregate.
+    """
+    return client_aggregate(*cube_rollup(cube, freq), freq=freq, top_n=CLIENT_TOP_N)
+
+def create_watch_history_graph(df, cube=None, freq='Y'):
     """
-    Create a visually appealing and insightful bar chart of the most watched channels per year.
+    Create a visually appealing and insightful bar chart of the most watched channels per period.
     :param df: DataFrame containing the YouTube data
+    :param cube: Result of watch_history_cube(df) when it is already known
+    :param freq: Granularity of the periods, one of GRANULARITIES
     :return: Plotly Figure
     """
-    # Filter out rows with 'No Channel Name'
-    df = df[df['Channel Name'] != 'No Channel Name']
-    
-    # Aggregate watch data by year and channel name
-    df['Year'] = df['Date'].dt.year
-    watch_summary = df.groupby(['Year', 'Channel Name']).size().reset_index(name='Watch Count')
-    
-    # Get top 10 channels per year
-    top_channels_per_year = watch_summary.sort_values(['Year', 'Watch Count'], ascending=[True, False]) \
-        .groupby('Year').head(10)
+    # Keep the top 10 channels of every period
+    periods, channel_names, counts = cube_rollup(cube if cube is not None else watch_history_cube(df), freq)
+    traces = top_bar_traces(periods, channel_names, counts, n=10, freq=freq)
+    max_count = max_stack_height(traces)
 
     # Create the bar chart
-    fig = px.bar(top_channels_per_year, x='Year', y='Watch Count', color='Channel Name',
-                 title='Top 10 Most Watched Channels Per Year',
-                 labels={'Year': 'Year', 'Watch Count': 'Watch Count', 'Channel Name': 'Channel Name'},
-                 color_discrete_sequence=px.colors.qualitative.Plotly)
+    fig = go.Figure(traces)
+    fig.update_layout(barmode='relative')
 
     # Update layout for better appearance and insights
     fig.update_layout({
@@ -65,7 +78,7 @@ def create_watch_history_graph(df):
             'family': "Arial, Helvetica, sans-serif",
         },
         'title': {
-            'text': 'Top 10 Most Watched Channels Per Year',
+            'text': f'Top 10 Most Watched Channels Per {GRANULARITIES[freq]}',
             'x': 0.5,
             'xanchor': 'center',
             'font': {
@@ -75,12 +88,11 @@ def create_watch_history_graph(df):
             }
         },
         'xaxis': {
-            'title': 'Year',
+            'title': GRANULARITIES[freq],
             'showgrid': False,
             'linecolor': '#2c3e50',
             'tickfont': {'size': 12, 'family': "Arial, Helvetica, sans-serif"},
             'tickangle': 0,
-            'dtick': 1,  # Set tick interval to 1 year
         },
         'yaxis': {
             'title': 'Watch Count',
@@ -88,7 +100,7 @@ def create_watch_history_graph(df):
             'gridcolor': '#e5e5e5',
             'linecolor': '#2c3e50',
             'tickfont': {'size': 12, 'family': "Arial, Helvetica, sans-serif"},
-            'range': [0, 1.2 * top_channels_per_year['Watch Count'].max()],  # Set y-axis range
+            'range': [0, 1.2 * max_count],  # Set y-axis range
         },
         'legend': {
             'title': 'Channel Name',
@@ -107,6 +119,11 @@ def create_watch_history_graph(df):
         'height': 600,  # Set the height of the graph
     })
 
+    # Keep the periods in time order; by default a category axis (quarters) follows the traces
+    fig.update_xaxes(categoryorder='array', categoryarray=format_periods(periods, freq))
+    if freq == 'Y':
+        # Label every year; the other periods are dates, where dtick would count milliseconds
+        fig.update_xaxes(dtick=1)
     return fig
 
 def create_description():
@@ -0,0 +1,254 @@
+# src/components/dataset_store.py
+
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from src.components.security_utils import get_session_key
+
+# 'memory' keeps datasets in the worker process; 'disk' shares them between gunicorn workers
+DATASET_STORE_BACKEND = os.getenv('DATASET_STORE_BACKEND', 'memory')
+
+# Directory used by the disk backend (a tmpfs mount keeps it in memory, see docker-compose.yml)
+DATASET_STORE_DIR = os.getenv('DATASET_STORE_DIR', os.path.join(tempfile.gettempdir(), 'data-mirroring-datasets'))
+
+# Total bytes of datasets kept per worker (memory) or on disk, least recently used are evicted first
+DATASET_STORE_BUDGET = int(os.getenv('DATASET_STORE_BUDGET', 1024 * 1024 * 1024))
+
+# Datasets the disk backend keeps unpickled per process after reading them
+DATASET_READ_CACHE = int(os.getenv('DATASET_READ_CACHE', 2))
+
+# Seconds a dataset survives without being used; main.py aligns this with PERMANENT_SESSION_LIFETIME
+DATASET_TTL = 30 * 60
+
+# Frames stored next to a session dataset so later uploads can be appended to it without
+# recomputing: its row hash index (see data/appends.py) and the rollup cube behind its figure
+# (see data/rollups.py)
+SESSION_COMPANIONS = ('index', 'cube')
+
+_KEY_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+def dataset_size(df):
+    """
+    Return the in-memory size of a DataFrame in bytes.
+    """
+    return int(df.memory_usage(deep=True).sum())
+
+class MemoryDatasetStore:
+    """
+    LRU store of DataFrames inside the current process, bounded by total size and idle time.
+    """
+
+    def __init__(self, budget=DATASET_STORE_BUDGET, ttl=DATASET_TTL, clock=time.time):
+        self.budget = budget
+        self.ttl = ttl
+        self.clock = clock
+        self.size = 0
+        self._items = OrderedDict()  # key -> (df, size, expires_at), least recently used first
+        self._lock = threading.RLock()
+
+    def put(self, key, df):
+        size = dataset_size(df)
+        if size > self.budget:
+            raise ValueError("Dataset is too large for the dataset store")
+        with self._lock:
+            self.delete(key)
+            self.purge_expired()
+            while self._items and self.size + size > self.budget:
+                evicted_key, (_, evicted_size, _) = self._items.popitem(last=False)
+                self.size -= evicted_size
+                logging.info(f"Evicted dataset {evicted_key} ({evicted_size} bytes) from the memory store")
+            self._items[key] = (df, size, self.clock() + self.ttl)
+            self.size += size
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            df, size, expires_at = item
+            if expires_at <= self.clock():
+                self.delete(key)
+                return None
+            # Like the permanent session, the lifetime is refreshed on every use
+            self._items[key] = (df, size, self.clock() + self.ttl)
+            self._items.move_to_end(key)
+            return df
+
+    def delete(self, key):
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None:
+                self.size -= item[1]
+
+    def purge_expired(self):
+        with self._lock:
+            now = self.clock()
+            for key in [key for key, (_, _, expires_at) in self._items.items() if expires_at <= now]:
+                self.delete(key)
+
+class DiskDatasetStore:
+    """
+    Store of pickled DataFrames in a directory shared by all workers, bounded by total file
+    size and idle time. File modification times double as last-use times for LRU and TTL.
+    The most recently read datasets are also kept unpickled in the process, so repeated reads
+    (e.g. paging through the data table) do not load the whole file every time.
+    """
+
+    def __init__(self, directory=DATASET_STORE_DIR, budget=DATASET_STORE_BUDGET, ttl=DATASET_TTL, clock=time.time,
+                 read_cache=DATASET_READ_CACHE):
+        self.directory = directory
+        self.budget = budget
+        self.ttl = ttl
+        self.clock = clock
+        self.read_cache = read_cache
+        self._recent = OrderedDict()  # path -> ((inode, size, mtime), df), least recently read first
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        if not _KEY_PATTERN.fullmatch(key):
+            raise ValueError("Invalid dataset key")
+        return os.path.join(self.directory, key + '.pkl')
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def put(self, key, df):
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        df.to_pickle(temp_path)
+        size = os.path.getsize(temp_path)
+        if size > self.budget:
+            os.remove(temp_path)
+            raise ValueError("Dataset is too large for the dataset store")
+        os.replace(temp_path, path)
+        now = self.clock()
+        os.utime(path, (now, now))
+        self.purge_expired()
+
+        entries = self._entries()
+        total = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, entry_path in entries:
+            if total <= self.budget:
+                break
+            if entry_path != path:
+                self._remove(entry_path)
+                total -= entry_size
+                logging.info(f"Evicted dataset {entry_path} ({entry_size} bytes) from the disk store")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                if stat.st_mtime + self.ttl <= self.clock():
+                    self._remove(path)
+                    return None
+                # Files are only ever replaced, never rewritten in place; the modification time
+                # tells apart a new file that got the inode and size of an old one
+                version = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+                with self._lock:
+                    recent = self._recent.pop(path, None)
+                if recent is not None and recent[0] == version:
+                    df = recent[1]
+                else:
+                    import pandas as pd
+                    df = pd.read_pickle(file)
+                # Touch the file that was read, not one that replaced it in the meantime
+                now = self.clock()
+                os.utime(file.fileno(), (now, now))
+                if self.read_cache > 0:
+                    version = (stat.st_ino, stat.st_size, os.fstat(file.fileno()).st_mtime_ns)
+                    with self._lock:
+                        self._recent[path] = (version, df)
+                        while len(self._recent) > self.read_cache:
+                            self._recent.popitem(last=False)
+        except FileNotFoundError:
+            return None
+        return df
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def purge_expired(self):
+        now = self.clock()
+        for mtime, _, path in self._entries():
+            if mtime + self.ttl <= now:
+                self._remove(path)
+
+    def _remove(self, path):
+        with self._lock:
+            self._recent.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def create_dataset_store(backend=DATASET_STORE_BACKEND, **kwargs):
+    """
+    Create a dataset store for the given backend ('memory' or 'disk').
+    """
+    if backend == 'memory':
+        return MemoryDatasetStore(**kwargs)
+    elif backend == 'disk':
+        return DiskDatasetStore(**kwargs)
+    raise ValueError(f"Unknown dataset store backend: {backend}")
+
+_dataset_store = None
+_dataset_store_lock = threading.Lock()
+
+def configure_dataset_store(**kwargs):
+    """
+    Replace the process-wide dataset store, e.g. to align its TTL with the session lifetime.
+    """
+    global _dataset_store
+    store = create_dataset_store(**kwargs)
+    with _dataset_store_lock:
+        _dataset_store = store
+    return store
+
+def get_dataset_store():
+    global _dataset_store
+    with _dataset_store_lock:
+        if _dataset_store is None:
+            _dataset_store = create_dataset_store()
+        return _dataset_store
+
+def save_session_dataset(df, **companions):
+    """
+    Store the parsed DataFrame for the current session, with any of the SESSION_COMPANIONS
+    frames. Companions that are not given are dropped, they belonged to the previous dataset.
+    """
+    store = get_dataset_store()
+    key = get_session_key()
+    store.put(key, df)
+    for name in SESSION_COMPANIONS:
+        if companions.get(name) is not None:
+            store.put(f'{key}-{name}', companions[name])
+        else:
+            store.delete(f'{key}-{name}')
+
+def load_session_dataset():
+    """
+    Return the DataFrame stored for the current session, or None if there is none (anymore).
+    """
+    return get_dataset_store().get(get_session_key())
+
+def load_session_companion(name):
+    """
+    Return a companion frame of the session dataset (see SESSION_COMPANIONS), or None if it
+    was not stored or has been evicted.
+    """
+    return get_dataset_store().get(f'{get_session_key()}-{name}')
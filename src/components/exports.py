@@ -0,0 +1,108 @@
+# src/components/exports.py
+
+import io
+import os
+import zlib
+
+# Rows rendered per chunk when streaming an export, which bounds the memory used per download
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 10000))
+
+# Rows per Parquet row group / Arrow record batch in the binary exports; larger groups compress better
+EXPORT_ROW_GROUP_ROWS = int(os.getenv('EXPORT_ROW_GROUP_ROWS', 100000))
+
+# format -> (file name, mimetype, supported compressions with the default first)
+BINARY_EXPORTS = {
+    'parquet': ('data.parquet', 'application/vnd.apache.parquet', ('zstd', 'snappy')),
+    'feather': ('data.feather', 'application/vnd.apache.arrow.file', ('zstd', 'lz4', 'uncompressed'))
+}
+
+def iter_csv_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Render a DataFrame as CSV text chunk by chunk; the concatenated chunks equal df.to_csv().
+
+    :param df: DataFrame to export
+    :param chunk_rows: Number of rows rendered at a time
+    :return: Generator of CSV strings
+    """
+    yield df.iloc[:0].to_csv()
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(header=False)
+
+def iter_encoded(chunks, compression=None):
+    """
+    Encode text chunks as UTF-8, optionally gzip-compressing them as a single stream.
+
+    :param chunks: Iterable of strings
+    :param compression: None or 'gzip'
+    :return: Generator of bytes
+    """
+    if compression is None:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+        return
+    if compression != 'gzip':
+        raise ValueError(f"Unsupported compression: {compression}")
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file that keeps what was written until it is drained, so a writer's output
+    can be streamed while the writer is still open.
+    """
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+def iter_binary_chunks(df, file_format, compression=None, chunk_rows=EXPORT_ROW_GROUP_ROWS):
+    """
+    Write a DataFrame as a Parquet or Feather (Arrow IPC) file chunk by chunk, keeping the
+    timestamp and categorical dtypes. Only one row group is converted at a time.
+
+    :param df: DataFrame to export
+    :param file_format: 'parquet' or 'feather'
+    :param compression: One of the format's compressions in BINARY_EXPORTS, None for the default
+    :param chunk_rows: Number of rows per row group (Parquet) or record batch (Feather)
+    :return: Generator of bytes
+    """
+    if file_format not in BINARY_EXPORTS:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    compressions = BINARY_EXPORTS[file_format][2]
+    compression = compression or compressions[0]
+    if compression not in compressions:
+        raise ValueError(f"Unsupported compression: {compression}")
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    sink = _ChunkSink()
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema, compression=compression)
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=None if compression == 'uncompressed' else compression)
+        writer = pa.ipc.new_file(sink, schema, options=options)
+    with writer:
+        for start in range(0, len(df), chunk_rows):
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,77 @@
+# src/components/jobs.py
+
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dash import DiskcacheManager
+
+# Parse uploads in Dash background callbacks so gunicorn workers are not blocked while parsing
+BACKGROUND_CALLBACKS = os.getenv('BACKGROUND_CALLBACKS', 'True').lower() in ['true', '1', 't']
+
+# Job progress and results are kept in a diskcache here, so any worker can answer the polling
+# requests (a tmpfs mount keeps it in memory, see docker-compose.yml)
+JOB_CACHE_DIR = os.getenv('JOB_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'data-mirroring-jobs'))
+
+# Seconds a finished job result is kept before the browser has to have collected it
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 10 * 60))
+
+# Processes that parse uploads when the callbacks run inside the request (BACKGROUND_CALLBACKS off),
+# so the other threads of a gthread worker keep serving while an upload is parsed; 0 parses in the
+# request thread itself
+PARSE_EXECUTOR_WORKERS = int(os.getenv('PARSE_EXECUTOR_WORKERS', 2))
+
+_parse_executor = None
+_parse_executor_lock = threading.Lock()
+
+def create_background_callback_manager():
+    """
+    Return the local job manager for background callbacks, or None when they are disabled.
+    """
+    if not BACKGROUND_CALLBACKS:
+        return None
+    import diskcache
+    return DiskcacheManager(diskcache.Cache(JOB_CACHE_DIR), expire=JOB_RESULT_TTL)
+
+def get_parse_executor():
+    """
+    Return the process-wide pool that parses uploads for in-request callbacks, or None when
+    uploads are parsed in background jobs or in the request thread.
+    """
+    global _parse_executor
+    if BACKGROUND_CALLBACKS or PARSE_EXECUTOR_WORKERS < 1:
+        return None
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            # A forkserver starts the processes, forking a worker with running threads is not safe
+            _parse_executor = ProcessPoolExecutor(max_workers=PARSE_EXECUTOR_WORKERS,
+                                                  mp_context=multiprocessing.get_context('forkserver'))
+        return _parse_executor
+
+def run_parse_job(fn, *args):
+    """
+    Call fn(*args) in the parse pool and wait for its result, which releases the GIL for the
+    other request threads. Without a pool fn runs in the calling thread.
+
+    :param fn: Module-level function; its arguments and result are pickled when a pool is used
+    """
+    executor = get_parse_executor()
+    if executor is None:
+        return fn(*args)
+    return executor.submit(fn, *args).result()
+
+def map_parse_jobs(fn, args_list):
+    """
+    Call fn(*args) for every args in args_list as separate tasks of the parse pool, which run
+    at the same time, and wait for the results. Without a pool they run one after another in
+    the calling thread.
+
+    :param fn: Module-level function; its arguments and result are pickled when a pool is used
+    :return: List of results in the order of args_list
+    """
+    executor = get_parse_executor()
+    if executor is None:
+        return [fn(*args) for args in args_list]
+    futures = [executor.submit(fn, *args) for args in args_list]
+    return [future.result() for future in futures]
@@ -76,30 +76,40 @@ def create_layout():
 
         html.Div(id='page-content'),
 
-        dcc.Loading(
-            id="loading-spinner",
-            type="circle",
-            children=html.Div(
-                [
-                    html.Div(
-                        id='output-data-upload',
-                        className='table-container',
-                        style={
-                            'marginTop': '40px',
-                            'padding': '30px',
-                            'backgroundColor': '#F9FAFB',
-                            'borderRadius': '10px',
-                            'boxShadow': '0px 0px 10px rgba(0, 0, 0, 0.1)',
-                            'maxWidth': '800px',
-                            'margin': 'auto',
-                            'color': '#1F2937'
-                        }
-                    ),
-                    html.Div(id='download-container', style={'textAlign': 'center', 'marginTop': '20px'}),
-                    dcc.Download(id="download-dataframe-csv"),
-                    dcc.Download(id="download-urls-txt"),
-                    html.Div(id='visualization-container', style={'marginTop': '40px'})
-                ]
+        html.Div([
+            # Shown while an upload is parsed in a background job
+            html.Div(
+                id='parse-progress-container',
+                children=[
+                    html.Progress(id='parse-progress', value='0', max='100', style={'width': '100%'}),
+                    html.Div(id='parse-progress-label', style={'fontFamily': 'Arial, sans-serif', 'color': '#4B5563', 'margin': '10px'}),
+                    html.Button("Cancel", id='btn-cancel-parse', className="download-btn")
+                ],
+                style={'display': 'none', 'maxWidth': '800px', 'margin': 'auto', 'textAlign': 'center'}
+            ),
+            dcc.Loading(
+                id="loading-spinner",
+                type="circle",
+                children=html.Div(
+                    [
+                        html.Div(
+                            id='output-data-upload',
+                            style={
+                                'marginTop': '40px',
+                                'padding': '30px',
+                                'backgroundColor': '#F9FAFB',
+                                'borderRadius': '10px',
+                                'boxShadow': '0px 0px 10px rgba(0, 0, 0, 0.1)',
+                                'maxWidth': '800px',
+                                'margin': 'auto',
+                                'color': '#1F2937'
+                            }
+                        ),
+                        html.Div(id='download-container', style={'textAlign': 'center', 'marginTop': '20px'}),
+                        dcc.Store(id='upload-handles'),
+                        html.Div(id='visualization-container', style={'marginTop': '40px'})
+                    ]
+                )
             )
-        )
+        ])
     ], style={'backgroundColor': '#FFFFFF', 'color': '#1F2937', 'padding': '30px'})
@@ -0,0 +1,162 @@
+# src/components/metrics.py
+
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Record stage timings, byte counts and row counts for the /metrics route
+METRICS = os.getenv('METRICS', 'True').lower() in ['true', '1', 't']
+
+# Observations are added up in a diskcache here, so the gunicorn workers and background jobs
+# all count into the same histograms (a tmpfs mount keeps it in memory, see docker-compose.yml)
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'data-mirroring-metrics'))
+
+# Bearer token the /metrics route asks for, the route is open when it is not set
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(11))  # 1 KiB to 1 GiB
+ROWS_BUCKETS = (10, 100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# name -> (help text, bucket upper bounds)
+HISTOGRAMS = {
+    'data_mirroring_stage_duration_seconds': ("Time spent in each processing stage", SECONDS_BUCKETS),
+    'data_mirroring_upload_bytes': ("Size of uploaded files", BYTES_BUCKETS),
+    'data_mirroring_response_bytes': ("Size of responses", BYTES_BUCKETS),
+    'data_mirroring_figure_bytes': ("Size of the figure JSON sent to the browser", BYTES_BUCKETS),
+    'data_mirroring_parsed_rows': ("Rows in a parsed dataset", ROWS_BUCKETS),
+    'data_mirroring_dataset_bytes': ("In-memory size of a parsed dataset before and after optimize_dtypes", BYTES_BUCKETS),
+}
+
+# name -> help text
+COUNTERS = {
+    'data_mirroring_parse_cache_total': "Parse cache lookups by result (hit or miss)",
+}
+
+_metrics_cache = None
+_metrics_cache_lock = threading.Lock()
+
+def get_metrics_cache():
+    """
+    Return the process-wide diskcache holding the histograms, or None when metrics are disabled.
+    """
+    global _metrics_cache
+    if not METRICS:
+        return None
+    with _metrics_cache_lock:
+        if _metrics_cache is None:
+            import diskcache
+            _metrics_cache = diskcache.Cache(METRICS_DIR)
+        return _metrics_cache
+
+def observe(name, value, **labels):
+    """
+    Add one observation to a histogram. Metrics never fail the request they describe.
+
+    :param name: One of HISTOGRAMS
+    :param value: Observed value (seconds, bytes or rows)
+    :param labels: Label values, e.g. stage='parse', platform='tiktok'
+    """
+    cache = get_metrics_cache()
+    if cache is None:
+        return
+    buckets = HISTOGRAMS[name][1]
+    bucket = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+    series = (name, tuple(sorted(labels.items())))
+    try:
+        # Buckets are stored non-cumulative; one transaction keeps count and sum consistent
+        with cache.transact():
+            cache.incr(series + ('bucket', bucket))
+            cache.incr(series + ('sum',), value)
+    except Exception as e:
+        logging.warning(f"Could not record metric {name}: {e}")
+
+def increment(name, **labels):
+    """
+    Add one to a counter. Metrics never fail the request they describe.
+
+    :param name: One of COUNTERS
+    :param labels: Label values, e.g. result='hit'
+    """
+    cache = get_metrics_cache()
+    if cache is None:
+        return
+    try:
+        cache.incr((name, tuple(sorted(labels.items())), 'total'))
+    except Exception as e:
+        logging.warning(f"Could not record metric {name}: {e}")
+
+@contextmanager
+def timed(stage, **labels):
+    """
+    Observe how long the block takes in the stage duration histogram, also when it fails.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('data_mirroring_stage_duration_seconds', time.perf_counter() - start, stage=stage, **labels)
+
+def count_bytes(chunks, route):
+    """
+    Pass a streamed response through and observe its total size once it has been sent.
+    """
+    total = 0
+    try:
+        for chunk in chunks:
+            total += len(chunk)
+            yield chunk
+    finally:
+        observe('data_mirroring_response_bytes', total, route=route)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+def _format_number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_metrics():
+    """
+    Return all histograms and counters in the Prometheus text exposition format.
+    """
+    cache = get_metrics_cache()
+    series = {}
+    if cache is not None:
+        for key in cache.iterkeys():
+            name, labels, kind = key[0], key[1], key[2]
+            entry = series.setdefault((name, labels), {'buckets': {}, 'sum': 0, 'total': 0})
+            if kind == 'bucket':
+                entry['buckets'][key[3]] = cache.get(key, 0)
+            else:
+                entry[kind] = cache.get(key, 0)
+
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (series_name, labels), entry in sorted(series.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for i, bound in enumerate(buckets + (math.inf,)):
+                cumulative += entry['buckets'].get(i, 0)
+                bucket_labels = _format_labels(labels + (('le', _format_number(bound)),))
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(entry["sum"])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    for name, help_text in COUNTERS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for (series_name, labels), entry in sorted(series.items()):
+            if series_name == name:
+                lines.append(f'{name}{_format_labels(labels)} {entry["total"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,110 @@
+# src/components/parse_cache.py
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from src.components.data.upload_sources import DataURIReader, LocalFile, check_data_uri
+from src.components.metrics import increment
+
+# Reuse parsed DataFrames and their rollup cubes when the same export is uploaded again
+PARSE_CACHE = os.getenv('PARSE_CACHE', 'True').lower() in ['true', '1', 't']
+
+# The cache lives on disk so background jobs and all gunicorn workers share it
+# (a tmpfs mount keeps it in memory, see docker-compose.yml)
+PARSE_CACHE_DIR = os.getenv('PARSE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'data-mirroring-parse-cache'))
+
+# Total bytes of cached results, least recently used are evicted first
+PARSE_CACHE_BUDGET = int(os.getenv('PARSE_CACHE_BUDGET', 512 * 1024 * 1024))
+
+# Seconds a cached result is kept after it was stored
+PARSE_CACHE_TTL = int(os.getenv('PARSE_CACHE_TTL', 30 * 60))
+
+# Bytes hashed at a time
+HASH_BLOCK_SIZE = 3 * 1024 * 1024
+
+def _update_hash(digest, contents):
+    if isinstance(contents, (str, LocalFile)):
+        if isinstance(contents, str):
+            check_data_uri(contents)
+        reader = DataURIReader(contents, HASH_BLOCK_SIZE) if isinstance(contents, str) else open(contents.path, 'rb')
+        with reader as f:
+            while block := f.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+        return
+    if isinstance(contents, (bytes, bytearray)):
+        digest.update(contents)
+        return
+    # Open binary file: hash it block by block and rewind it for the parser
+    position = contents.tell()
+    while block := contents.read(HASH_BLOCK_SIZE):
+        digest.update(block)
+    contents.seek(position)
+
+def parse_cache_key(platform, contents_list, selected_sections=None):
+    """
+    Return a key that identifies the parse result of a set of uploaded files.
+
+    :param platform: Platform the files were uploaded for
+    :param contents_list: List of upload sources (see open_upload_source)
+    :param selected_sections: Sections that are extracted, None for the platform defaults
+    :return: Hex digest of the platform, the sections and the decoded bytes of every file
+    """
+    digest = hashlib.sha256()
+    digest.update(platform.encode('utf-8'))
+    digest.update(repr(sorted(selected_sections) if selected_sections is not None else None).encode('utf-8'))
+    for contents in contents_list:
+        file_digest = hashlib.sha256()
+        _update_hash(file_digest, contents)
+        digest.update(file_digest.digest())
+    return digest.hexdigest()
+
+_parse_cache = None
+_parse_cache_lock = threading.Lock()
+
+def get_parse_cache():
+    """
+    Return the process-wide cache of parse results, or None when caching is disabled.
+    """
+    global _parse_cache
+    if not PARSE_CACHE:
+        return None
+    with _parse_cache_lock:
+        if _parse_cache is None:
+            import diskcache
+            _parse_cache = diskcache.Cache(PARSE_CACHE_DIR, size_limit=PARSE_CACHE_BUDGET,
+                                           eviction_policy='least-recently-used')
+            _parse_cache.stats(enable=True)
+        return _parse_cache
+
+def get_cached_result(key):
+    """
+    Return the cached (DataFrame, rollup cube) tuple for a key, or None on a miss.
+    """
+    cache = get_parse_cache()
+    if cache is None:
+        return None
+    result = cache.get(key)
+    increment('data_mirroring_parse_cache_total', result='hit' if result is not None else 'miss')
+    hits, misses = cache.stats()
+    logging.info(f"Parse cache {'hit' if result is not None else 'miss'} ({hits} hits, {misses} misses)")
+    return result
+
+def set_cached_result(key, df, cube):
+    """
+    Store the parsed DataFrame and its rollup cube under a key.
+    """
+    cache = get_parse_cache()
+    if cache is not None:
+        cache.set(key, (df, cube), expire=PARSE_CACHE_TTL)
+
+def parse_cache_stats():
+    """
+    Return the hit and miss counters of the parse cache, shared by all processes using it.
+    """
+    cache = get_parse_cache()
+    if cache is None:
+        return {'hits': 0, 'misses': 0}
+    hits, misses = cache.stats()
+    return {'hits': hits, 'misses': misses}
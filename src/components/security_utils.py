@@ -1,15 +1,29 @@
 # src/components/utils/security_utils.py
 
-import logging
 import os
+import secrets
+import shutil
 import tempfile
-from werkzeug.utils import secure_filename
+from dash import callback_context, get_app
+from flask import session, has_request_context
+from flask.sessions import SecureCookieSessionInterface
+from itsdangerous import BadSignature
+from src.components.data.upload_sources import DataURIReader, decoded_size, check_data_uri, DECODE_BLOCK_SIZE
 
-# Define allowed file extensions for security
-ALLOWED_EXTENSIONS = {'json'}
+# Define allowed file extensions for security (zip: a whole Data Download Package)
+ALLOWED_EXTENSIONS = {'json', 'zip'}
 
-# Define maximum file size (20 MB)
-MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB in bytes
+# Define maximum file size (20 MB by default, raise with MAX_FILE_SIZE when using chunked uploads)
+MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 20 * 1024 * 1024))  # 20 MB in bytes
+
+# Maximum uncompressed size of the files read from an uploaded ZIP archive, JSON compresses well
+MAX_EXTRACTED_SIZE = int(os.getenv('MAX_EXTRACTED_SIZE', 10 * MAX_FILE_SIZE))
+
+# Uploads are decoded into memory up to this many bytes, larger ones spill over to SPOOL_DIR
+SPOOL_MAX_MEMORY = int(os.getenv('SPOOL_MAX_MEMORY', 8 * 1024 * 1024))
+
+# Directory for spilled uploads (a tmpfs mount keeps them in memory, see docker-compose.yml)
+SPOOL_DIR = os.getenv('SPOOL_DIR', tempfile.gettempdir())
 
 def allowed_file(filename):
     """
@@ -27,26 +41,53 @@ def validate_file(contents, filename):
     if not allowed_file(filename):
         raise ValueError("File type not allowed")
 
-def save_temp_file(contents, filename):
+def spool_upload(contents, filename):
     """
-    Save the uploaded file to a temporary location securely.
+    Decode an uploaded data URI into a private spooled buffer: it stays in memory up to
+    SPOOL_MAX_MEMORY bytes and rolls over to an anonymous file in SPOOL_DIR above that.
+    Nothing is written under a shared name and the data is gone as soon as the buffer is
+    closed, so use it as a context manager or close it after parsing.
+
+    :param contents: Data URI string from dcc.Upload
+    :param filename: Name of the uploaded file, used to validate its type
+    :return: SpooledTemporaryFile positioned at the start of the decoded bytes
     """
-    validate_file(contents, filename)
-    secure_name = secure_filename(filename)
-    temp_dir = tempfile.gettempdir()
-    temp_file_path = os.path.join(temp_dir, secure_name)
-    
-    with open(temp_file_path, 'wb') as f:
-        f.write(contents)
-    
-    logging.info(f"File saved temporarily at {temp_file_path}")
-    
-    return temp_file_path
+    check_data_uri(contents)
+    if not allowed_file(filename):
+        raise ValueError("File type not allowed")
+    if decoded_size(contents) > MAX_FILE_SIZE:
+        raise ValueError("File is too large")
 
-def cleanup_temp_file(file_path):
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, dir=SPOOL_DIR)
+    try:
+        shutil.copyfileobj(DataURIReader(contents), buffer, DECODE_BLOCK_SIZE)
+        buffer.seek(0)
+    except Exception:
+        buffer.close()
+        raise
+    return buffer
+
+def get_session_key():
     """
-    Delete the temporary file after processing.
+    Return a random key identifying the current browser session, creating it on first use.
+    Used to bind server-side uploads and datasets to the session that created them.
     """
-    if os.path.exists(file_path):
-        os.remove(file_path)
-        logging.info(f"Temporary file {file_path} deleted.")
+    if has_request_context():
+        if 'session_key' not in session:
+            session['session_key'] = secrets.token_hex(16)
+        return session['session_key']
+
+    # Background callbacks run in a job process without a request context, so read the key
+    # from the signed session cookie that the callback request carried. Flask only accepts it
+    # for permanent_session_lifetime, and neither is a forged or expired cookie accepted here.
+    server = get_app().server
+    cookie = callback_context.cookies.get(server.config['SESSION_COOKIE_NAME'])
+    try:
+        max_age = int(server.permanent_session_lifetime.total_seconds())
+        data = SecureCookieSessionInterface().get_signing_serializer(server).loads(cookie, max_age=max_age) if cookie else {}
+    except BadSignature:
+        data = {}
+    if 'session_key' not in data:
+        raise ValueError("Your session has expired, please log in again.")
+    return data['session_key']
@@ -0,0 +1,161 @@
+# src/components/uploads.py
+
+import json
+import logging
+import os
+import re
+import secrets
+import tempfile
+import time
+from src.components.security_utils import MAX_FILE_SIZE, allowed_file
+
+# Uploads are written here chunk by chunk so that any gunicorn worker can append to or read them.
+# Point this at a tmpfs mount (see docker-compose.yml) to keep uploads in memory.
+UPLOAD_DIR = os.getenv('UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'data-mirroring-uploads'))
+
+# Uploads that were never parsed are removed after this many seconds
+UPLOAD_TTL = int(os.getenv('UPLOAD_TTL', 30 * 60))
+
+# Use the raw binary upload route instead of base64 data URIs through dcc.Upload
+CHUNKED_UPLOADS = os.getenv('CHUNKED_UPLOADS', 'True').lower() in ['true', '1', 't']
+
+PLATFORMS = ('tiktok', 'instagram', 'youtube')
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+_HANDLE_PATTERN = re.compile(r'[A-Za-z0-9_-]{16,64}')
+
+def _upload_paths(handle):
+    if not isinstance(handle, str) or not _HANDLE_PATTERN.fullmatch(handle):
+        raise ValueError("Invalid upload handle")
+    base = os.path.join(UPLOAD_DIR, handle)
+    return base + '.data', base + '.meta'
+
+def _read_meta(handle, owner):
+    data_path, meta_path = _upload_paths(handle)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise ValueError("Unknown upload handle")
+    if meta['owner'] != owner:
+        raise ValueError("Unknown upload handle")
+    return meta, data_path
+
+def create_upload(platform, filename, total_size, owner):
+    """
+    Register a new upload and return its handle.
+
+    :param platform: Platform the file was uploaded for
+    :param filename: Original file name, used for validation and display only
+    :param total_size: Announced size of the file in bytes
+    :param owner: Session key of the uploader
+    :return: Opaque upload handle
+    """
+    if platform not in PLATFORMS:
+        raise ValueError("Unsupported platform")
+    if total_size > MAX_FILE_SIZE:
+        raise ValueError("File is too large")
+    if not allowed_file(filename):
+        raise ValueError("File type not allowed")
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    purge_stale_uploads()
+
+    handle = secrets.token_urlsafe(16)
+    data_path, meta_path = _upload_paths(handle)
+    open(data_path, 'wb').close()
+    with open(meta_path, 'w') as f:
+        json.dump({'platform': platform, 'filename': filename, 'size': total_size, 'owner': owner}, f)
+
+    logging.info(f"Upload {handle} created for {platform}")
+    return handle
+
+def _copy_stream(stream, f, limit):
+    """
+    Copy stream into f block by block, refusing to grow f beyond limit bytes.
+    """
+    while True:
+        block = stream.read(COPY_BUFFER_SIZE)
+        if not block:
+            return f.tell()
+        if f.tell() + len(block) > limit:
+            raise ValueError("File is too large")
+        f.write(block)
+
+def append_upload_chunk(handle, owner, stream, offset):
+    """
+    Stream one chunk of the request body onto the end of an upload.
+
+    :param stream: Binary stream holding the chunk (e.g. request.stream)
+    :param offset: Byte offset of the chunk, which must equal the bytes received so far
+    :return: Tuple of (bytes received, whether the upload is complete)
+    """
+    meta, data_path = _read_meta(handle, owner)
+    with open(data_path, 'ab') as f:
+        if f.tell() != offset:
+            raise ValueError("Unexpected chunk offset")
+        try:
+            received = _copy_stream(stream, f, meta['size'])
+        except ValueError:
+            f.close()
+            discard_upload(handle)
+            raise
+    return received, received == meta['size']
+
+def save_upload(platform, filename, stream, owner):
+    """
+    Store a complete file (e.g. one multipart form field) in a single call.
+
+    :return: Upload handle
+    """
+    handle = create_upload(platform, filename, 0, owner)
+    data_path, meta_path = _upload_paths(handle)
+    try:
+        with open(data_path, 'wb') as f:
+            size = _copy_stream(stream, f, MAX_FILE_SIZE)
+    except ValueError:
+        discard_upload(handle)
+        raise
+    with open(meta_path, 'w') as f:
+        json.dump({'platform': platform, 'filename': filename, 'size': size, 'owner': owner}, f)
+    return handle
+
+def open_upload(handle, owner):
+    """
+    Open a completed upload for reading.
+
+    :return: Tuple of (metadata dict, binary file object)
+    """
+    meta, data_path = _read_meta(handle, owner)
+    f = open(data_path, 'rb')
+    if os.fstat(f.fileno()).st_size != meta['size']:
+        f.close()
+        raise ValueError("Upload is incomplete")
+    return meta, f
+
+def discard_upload(handle):
+    """
+    Delete an upload and its metadata.
+    """
+    for path in _upload_paths(handle):
+        if os.path.exists(path):
+            os.remove(path)
+    logging.info(f"Upload {handle} deleted.")
+
+def purge_stale_uploads(now=None):
+    """
+    Delete uploads that were not touched for UPLOAD_TTL seconds.
+    """
+    now = now or time.time()
+    try:
+        names = os.listdir(UPLOAD_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(UPLOAD_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > UPLOAD_TTL:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+from flask import Flask
+from src.components import dataset_store
+from src.components.callbacks import append_to_session_dataset, create_figure
+from src.components.data.appends import append_dataset, hash_index, row_hashes
+from src.components.data.general_utils import optimize_dtypes
+from src.components.data.rollups import build_cube, merge_cubes, cube_to_frame, cube_from_frame
+from src.components.dataset_store import configure_dataset_store, save_session_dataset, load_session_companion
+
+def tiktok_frame(days, sources):
+    return pd.DataFrame({
+        'Date': pd.to_datetime([f'2022-{month:02d}-{day:02d} 10:00:00' for month, day in days]),
+        'Link': [f'https://www.tiktokv.com/share/video/{month}{day}/' for month, day in days],
+        'Source': sources
+    })
+
+first = optimize_dtypes(tiktok_frame([(1, 1), (1, 2), (2, 1), (2, 1)], ['Browsing', 'Browsing', 'Liked', 'Liked']))
+# Overlaps the first export on (2, 1) and brings a source the first one did not have
+second = tiktok_frame([(2, 1), (3, 1), (3, 2)], ['Liked', 'Favorite', 'Browsing'])
+
+def test_row_hashes_do_not_depend_on_dtypes():
+    plain = first.astype({'Source': object})
+
+    assert (row_hashes(first) == row_hashes(plain)).all()
+    assert (row_hashes(first) == row_hashes(first.assign(Date=first['Date'].dt.tz_localize('UTC')))).all()
+    assert row_hashes(first)[0] != row_hashes(first.assign(Source='Liked'))[0]
+
+def test_append_dataset_adds_only_new_records():
+    merged, added, index = append_dataset(first, second)
+
+    assert len(added) == 2
+    assert merged['Link'].tolist() == first['Link'].tolist() + second['Link'].tolist()[1:]
+    assert isinstance(merged['Source'].dtype, pd.CategoricalDtype)
+    assert list(merged['Source'].cat.categories) == ['Browsing', 'Liked', 'Favorite']
+    assert (index == hash_index(merged)).all()
+
+def test_append_dataset_rejects_other_platforms():
+    with pytest.raises(ValueError):
+        append_dataset(first, pd.DataFrame({'title': ['a'], 'timestamp': pd.to_datetime(['2022-01-01'])}))
+
+def test_merge_cubes_matches_cube_of_all_rows():
+    merged, added, _ = append_dataset(first, second)
+    days, labels, codes, counts = merge_cubes(build_cube(first['Date'], first['Source']), build_cube(added['Date'], added['Source']))
+    expected = build_cube(merged['Date'], merged['Source'])
+
+    assert (days == expected[0]).all()
+    assert list(labels) == list(expected[1])
+    assert (codes == expected[2]).all()
+    assert (counts == expected[3]).all()
+
+def test_cube_survives_the_dataset_store():
+    days, labels, codes, counts = build_cube(first['Date'], first['Source'])
+    restored = cube_from_frame(cube_to_frame(days, labels, codes, counts))
+
+    assert restored[0].dtype == days.dtype
+    assert list(restored[1]) == list(labels)
+    assert (restored[2] == codes).all()
+    assert (restored[3] == counts).all()
+
+def test_append_to_session_dataset_updates_figure_incrementally(monkeypatch):
+    # The process-wide store is put back after the test
+    monkeypatch.setattr(dataset_store, '_dataset_store', None)
+    configure_dataset_store(backend='memory')
+    server = Flask(__name__)
+    server.secret_key = 'test'
+    third = tiktok_frame([(3, 2), (4, 1)], ['Browsing', 'Liked'])
+
+    with server.test_request_context():
+        save_session_dataset(first)
+        merged, _, appended = append_to_session_dataset('tiktok', first, second)
+        assert appended == 2
+        assert load_session_companion('cube') is not None
+
+        merged, cube, appended = append_to_session_dataset('tiktok', merged, third)
+        assert appended == 1
+        assert len(merged) == 7
+        assert create_figure('tiktok', merged, cube).to_dict() == create_figure('tiktok', merged).to_dict()
+
+        save_session_dataset(merged)
+        assert load_session_companion('index') is None
@@ -0,0 +1,69 @@
+import base64
+import io
+import json
+import zipfile
+import pytest
+from src.components.callbacks import parse_contents
+from src.components.data.upload_sources import open_archive_members, LocalFile
+
+history = [{'title': f'Watched video {i}', 'titleUrl': f'https://www.youtube.com/watch?v={i:011d}',
+            'time': '2023-02-01T12:30:00.123Z', 'subtitles': [{'name': 'Cat Channel', 'url': 'https://www.youtube.com/channel/UC1'}]}
+           for i in range(5)]
+
+# Stored uncompressed and then overwritten in the archive, so reading it fails its CRC check
+UNREAD = b'direct messages the parser must not read ' * 10
+
+def make_archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data, compress_type=zipfile.ZIP_STORED if data == UNREAD else zipfile.ZIP_DEFLATED)
+    return buffer.getvalue().replace(UNREAD, bytes(len(UNREAD)))
+
+def to_data_uri(data):
+    return 'data:application/zip;base64,' + base64.b64encode(data).decode()
+
+def test_open_archive_members_finds_files_in_folders():
+    data = make_archive({'Takeout/YouTube/history/watch-history.json': json.dumps(history),
+                         'Takeout/YouTube/history/search-history.json': '[]',
+                         '__MACOSX/Takeout/._watch-history.json': 'resource fork'})
+    archive, members = open_archive_members(io.BytesIO(data), ['watch-history.json'], 1024 * 1024)
+
+    with archive:
+        assert [member.name for member in members] == ['Takeout/YouTube/history/watch-history.json']
+        assert json.load(members[0]) == history
+
+def test_open_archive_members_limits_extracted_size():
+    data = make_archive({'watch-history.json': json.dumps(history)})
+
+    with pytest.raises(ValueError, match="too large"):
+        open_archive_members(io.BytesIO(data), ['watch-history.json'], 100)
+
+def test_open_archive_members_without_wanted_files():
+    with pytest.raises(ValueError, match="watch-history.json"):
+        open_archive_members(io.BytesIO(make_archive({'other.json': '[]'})), ['watch-history.json'], 1024)
+    with pytest.raises(ValueError, match="not a valid ZIP"):
+        open_archive_members(io.BytesIO(b'{"not": "a zip"}'), ['watch-history.json'], 1024)
+
+def test_parse_contents_reads_only_the_needed_members():
+    data = make_archive({'Takeout/history/watch-history.json': json.dumps(history), 'Takeout/messages.json': UNREAD})
+    with pytest.raises(zipfile.BadZipFile):
+        zipfile.ZipFile(io.BytesIO(data)).read('Takeout/messages.json')
+
+    df = parse_contents('youtube', [to_data_uri(data)], filenames=['takeout.zip'])
+
+    assert df['Link'].tolist() == [video['titleUrl'] for video in history]
+
+def test_parse_contents_reads_archives_from_disk(tmp_path):
+    path = tmp_path / 'tiktok.zip'
+    path.write_bytes(make_archive({'TikTok/user_data_tiktok.json': json.dumps(
+        {'Activity': {'Video Browsing History': {'VideoList': [
+            {'Date': '2023-01-01 10:00:00', 'Link': 'https://www.tiktokv.com/share/video/1/'}]}}})}))
+
+    with open(path, 'rb') as f:
+        df = parse_contents('tiktok', [f], filenames=['tiktok.zip'])
+    # The parse pool gets files on disk as a LocalFile
+    by_path = parse_contents('tiktok', [LocalFile(str(path))], filenames=['tiktok.zip'])
+
+    assert df['Link'].tolist() == ['https://www.tiktokv.com/share/video/1/']
+    assert by_path.equals(df)
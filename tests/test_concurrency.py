@@ -0,0 +1,108 @@
+import base64
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pytest
+from src.components import dataset_store, jobs
+from src.components.callbacks import parse_upload, parse_uploads
+from src.components.dataset_store import configure_dataset_store
+
+SESSIONS = 8
+REQUESTS = 5
+
+TABLE_PAGE_REQUEST = {
+    'output': '..data-table.data...data-table.page_count...data-table.page_current..',
+    'outputs': [{'id': 'data-table', 'property': 'data'},
+                {'id': 'data-table', 'property': 'page_count'},
+                {'id': 'data-table', 'property': 'page_current'}],
+    'inputs': [{'id': 'data-table', 'property': 'page_current', 'value': 0},
+               {'id': 'data-table', 'property': 'page_size', 'value': 10},
+               {'id': 'data-table', 'property': 'sort_by', 'value': [{'column_id': 'Link', 'direction': 'desc'}]},
+               {'id': 'data-table', 'property': 'filter_query', 'value': ''}],
+    'changedPropIds': ['data-table.sort_by'],
+    'state': []
+}
+
+def session_frame(session):
+    return pd.DataFrame({
+        'Date': pd.date_range('2022-01-01', periods=50, freq='D'),
+        'Link': [f'https://www.tiktokv.com/share/video/{session}{i:03d}/' for i in range(50)]
+    })
+
+@pytest.fixture
+def clients(monkeypatch):
+    from main import server, limiter
+
+    # All test clients share one address, the download limits are not what is tested here
+    monkeypatch.setattr(limiter, 'enabled', False)
+    # The process-wide store is put back after the test
+    monkeypatch.setattr(dataset_store, '_dataset_store', None)
+    store = configure_dataset_store(backend='memory')
+    clients = []
+    for session in range(SESSIONS):
+        store.put(f'session{session}', session_frame(session))
+        client = server.test_client()
+        with client.session_transaction(base_url='https://localhost') as flask_session:
+            flask_session['authenticated'] = True
+            flask_session['session_key'] = f'session{session}'
+        clients.append(client)
+    return clients
+
+def test_concurrent_sessions_only_see_their_own_data(clients):
+    start = threading.Barrier(SESSIONS)
+
+    def browse(session):
+        client = clients[session]
+        own_links = set(session_frame(session)['Link'])
+        start.wait()
+        for _ in range(REQUESTS):
+            csv = client.get('/download/csv', base_url='https://localhost').data.decode('utf-8')
+            urls = client.get('/download/urls?batch_size=1', base_url='https://localhost').data.decode('utf-8')
+            page = client.post('/app/_dash-update-component', json=TABLE_PAGE_REQUEST, base_url='https://localhost')
+            rows = page.get_json()['response']['data-table']['data']
+
+            assert pd.read_csv(io.StringIO(csv), index_col=0)['Link'].tolist() == list(session_frame(session)['Link'])
+            assert set(urls.split('\n')) == own_links
+            assert [row['Link'] for row in rows] == sorted(own_links, reverse=True)[:10]
+
+    with ThreadPoolExecutor(max_workers=SESSIONS) as executor:
+        for result in [executor.submit(browse, session) for session in range(SESSIONS)]:
+            result.result()
+
+@pytest.fixture
+def parse_pool(monkeypatch):
+    monkeypatch.setattr(jobs, 'BACKGROUND_CALLBACKS', False)
+    monkeypatch.setattr(jobs, 'PARSE_EXECUTOR_WORKERS', 2)
+    monkeypatch.setattr(jobs, '_parse_executor', None)
+    yield
+    jobs._parse_executor.shutdown()
+
+def test_run_parse_job_parses_in_the_pool(parse_pool):
+    history = [{'title': f'Watched video {i}', 'titleUrl': f'https://www.youtube.com/watch?v={i:011d}',
+                'time': '2023-02-01T12:30:00.123Z'} for i in range(20)]
+    uploads = [f"data:application/json;base64,{base64.b64encode(json.dumps(history).encode()).decode()}"]
+
+    df = jobs.run_parse_job(parse_upload, 'youtube', uploads, ['watch-history.json'])
+
+    assert jobs.get_parse_executor() is not None
+    pd.testing.assert_frame_equal(df, parse_upload('youtube', uploads, ['watch-history.json']))
+
+def test_parse_uploads_parses_every_file_as_its_own_task(parse_pool, monkeypatch):
+    sections = {'saved_posts.json': {'saved_saved_media': [{'title': 'some_account', 'string_map_data': {
+                    'Saved on': {'href': 'https://www.instagram.com/p/abc/', 'timestamp': 1672531200}}}]},
+                'posts_viewed.json': {'impressions_history_posts_seen': [{'string_map_data': {
+                    'Author': {'value': 'author'}, 'Time': {'timestamp': 1672617600}}}]},
+                'other.json': {'something_else': []}}
+    uploads = [f"data:application/json;base64,{base64.b64encode(json.dumps(section).encode()).decode()}"
+               for section in sections.values()]
+    submitted = []
+    map_parse_jobs = jobs.map_parse_jobs
+    monkeypatch.setattr('src.components.callbacks.map_parse_jobs',
+                        lambda fn, args_list: submitted.extend(args_list) or map_parse_jobs(fn, args_list))
+
+    df = parse_uploads('instagram', uploads, list(sections))
+
+    assert len(submitted) == 3
+    pd.testing.assert_frame_equal(df, parse_upload('instagram', uploads, list(sections)))
@@ -0,0 +1,116 @@
+import pandas as pd
+import pytest
+from flask import Flask
+from src.components.dataset_store import (MemoryDatasetStore, DiskDatasetStore, configure_dataset_store,
+                                          dataset_size, save_session_dataset, load_session_dataset)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_df(rows):
+    return pd.DataFrame({'Link': [f'https://www.tiktokv.com/share/video/{i}/' for i in range(rows)]})
+
+def test_memory_store_evicts_least_recently_used():
+    df = make_df(100)
+    store = MemoryDatasetStore(budget=int(dataset_size(df) * 2.5))
+
+    store.put('a', df)
+    store.put('b', df)
+    store.get('a')
+    store.put('c', df)
+
+    assert store.get('a') is df
+    assert store.get('b') is None
+    assert store.get('c') is df
+    assert store.size <= store.budget
+
+def test_memory_store_expires_idle_datasets():
+    clock = FakeClock()
+    store = MemoryDatasetStore(ttl=60, clock=clock)
+    store.put('a', make_df(10))
+
+    clock.now += 59
+    assert store.get('a') is not None
+    clock.now += 59
+    assert store.get('a') is not None
+    clock.now += 61
+    assert store.get('a') is None
+    assert store.size == 0
+
+def test_memory_store_rejects_datasets_over_budget():
+    store = MemoryDatasetStore(budget=10)
+
+    with pytest.raises(ValueError, match="too large"):
+        store.put('a', make_df(10))
+
+def test_disk_store_is_shared_between_instances(tmp_path):
+    df = make_df(10)
+    DiskDatasetStore(directory=str(tmp_path)).put('a', df)
+
+    assert DiskDatasetStore(directory=str(tmp_path)).get('a').equals(df)
+
+def test_disk_store_evicts_and_expires(tmp_path):
+    clock = FakeClock()
+    df = make_df(1000)
+    DiskDatasetStore(directory=str(tmp_path)).put('probe', df)
+    file_size = (tmp_path / 'probe.pkl').stat().st_size
+    (tmp_path / 'probe.pkl').unlink()
+
+    store = DiskDatasetStore(directory=str(tmp_path), budget=int(file_size * 2.5), ttl=60, clock=clock)
+    store.put('a', df)
+    clock.now += 1
+    store.put('b', df)
+    clock.now += 1
+    store.get('a')
+    clock.now += 1
+    store.put('c', df)
+
+    assert store.get('b') is None
+    assert store.get('a') is not None
+
+    clock.now += 61
+    assert store.get('c') is None
+
+def test_disk_store_rejects_unsafe_keys(tmp_path):
+    with pytest.raises(ValueError, match="Invalid dataset key"):
+        DiskDatasetStore(directory=str(tmp_path)).get('../secrets')
+
+def test_session_datasets_are_isolated():
+    configure_dataset_store(backend='memory')
+    server = Flask(__name__)
+    server.secret_key = 'test'
+    df = make_df(3)
+
+    with server.test_request_context():
+        save_session_dataset(df)
+        assert load_session_dataset() is df
+    with server.test_request_context():
+        assert load_session_dataset() is None
+
+def test_disk_store_reuses_unchanged_datasets(tmp_path):
+    store = DiskDatasetStore(directory=str(tmp_path))
+    store.put('a', make_df(10))
+
+    first = store.get('a')
+    assert store.get('a') is first
+
+    store.put('a', make_df(20))
+    assert len(store.get('a')) == 20
+    store.delete('a')
+    assert store.get('a') is None
+
+def test_disk_store_rereads_a_new_file_with_the_same_inode_and_size(tmp_path):
+    store = DiskDatasetStore(directory=str(tmp_path))
+    store.put('a', pd.DataFrame({'Views': [1]}))
+    assert store.get('a')['Views'].tolist() == [1]
+
+    # Another worker's dataset that ended up in the same inode with the same size
+    new = tmp_path / 'new.pkl'
+    pd.DataFrame({'Views': [2]}).to_pickle(new)
+    (tmp_path / 'a.pkl').write_bytes(new.read_bytes())
+
+    assert store.get('a')['Views'].tolist() == [2]
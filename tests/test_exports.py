@@ -0,0 +1,97 @@
+import gzip
+import io
+import pandas as pd
+import pytest
+from src.components import dataset_store
+from src.components.dataset_store import configure_dataset_store
+from src.components.exports import iter_csv_chunks, iter_encoded, iter_binary_chunks
+
+df = pd.DataFrame({
+    'Date': pd.to_datetime(['2022-11-05 16:24:24', '2022-03-06 09:12:26', '2022-03-06 09:11:03']),
+    'Link': ['https://www.tiktokv.com/share/video/1/', 'https://www.tiktokv.com/share/video/2/', 'https://www.tiktokv.com/share/video/2/'],
+    'Source': pd.Categorical(['Browsing', 'Favorite', 'Liked'])
+})
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 10])
+def test_iter_csv_chunks_matches_to_csv(chunk_rows):
+    assert ''.join(iter_csv_chunks(df, chunk_rows=chunk_rows)) == df.to_csv()
+
+def test_iter_csv_chunks_empty_frame():
+    assert ''.join(iter_csv_chunks(df.iloc[:0])) == df.iloc[:0].to_csv()
+
+def test_iter_encoded_gzip():
+    data = b''.join(iter_encoded(iter_csv_chunks(df, chunk_rows=1), 'gzip'))
+
+    assert gzip.decompress(data).decode('utf-8') == df.to_csv()
+
+@pytest.fixture
+def client(monkeypatch):
+    from main import server
+
+    # The process-wide store is put back after the test
+    monkeypatch.setattr(dataset_store, '_dataset_store', None)
+    store = configure_dataset_store(backend='memory')
+    store.put('abc123', df)
+    client = server.test_client()
+    with client.session_transaction(base_url='https://localhost') as session:
+        session['authenticated'] = True
+        session['session_key'] = 'abc123'
+    return client
+
+def test_download_csv_route_streams_dataset(client):
+    response = client.get('/download/csv', base_url='https://localhost')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename="data.csv"'
+    assert response.data.decode('utf-8') == df.to_csv()
+
+def test_download_csv_route_gzip(client):
+    response = client.get('/download/csv?compression=gzip', base_url='https://localhost')
+
+    assert response.headers['Content-Disposition'] == 'attachment; filename="data.csv.gz"'
+    assert gzip.decompress(response.data).decode('utf-8') == df.to_csv()
+
+def test_download_csv_route_without_dataset(client):
+    with client.session_transaction(base_url='https://localhost') as session:
+        session['session_key'] = 'unknown'
+
+    assert client.get('/download/csv', base_url='https://localhost').status_code == 404
+
+def test_download_urls_route_deduplicates(client):
+    response = client.get('/download/urls?batch_size=1', base_url='https://localhost')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename="urls.txt"'
+    assert response.data.decode('utf-8') == 'https://www.tiktokv.com/share/video/1/\nhttps://www.tiktokv.com/share/video/2/'
+
+def test_download_urls_route_ids(client):
+    response = client.get('/download/urls?ids=1', base_url='https://localhost')
+
+    assert response.headers['Content-Disposition'] == 'attachment; filename="video_ids.txt"'
+    assert response.data.decode('utf-8') == '1,2'
+
+def test_download_urls_route_rejects_bad_batch_size(client):
+    assert client.get('/download/urls?batch_size=0', base_url='https://localhost').status_code == 400
+
+@pytest.mark.parametrize('file_format,compression', [('parquet', None), ('parquet', 'snappy'),
+                                                      ('feather', None), ('feather', 'uncompressed')])
+def test_iter_binary_chunks_round_trips_dtypes(file_format, compression):
+    data = io.BytesIO(b''.join(iter_binary_chunks(df, file_format, compression, chunk_rows=2)))
+    read = pd.read_parquet if file_format == 'parquet' else pd.read_feather
+
+    pd.testing.assert_frame_equal(read(data), df)
+
+def test_iter_binary_chunks_rejects_unknown_compression():
+    with pytest.raises(ValueError, match="Unsupported compression"):
+        list(iter_binary_chunks(df, 'feather', 'snappy'))
+
+def test_download_parquet_route(client):
+    response = client.get('/download/parquet', base_url='https://localhost')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename="data.parquet"'
+    pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(response.data)), df)
+
+def test_download_feather_route_rejects_bad_compression(client):
+    assert client.get('/download/feather?compression=gzip', base_url='https://localhost').status_code == 400
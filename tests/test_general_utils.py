@@ -0,0 +1,143 @@
+import base64
+import logging
+import tracemalloc
+import pandas as pd
+from src.components.data import general_utils
+from src.components.security_utils import spool_upload
+from src.components.data.general_utils import DataURIReader, decoded_size, open_upload_source, optimize_dtypes, memory_report, canonicalize_links, extract_urls_for_4cat, iter_urls_for_4cat
+
+def make_df(rows=1000):
+    return pd.DataFrame({
+        'Date': pd.to_datetime(['2022-11-05 16:24:24'] * rows).as_unit('s'),
+        'Link': [f'https://www.tiktokv.com/share/video/{i}/' for i in range(rows)],
+        'Source': ['Browsing', 'Favorite', 'Liked', 'Browsing'] * (rows // 4)
+    })
+
+def test_optimize_dtypes():
+    df = make_df()
+    optimized = optimize_dtypes(df)
+
+    assert isinstance(optimized['Source'].dtype, pd.CategoricalDtype)
+    assert not isinstance(optimized['Link'].dtype, pd.CategoricalDtype)
+    assert str(optimized['Date'].dtype) == 'datetime64[ns]'
+    assert optimized.astype({'Source': str}).equals(df.astype({'Date': 'datetime64[ns]'}))
+
+def test_optimize_dtypes_keeps_mixed_columns():
+    df = pd.DataFrame({'Mixed': ['a', 1] * 10})
+
+    assert optimize_dtypes(df)['Mixed'].dtype == object
+
+def test_memory_report():
+    df = make_df()
+    report = memory_report(df, optimize_dtypes(df))
+
+    assert list(report.columns) == ['dtype', 'before', 'after', 'saved']
+    assert report.loc['Source', 'saved'] > 0
+    assert report.loc['total', 'before'] == df.memory_usage(deep=True, index=False).sum()
+
+def test_memory_report_is_logged_at_warning_when_enabled(monkeypatch, caplog):
+    monkeypatch.setattr(general_utils, 'MEMORY_REPORT', True)
+
+    with caplog.at_level(logging.WARNING):
+        optimize_dtypes(make_df())
+
+    assert 'Memory usage per column' in caplog.text
+    assert 'Source' in caplog.text
+
+links_df = pd.DataFrame({'Link': [
+    'https://www.tiktokv.com/share/video/7162314514329898246/',
+    'https://www.tiktok.com/@someone/video/7162314514329898246?lang=en',
+    'https://www.youtube.com/watch?v=abcdefghijk&t=30',
+    'https://youtu.be/abcdefghijk',
+    'No URL',
+    'https://www.tiktokv.com/share/video/7068329151006051590/'
+]})
+
+def test_canonicalize_links():
+    assert canonicalize_links(links_df['Link']).tolist()[:4] == [
+        'https://www.tiktokv.com/share/video/7162314514329898246/',
+        'https://www.tiktokv.com/share/video/7162314514329898246/',
+        'https://www.youtube.com/watch?v=abcdefghijk',
+        'https://www.youtube.com/watch?v=abcdefghijk'
+    ]
+
+def test_canonicalize_categorical_links():
+    categorical = links_df['Link'].astype('category')
+
+    assert canonicalize_links(categorical).tolist() == canonicalize_links(links_df['Link']).tolist()
+
+def test_extract_urls_for_4cat_keeps_every_link_by_default():
+    assert extract_urls_for_4cat(links_df) == ','.join(links_df['Link'])
+
+def test_extract_urls_for_4cat_deduplicated():
+    assert extract_urls_for_4cat(links_df, deduplicate=True) == (
+        'https://www.tiktokv.com/share/video/7162314514329898246/,'
+        'https://www.youtube.com/watch?v=abcdefghijk,'
+        'https://www.tiktokv.com/share/video/7068329151006051590/'
+    )
+
+def test_extract_video_ids_in_batches():
+    assert extract_urls_for_4cat(links_df, ids=True, batch_size=2) == '7162314514329898246,abcdefghijk\n7068329151006051590'
+
+def test_iter_urls_for_4cat_streams_chunks():
+    chunks = list(iter_urls_for_4cat(links_df, deduplicate=False, chunk_size=4))
+
+    assert len(chunks) == 2
+    assert ''.join(chunks) == ','.join(links_df['Link'])
+
+def make_data_uri(size):
+    data = bytes(range(256)) * (size // 256) + b'x' * (size % 256)
+    return data, 'data:application/json;base64,' + base64.b64encode(data).decode('ascii')
+
+def measure_peak(fn):
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def test_data_uri_reader_decodes_in_blocks():
+    for size in [0, 1, 2, 3, 1000]:
+        data, uri = make_data_uri(size)
+        reader = DataURIReader(uri, block_size=6)
+
+        assert decoded_size(uri) == size
+        assert b''.join(iter(lambda: reader.read(5), b'')) == data
+        assert DataURIReader(uri, block_size=6).readall() == data
+
+def test_streaming_a_data_uri_keeps_memory_flat():
+    size = 6 * 1024 * 1024
+    _, uri = make_data_uri(size)
+
+    def stream():
+        with open_upload_source(uri) as f:
+            return sum(len(block) for block in iter(lambda: f.read(64 * 1024), b''))
+
+    total, peak = measure_peak(stream)
+    assert total == size
+    assert peak < size / 5
+
+def test_reading_a_data_uri_at_once_stays_within_twice_its_size():
+    size = 6 * 1024 * 1024
+    data, uri = make_data_uri(size)
+
+    def read():
+        with open_upload_source(uri) as f:
+            return f.read()
+
+    result, peak = measure_peak(read)
+    assert result == data
+    assert peak < 2.2 * size
+
+def test_spooling_a_data_uri_stays_within_a_small_multiple_of_its_size():
+    size = 6 * 1024 * 1024
+    _, uri = make_data_uri(size)
+
+    def spool():
+        with spool_upload(uri, 'user_data.json') as buffer:
+            return buffer.seek(0, 2)
+
+    total, peak = measure_peak(spool)
+    assert total == size
+    assert peak < 2 * size
@@ -0,0 +1,103 @@
+import base64
+import json
+import pandas as pd
+import pytest
+from src.components.data import insta_processing
+from src.components.data.insta_processing import flatten_instagram_data, parse_instagram_files, parse_instagram_contents
+
+sample_data = {
+    "saved_saved_media": [
+        {"title": "some_account", "string_map_data": {"Saved on": {"href": "https://www.instagram.com/p/abc/", "timestamp": 1672531200}}}
+    ],
+    "likes_media_likes": [
+        {"title": "other_account", "string_list_data": [
+            {"href": "https://www.instagram.com/p/def/", "timestamp": 1672617600},
+            {"href": "https://www.instagram.com/p/ghi/", "timestamp": 1672704000}
+        ]}
+    ],
+    "impressions_history_videos_watched": [
+        {"string_map_data": {"Author": {"value": "video_account"}, "Time": {"timestamp": 1672790400}}}
+    ]
+}
+
+def test_flatten_instagram_data():
+    df = flatten_instagram_data(sample_data)
+
+    assert list(df.columns) == ['title', 'href', 'timestamp', 'category', 'file_name']
+    assert len(df) == 4
+    assert list(df['file_name']) == ['saved_posts.json', 'liked_posts.json', 'liked_posts.json', 'videos_watched.json']
+    assert df['timestamp'].iloc[0] == pd.Timestamp('2023-01-01')
+    assert df['href'].iloc[3] == 'N/A'
+
+def test_flatten_instagram_data_unknown_file():
+    assert flatten_instagram_data({"something_else": []}).empty
+
+all_sections = ['saved_posts.json', 'liked_posts.json', 'posts_viewed.json', 'suggested_accounts_viewed.json', 'videos_watched.json']
+
+def encode_to_base64(data):
+    json_str = json.dumps(data)
+    return f"data:application/json;base64,{base64.b64encode(json_str.encode()).decode()}"
+
+def split_into_files(data):
+    return [encode_to_base64({key: value}) for key, value in data.items()]
+
+def test_parse_instagram_files_processes_every_file():
+    df = parse_instagram_files(split_into_files(sample_data), all_sections)
+
+    assert len(df) == 4
+    assert set(df['file_name']) == {'saved_posts.json', 'liked_posts.json', 'videos_watched.json'}
+    assert df.index.tolist() == [0, 1, 2, 3]
+
+def test_parse_instagram_files_reads_files_from_disk(tmp_path):
+    files = []
+    for key, value in sample_data.items():
+        path = tmp_path / f'{key}.json'
+        path.write_text(json.dumps({key: value}))
+        files.append(open(path, 'rb'))
+
+    df = parse_instagram_files(files, ['liked_posts.json'])
+
+    assert list(df['file_name']) == ['liked_posts.json', 'liked_posts.json']
+
+def test_parse_instagram_files_no_selected_data():
+    with pytest.raises(ValueError, match="No relevant data found in the selected sections."):
+        parse_instagram_files(split_into_files(sample_data), ['posts_viewed.json'])
+    assert parse_instagram_files(split_into_files(sample_data), ['posts_viewed.json'], allow_empty=True).empty
+
+def test_flatten_instagram_data_skips_unselected_sections():
+    df = flatten_instagram_data(sample_data, ['videos_watched.json'])
+
+    assert df['title'].tolist() == ['video_account']
+    assert df['category'].tolist() == ['impressions_history_videos_watched']
+
+def test_parse_instagram_files_does_not_read_unselected_files():
+    unreadable = "data:application/json;base64," + base64.b64encode(b"not json").decode()
+    files = [unreadable] + split_into_files(sample_data)
+    names = ['posts_viewed.json', 'saved_posts.json', 'liked_posts.json', 'videos_watched.json']
+
+    df = parse_instagram_files(files, ['saved_posts.json'], filenames=names)
+
+    assert df['href'].tolist() == ['https://www.instagram.com/p/abc/']
+
+def test_parse_instagram_files_routes_renamed_files_by_key():
+    files = split_into_files(sample_data)
+
+    df = parse_instagram_files(files, ['liked_posts.json'], filenames=['a.json', 'b.json', 'c.json'])
+
+    assert df['file_name'].tolist() == ['liked_posts.json', 'liked_posts.json']
+
+# Bytes are read from a seekable stream, data URIs from one that is not
+@pytest.mark.parametrize('contents', [json.dumps(sample_data).encode(), encode_to_base64(sample_data)], ids=['bytes', 'data_uri'])
+def test_peeking_matches_json_load(contents, monkeypatch):
+    # A head that ends within the document
+    monkeypatch.setattr(insta_processing, 'PEEK_SIZE', 40)
+
+    assert parse_instagram_contents(contents) == parse_instagram_contents(contents, peek=False)
+
+def test_peeking_skips_files_of_unselected_sections():
+    # Invalid past the key, so reading the rest of the file would raise
+    contents = b'{"impressions_history_videos_watched": [' + b'x' * 100
+
+    assert parse_instagram_contents(contents, ['saved_posts.json']) == {}
+    with pytest.raises(ValueError):
+        parse_instagram_contents(contents, ['videos_watched.json'])
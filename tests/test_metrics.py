@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from src.components import callbacks
+from src.components import metrics
+from src.components.metrics import observe, increment, timed, count_bytes, render_metrics
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    monkeypatch.setattr(metrics, '_metrics_cache', None)
+    yield tmp_path
+    metrics._metrics_cache.close()
+
+def test_histogram_is_rendered_cumulatively(metrics_dir):
+    observe('data_mirroring_parsed_rows', 50, platform='tiktok')
+    observe('data_mirroring_parsed_rows', 5000, platform='tiktok')
+    observe('data_mirroring_parsed_rows', 10 ** 9, platform='tiktok')
+    lines = render_metrics().splitlines()
+
+    assert '# TYPE data_mirroring_parsed_rows histogram' in lines
+    assert 'data_mirroring_parsed_rows_bucket{platform="tiktok",le="10"} 0' in lines
+    assert 'data_mirroring_parsed_rows_bucket{platform="tiktok",le="100"} 1' in lines
+    assert 'data_mirroring_parsed_rows_bucket{platform="tiktok",le="10000"} 2' in lines
+    assert 'data_mirroring_parsed_rows_bucket{platform="tiktok",le="+Inf"} 3' in lines
+    assert 'data_mirroring_parsed_rows_sum{platform="tiktok"} 1000005050' in lines
+    assert 'data_mirroring_parsed_rows_count{platform="tiktok"} 3' in lines
+
+def test_counter_is_rendered(metrics_dir):
+    increment('data_mirroring_parse_cache_total', result='hit')
+    increment('data_mirroring_parse_cache_total', result='hit')
+    increment('data_mirroring_parse_cache_total', result='miss')
+    lines = render_metrics().splitlines()
+
+    assert '# TYPE data_mirroring_parse_cache_total counter' in lines
+    assert 'data_mirroring_parse_cache_total{result="hit"} 2' in lines
+    assert 'data_mirroring_parse_cache_total{result="miss"} 1' in lines
+
+def test_timed_records_failing_stages(metrics_dir):
+    with pytest.raises(ValueError):
+        with timed('parse', platform='youtube'):
+            raise ValueError("broken file")
+
+    assert 'data_mirroring_stage_duration_seconds_count{platform="youtube",stage="parse"} 1' in render_metrics()
+
+def test_count_bytes(metrics_dir):
+    assert list(count_bytes([b'abc', b'de'], 'download_csv')) == [b'abc', b'de']
+    assert 'data_mirroring_response_bytes_sum{route="download_csv"} 5' in render_metrics()
+
+def test_metrics_route(metrics_dir, monkeypatch):
+    import main
+    monkeypatch.setattr(main, 'METRICS_TOKEN', 'secret')
+    client = main.server.test_client()
+
+    assert client.get('/metrics', base_url='https://localhost').status_code == 403
+    response = client.get('/metrics', base_url='https://localhost', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert '# TYPE data_mirroring_stage_duration_seconds histogram' in response.data.decode('utf-8')
+
+def test_parse_upload_records_dataset_size_before_and_after_optimizing(metrics_dir, monkeypatch):
+    df = pd.DataFrame({'Date': pd.to_datetime(['2022-11-05'] * 100), 'Source': ['Browsing', 'Liked'] * 50})
+    monkeypatch.setattr(callbacks, 'parse_contents', lambda *args, **kwargs: df)
+
+    optimized = callbacks.parse_upload('tiktok', [b'{}'], ['user_data.json'])
+
+    lines = render_metrics().splitlines()
+    assert f'data_mirroring_dataset_bytes_sum{{dtypes="parsed",platform="tiktok"}} {df.memory_usage(deep=True).sum()}' in lines
+    assert f'data_mirroring_dataset_bytes_sum{{dtypes="optimized",platform="tiktok"}} {optimized.memory_usage(deep=True).sum()}' in lines
@@ -0,0 +1,47 @@
+import base64
+import io
+import pandas as pd
+import pytest
+from src.components import parse_cache
+from src.components.data.rollups import build_cube
+from src.components.parse_cache import parse_cache_key, get_cached_result, set_cached_result, parse_cache_stats
+
+data = b'{"Activity": {}}' * 1000
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_cache, 'PARSE_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(parse_cache, '_parse_cache', None)
+    yield tmp_path
+    parse_cache._parse_cache.close()
+
+def test_key_depends_on_decoded_bytes(monkeypatch):
+    monkeypatch.setattr(parse_cache, 'HASH_BLOCK_SIZE', 3 * 7)
+    data_uri = 'data:application/json;base64,' + base64.b64encode(data).decode('ascii')
+    f = io.BytesIO(data)
+
+    assert parse_cache_key('tiktok', [data_uri]) == parse_cache_key('tiktok', [data]) == parse_cache_key('tiktok', [f])
+    assert f.tell() == 0
+    assert parse_cache_key('tiktok', [data]) != parse_cache_key('youtube', [data])
+    assert parse_cache_key('tiktok', [data]) != parse_cache_key('tiktok', [data + b' '])
+
+def test_key_ignores_section_order():
+    assert parse_cache_key('instagram', [data], ['a', 'b']) == parse_cache_key('instagram', [data], ['b', 'a'])
+    assert parse_cache_key('instagram', [data], ['a']) != parse_cache_key('instagram', [data])
+
+def test_cached_result_round_trip(cache_dir, monkeypatch):
+    df = pd.DataFrame({'Link': ['https://www.tiktokv.com/share/video/1/']})
+    key = parse_cache_key('tiktok', [data])
+    lookups = []
+    monkeypatch.setattr(parse_cache, 'increment', lambda name, result: lookups.append(result))
+
+    cube = build_cube(pd.Series(pd.to_datetime(['2022-11-05'])), pd.Series(['Browsing']))
+
+    assert get_cached_result(key) is None
+    set_cached_result(key, df, cube)
+    cached_df, cached_cube = get_cached_result(key)
+
+    assert cached_df.equals(df)
+    assert cached_cube[3].tolist() == cube[3].tolist()
+    assert parse_cache_stats() == {'hits': 1, 'misses': 1}
+    assert lookups == ['miss', 'hit']
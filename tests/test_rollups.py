@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.components.data.rollups import (rollup, build_cube, cube_rollup, format_periods, stacked_bar_traces, top_bar_traces,
+                                         top_columns, client_aggregate)
+from src.components.data.tiktok_processing import create_video_history_graph, video_history_cube
+from src.components.data.youtube_processing import create_watch_history_graph
+
+dates = pd.Series(pd.to_datetime(['2022-01-05', '2022-01-20', '2022-03-01', None, '2023-07-14']))
+groups = pd.Series(['a', 'b', 'a', 'a', 'b'])
+
+def test_rollup_counts_per_month():
+    periods, labels, counts = rollup(dates, groups, freq='M')
+
+    assert format_periods(periods) == ['2022-01', '2022-03', '2023-07']
+    assert list(labels) == ['a', 'b']
+    assert counts.tolist() == [[1, 1], [1, 0], [0, 1]]
+
+def test_rollup_counts_per_year_of_categoricals():
+    periods, labels, counts = rollup(dates.dt.tz_localize('UTC'), groups.astype('category').where(groups != 'b'), freq='Y')
+
+    assert format_periods(periods) == [2022]
+    assert counts.tolist() == [[2, 0]]
+
+def test_rollup_empty():
+    periods, labels, counts = rollup(pd.Series(pd.to_datetime([None])), pd.Series(['a']))
+
+    assert len(periods) == 0
+    assert counts.shape == (0, 1)
+
+def test_stacked_bar_traces_order_and_skip_empty_groups():
+    traces = stacked_bar_traces(np.array(['2022-01'], dtype='datetime64[M]'), np.array(['Liked', 'Browsing', 'Favorite']),
+                                np.array([[1, 2, 0]]), order=['Browsing', 'Favorite', 'Liked'])
+
+    assert [trace.name for trace in traces] == ['Browsing', 'Liked']
+
+def test_top_bar_traces():
+    periods = np.array(['2022', '2023'], dtype='datetime64[Y]')
+    counts = np.array([[5, 1, 3], [0, 4, 2]])
+    traces = top_bar_traces(periods, np.array(['a', 'b', 'c']), counts, n=2)
+
+    assert [(trace.name, trace.x, trace.y) for trace in traces] == [
+        ('a', (2022,), (5,)), ('c', (2022, 2023), (3, 2)), ('b', (2023,), (4,))
+    ]
+
+def test_video_history_graph_with_missing_sources():
+    df = pd.DataFrame({'Date': pd.to_datetime(['2022-11-05', '2022-12-01']), 'Source': ['Browsing', 'Browsing']})
+    fig = create_video_history_graph(df)
+
+    assert [trace.name for trace in fig.data] == ['Browsing']
+    assert fig.data[0].x == ('2022-11', '2022-12')
+
+def test_watch_history_graph_leaves_df_untouched():
+    df = pd.DataFrame({'Date': pd.to_datetime(['2022-11-05', '2023-01-01'], utc=True),
+                       'Channel Name': ['Cat Channel', 'No Channel Name']})
+    fig = create_watch_history_graph(df)
+
+    assert [(trace.name, trace.x, trace.y) for trace in fig.data] == [('Cat Channel', (2022,), (1,))]
+    assert list(df.columns) == ['Date', 'Channel Name']
+
+def test_cube_rollup_weeks_and_quarters():
+    cube = build_cube(dates, groups)
+
+    weeks, _, week_counts = cube_rollup(cube, 'W')
+    quarters, _, quarter_counts = cube_rollup(cube, 'Q')
+
+    assert format_periods(weeks, 'W') == ['2022-01-03', '2022-01-17', '2022-02-28', '2023-07-10']
+    assert format_periods(quarters, 'Q') == ['2022-Q1', '2023-Q3']
+    assert quarter_counts.tolist() == [[2, 1], [0, 1]]
+    assert week_counts.sum() == 4
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+def test_top_columns_matches_stable_argsort(n):
+    counts = np.random.default_rng(0).integers(0, 4, (20, 6))
+
+    top = top_columns(counts, n)
+
+    assert [columns.tolist() for columns in top] == np.argsort(-counts, axis=1, kind='stable')[:, :n].tolist()
+
+def test_graphs_at_other_granularities():
+    df = pd.DataFrame({'Date': pd.to_datetime(['2022-11-05', '2022-12-01']), 'Source': ['Browsing', 'Liked']})
+    fig = create_video_history_graph(df, video_history_cube(df), freq='Q')
+
+    assert fig.layout.title.text == 'Watched Videos per Quarter'
+    assert [trace.x for trace in fig.data] == [('2022-Q4',), ('2022-Q4',)]
+
+GRANULARITY_REQUEST = {
+    'output': '..visualization-aggregate.data...period-range.max...period-range.value...period-range.marks..',
+    'outputs': [{'id': 'visualization-aggregate', 'property': 'data'},
+                {'id': 'period-range', 'property': 'max'},
+                {'id': 'period-range', 'property': 'value'},
+                {'id': 'period-range', 'property': 'marks'}],
+    'inputs': [{'id': 'granularity-selector', 'property': 'value', 'value': 'W'}],
+    'state': [{'id': 'visualization-platform', 'property': 'data', 'value': 'tiktok'}],
+    'changedPropIds': ['granularity-selector.value']
+}
+
+def test_granularity_selector_reaggregates():
+    from main import server
+    from src.components.dataset_store import configure_dataset_store
+
+    df = pd.DataFrame({'Date': pd.to_datetime(['2022-11-05', '2022-11-08']), 'Source': ['Browsing', 'Liked']})
+    configure_dataset_store(backend='memory').put('abc123', df)
+    client = server.test_client()
+    with client.session_transaction(base_url='https://localhost') as session:
+        session['authenticated'] = True
+        session['session_key'] = 'abc123'
+
+    response = client.post('/app/_dash-update-component', json=GRANULARITY_REQUEST, base_url='https://localhost')
+    result = response.get_json()['response']
+    aggregate = result['visualization-aggregate']['data']
+
+    assert aggregate['layout']['title']['text'] == 'Watched Videos per Week'
+    assert 'template' not in aggregate['layout']
+    assert (aggregate['x'], aggregate['labels'], aggregate['counts']) == (['2022-10-31', '2022-11-07'], ['Browsing', 'Liked'], [[1, 0], [0, 1]])
+    assert (result['period-range']['max'], result['period-range']['value']) == (1, [0, 1])
+
+def test_client_aggregate_keeps_the_top_entries_per_period():
+    periods = np.array(['2022', '2023'], dtype='datetime64[Y]')
+    counts = np.array([[5, 0, 3, 1], [0, 4, 2, 0]])
+    aggregate = client_aggregate(periods, np.array(['a', 'b', 'c', 'd']), counts, top_n=2)
+
+    assert aggregate['x'] == [2022, 2023]
+    assert aggregate['labels'] == ['a', 'b', 'c']
+    assert aggregate['top'] == [[[0, 5], [2, 3]], [[1, 4], [2, 2]]]
+    assert aggregate['totals'] == [9, 6]
+
+def test_top_bar_traces_are_packed_beyond_max_traces():
+    periods = np.array(['2022', '2023'], dtype='datetime64[Y]')
+    counts = np.array([[5, 1, 3], [0, 4, 2]])
+    traces = top_bar_traces(periods, np.array(['a', 'b', 'c']), counts, n=2, max_traces=2)
+
+    assert [(trace.name, trace.y.tolist()) for trace in traces] == [('Top 1', [5, 4]), ('Top 2', [3, 2]), ('Other', [1, 0])]
+    assert traces[0].customdata.tolist() == ['a', 'b']
+    assert traces[1].customdata.tolist() == ['c', 'c']
+
+def test_stacked_bar_traces_add_up_the_rest_as_other():
+    traces = stacked_bar_traces(np.array(['2022-01'], dtype='datetime64[M]'), np.array(['a', 'b', 'c']),
+                                np.array([[1, 5, 2]]), max_traces=2)
+
+    assert [(trace.name, trace.y.tolist()) for trace in traces] == [('b', [5]), ('Other', [3])]
+
+@pytest.mark.parametrize('freq,dtick', [('Y', 1), ('M', None), ('W', None)])
+def test_watch_history_graph_ticks_every_year_only(freq, dtick):
+    df = pd.DataFrame({'Date': pd.to_datetime(['2022-11-05', '2023-01-01']), 'Channel Name': ['Cat Channel', 'Dog Channel']})
+
+    assert create_watch_history_graph(df, freq=freq).layout.xaxis.dtick == dtick
+
+def test_watch_history_graph_keeps_quarters_in_time_order():
+    df = pd.DataFrame({'Date': pd.to_datetime(['2023-01-01', '2022-11-05', '2023-02-01']),
+                       'Channel Name': ['Dog Channel', 'Cat Channel', 'Dog Channel']})
+
+    xaxis = create_watch_history_graph(df, freq='Q').layout.xaxis
+    assert xaxis.categoryorder == 'array'
+    assert list(xaxis.categoryarray) == ['2022-Q4', '2023-Q1']
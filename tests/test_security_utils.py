@@ -0,0 +1,97 @@
+import pytest
+from dash import Dash
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+import base64
+import time
+from src.components import security_utils
+from src.components.security_utils import get_session_key, spool_upload
+
+@pytest.fixture
+def server():
+    server = Flask(__name__)
+    server.secret_key = 'test'
+    Dash(__name__, server=server)
+    return server
+
+def test_get_session_key_is_stable_within_a_session(server):
+    with server.test_request_context():
+        assert get_session_key() == get_session_key()
+
+def test_get_session_key_from_cookie_outside_request(server):
+    # Background callbacks only have the cookies of the request that started the job
+    cookie = SecureCookieSessionInterface().get_signing_serializer(server).dumps({'session_key': 'abc123'})
+    token = context_value.set(AttributeDict(cookies={server.config['SESSION_COOKIE_NAME']: cookie}))
+    try:
+        assert get_session_key() == 'abc123'
+    finally:
+        context_value.reset(token)
+
+def test_get_session_key_rejects_forged_cookie(server):
+    token = context_value.set(AttributeDict(cookies={server.config['SESSION_COOKIE_NAME']: 'forged'}))
+    try:
+        with pytest.raises(ValueError):
+            get_session_key()
+    finally:
+        context_value.reset(token)
+
+def test_get_session_key_rejects_expired_cookie(server, monkeypatch):
+    # Signed longer ago than the session lifetime
+    signed_at = time.time() - server.permanent_session_lifetime.total_seconds() - 60
+    with monkeypatch.context() as patch:
+        patch.setattr(time, 'time', lambda: signed_at)
+        cookie = SecureCookieSessionInterface().get_signing_serializer(server).dumps({'session_key': 'abc123'})
+    token = context_value.set(AttributeDict(cookies={server.config['SESSION_COOKIE_NAME']: cookie}))
+    try:
+        with pytest.raises(ValueError):
+            get_session_key()
+    finally:
+        context_value.reset(token)
+
+def to_data_uri(data):
+    return 'data:application/json;base64,' + base64.b64encode(data).decode('ascii')
+
+def test_spool_upload_keeps_small_files_in_memory():
+    data = b'{"watch-history": []}' * 10
+
+    with spool_upload(to_data_uri(data), 'watch-history.json') as buffer:
+        assert not buffer._rolled
+        assert buffer.read() == data
+
+def test_spool_upload_spills_large_files_to_disk(monkeypatch, tmp_path):
+    monkeypatch.setattr(security_utils, 'SPOOL_MAX_MEMORY', 100)
+    monkeypatch.setattr(security_utils, 'SPOOL_DIR', str(tmp_path))
+    data = b'x' * 1000
+
+    with spool_upload(to_data_uri(data), 'user_data.json') as buffer:
+        assert buffer._rolled
+        assert buffer.read() == data
+        # The spilled file has no name on disk, so other requests cannot see or overwrite it
+        assert list(tmp_path.iterdir()) == []
+
+def test_spool_upload_validates_files(monkeypatch):
+    monkeypatch.setattr(security_utils, 'MAX_FILE_SIZE', 10)
+
+    with pytest.raises(ValueError, match="File type not allowed"):
+        spool_upload(to_data_uri(b'{}'), 'user_data.exe')
+    with pytest.raises(ValueError, match="File is too large"):
+        spool_upload(to_data_uri(b'x' * 11), 'user_data.json')
+    spool_upload(to_data_uri(b'x' * 10), 'user_data.json').close()
+
+def test_upload_contents_are_never_opened_as_paths(tmp_path):
+    from src.components.callbacks import parse_contents
+    from src.components.data.tiktok_processing import parse_tiktok_contents
+    from src.components.data.upload_sources import open_upload_source
+    from src.components.parse_cache import parse_cache_key
+    path = tmp_path / 'watch-history.json'
+    path.write_text('[]')
+
+    for read in (lambda: parse_contents('youtube', [str(path)], filenames=['watch-history.json']),
+                 lambda: parse_contents('tiktok', [str(path)], filenames=['user_data.zip']),
+                 lambda: parse_tiktok_contents(str(path)),
+                 lambda: open_upload_source(str(path)),
+                 lambda: parse_cache_key('youtube', [str(path)])):
+        with pytest.raises(ValueError, match="must be a data URI"):
+            read()
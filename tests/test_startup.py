@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_setup_app_is_idempotent():
+    import main
+    callbacks = dict(main.app.callback_map)
+    main.setup_app()
+
+    assert main.app.callback_map == callbacks
+
+def test_importing_main_defers_the_parsing_stack():
+    # A fresh interpreter, the test session itself has long imported pandas
+    script = "import sys, main; print(sorted(m for m in ('pandas', 'numpy') if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True, capture_output=True, text=True)
+
+    assert result.stdout.strip() == '[]'
+
+def test_preload_imports_the_parsing_stack():
+    script = "import sys, gc, main; main.preload(); print('pandas' in sys.modules, gc.get_freeze_count() > 0)"
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True, capture_output=True, text=True)
+
+    assert result.stdout.strip() == 'True True'
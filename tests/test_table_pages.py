@@ -0,0 +1,53 @@
+import pandas as pd
+from src.components.data.table_pages import split_filter_part, query_rows, query_page
+
+df = pd.DataFrame({
+    'Date': pd.to_datetime(['2022-03-01', '2021-12-24', None, '2022-01-15', '2022-03-20']),
+    'Link': ['https://a/1', 'https://b/2', 'https://a/3', 'https://c/4', 'https://a/5'],
+    'Source': pd.Categorical(['Liked', 'Browsing', 'Browsing', 'Favorite', None])
+})
+
+def test_split_filter_part():
+    assert split_filter_part('{Date} ge 2022-01-01') == ('Date', 'ge', '2022-01-01')
+    assert split_filter_part('{Link} contains "a/"') == ('Link', 'contains', 'a/')
+    assert split_filter_part('{Count} > 3') == ('Count', 'gt', 3.0)
+    assert split_filter_part('{Link} contains 999') == ('Link', 'contains', '999')
+    assert split_filter_part('nonsense') == (None, None, None)
+
+def test_default_order_is_file_order():
+    assert list(query_rows(df)) == [0, 1, 2, 3, 4]
+
+def test_sort_keeps_missing_values_last():
+    assert list(query_rows(df, sort_by=[{'column_id': 'Date', 'direction': 'asc'}])) == [1, 3, 0, 4, 2]
+    assert list(query_rows(df, sort_by=[{'column_id': 'Date', 'direction': 'desc'}])) == [4, 0, 3, 1, 2]
+    assert list(query_rows(df, sort_by=[{'column_id': 'Source', 'direction': 'asc'}])) == [1, 2, 3, 0, 4]
+
+def test_date_range_filter():
+    assert list(query_rows(df, filter_query='{Date} ge 2022-01-01 && {Date} lt 2022-03-20')) == [3, 0]
+    assert list(query_rows(df, filter_query='{Date} datestartswith 2022-03')) == [0, 4]
+    assert list(query_rows(df, filter_query='{Date} lt 2022')) == [1]
+
+def test_filters_on_other_columns():
+    rows = query_rows(df, sort_by=[{'column_id': 'Date', 'direction': 'desc'}],
+                      filter_query='{Link} contains "A/" && {Source} ne Liked')
+
+    assert list(rows) == [4, 2]
+    assert list(query_rows(df, filter_query='{Source} eq Browsing')) == [1, 2]
+    assert list(query_rows(df, filter_query='{Link} ge 3')) == []
+
+def test_query_page_clamps_page_number():
+    page, page_count, page_current = query_page(df, page_current=5, page_size=2)
+
+    assert page_count == 3
+    assert page_current == 2
+    assert page['Link'].tolist() == ['https://a/5']
+
+def test_query_page_keeps_client_page_size_in_bounds():
+    assert query_page(df, page_size=0)[1] == 1
+    assert query_page(df, page_size=-3)[1] == 5
+    assert query_page(df, page_current=-1, page_size=10 ** 9)[0]['Link'].tolist() == df['Link'].tolist()
+
+def test_unknown_sort_and_filter_columns_are_ignored():
+    rows = query_rows(df, sort_by=[{'column_id': 'Nope', 'direction': 'desc'}], filter_query='{Nope} eq 1')
+
+    assert list(rows) == [0, 1, 2, 3, 4]
@@ -0,0 +1,74 @@
+import base64
+import io
+import json
+import pytest
+from src.components.data.tiktok_processing import parse_tiktok_contents, stream_tiktok_sections, flatten_tiktok_data
+
+# Sample TikTok JSON data, including sections the streaming parser must skip
+sample_data = {
+    "Profile": {"Profile Information": {"ProfileMap": {"userName": "someone"}}},
+    "Direct Messages": {"Chat History": {"ChatHistory": {"Chat with a friend:": [{"Date": "2022-01-01", "Content": "hi"}]}}},
+    "Activity": {
+        "Video Browsing History": {
+            "VideoList": [
+                {"Date": "2022-11-05 16:24:24", "Link": "https://www.tiktokv.com/share/video/7162314514329898246/"},
+                {"Date": "2022-11-06 10:00:00", "Link": "https://www.tiktokv.com/share/video/7162314514329898247/"}
+            ]
+        },
+        "Search History": {"SearchList": [{"Date": "2022-11-05 16:24:24", "SearchTerm": "cats"}]},
+        "Favorite Videos": {
+            "FavoriteVideoList": [
+                {"Date": "2022-03-06 09:12:26", "Link": "https://www.tiktokv.com/share/video/7068329151006051590/"}
+            ]
+        },
+        "Like List": {
+            "ItemFavoriteList": [
+                {"Date": "2022-03-06 09:11:03", "Link": "https://www.tiktokv.com/share/video/7068329151006051590/"}
+            ]
+        }
+    }
+}
+
+def encode_to_base64(data):
+    json_str = json.dumps(data)
+    return f"data:application/json;base64,{base64.b64encode(json_str.encode()).decode()}"
+
+def test_stream_tiktok_sections_only_keeps_activity_lists():
+    parsed = stream_tiktok_sections(io.BytesIO(json.dumps(sample_data).encode()))
+
+    assert list(parsed.keys()) == ['Activity']
+    assert set(parsed['Activity'].keys()) == {'Video Browsing History', 'Favorite Videos', 'Like List'}
+    assert parsed['Activity']['Video Browsing History']['VideoList'] == sample_data['Activity']['Video Browsing History']['VideoList']
+
+def test_streaming_matches_full_parse():
+    encoded = encode_to_base64(sample_data)
+    sections = ['video_history', 'favorite_video', 'item_favorite']
+
+    streamed = flatten_tiktok_data(parse_tiktok_contents(encoded), sections)
+    loaded = flatten_tiktok_data(parse_tiktok_contents(encoded, streaming=False), sections)
+
+    assert streamed.equals(loaded)
+    assert len(streamed) == 4
+
+def test_streaming_legacy_section_names():
+    legacy_data = {
+        "Activity": {
+            "Favorite": {"FavoriteVideoList": [{"Date": "2021-01-01 00:00:00", "Link": "https://www.tiktokv.com/share/video/1/"}]},
+            "Liked": {"ItemFavoriteList": [{"Date": "2021-01-02 00:00:00", "Link": "https://www.tiktokv.com/share/video/2/"}]}
+        }
+    }
+    df = flatten_tiktok_data(parse_tiktok_contents(encode_to_base64(legacy_data)), ['favorite_video', 'item_favorite'])
+
+    assert list(df['Source']) == ['Favorite', 'Liked']
+
+def test_streaming_accepts_file_objects():
+    fileobj = io.BytesIO(json.dumps(sample_data).encode())
+    parsed = parse_tiktok_contents(fileobj)
+
+    assert len(parsed['Activity']['Like List']['ItemFavoriteList']) == 1
+
+def test_streaming_no_relevant_sections():
+    parsed = parse_tiktok_contents(encode_to_base64({"Activity": {"VideoList": None}}))
+
+    with pytest.raises(ValueError, match="No relevant data found in the selected sections."):
+        flatten_tiktok_data(parsed, ['video_history', 'favorite_video', 'item_favorite'])
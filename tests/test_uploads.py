@@ -0,0 +1,81 @@
+import io
+import json
+import pytest
+from src.components import uploads
+from src.components.uploads import create_upload, append_upload_chunk, save_upload, open_upload, discard_upload
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, 'UPLOAD_DIR', str(tmp_path))
+    return tmp_path
+
+payload = json.dumps({"watch-history": [{"title": "Watched a video", "time": "2023-01-01T00:00:00Z"}]}).encode()
+
+def test_chunked_upload_roundtrip():
+    handle = create_upload('youtube', 'watch-history.json', len(payload), 'owner')
+
+    size, complete = append_upload_chunk(handle, 'owner', io.BytesIO(payload[:10]), 0)
+    assert (size, complete) == (10, False)
+    size, complete = append_upload_chunk(handle, 'owner', io.BytesIO(payload[10:]), 10)
+    assert (size, complete) == (len(payload), True)
+
+    meta, f = open_upload(handle, 'owner')
+    with f:
+        assert f.read() == payload
+    assert meta['filename'] == 'watch-history.json'
+
+def test_chunk_offset_must_match():
+    handle = create_upload('youtube', 'watch-history.json', len(payload), 'owner')
+
+    with pytest.raises(ValueError, match="Unexpected chunk offset"):
+        append_upload_chunk(handle, 'owner', io.BytesIO(payload), 5)
+
+def test_chunk_larger_than_announced_is_discarded(upload_dir):
+    handle = create_upload('youtube', 'watch-history.json', 4, 'owner')
+
+    with pytest.raises(ValueError, match="File is too large"):
+        append_upload_chunk(handle, 'owner', io.BytesIO(payload), 0)
+    assert list(upload_dir.iterdir()) == []
+
+def test_upload_is_bound_to_owner():
+    handle = save_upload('tiktok', 'user_data.json', io.BytesIO(payload), 'owner')
+
+    with pytest.raises(ValueError, match="Unknown upload handle"):
+        open_upload(handle, 'someone-else')
+
+def test_incomplete_upload_cannot_be_opened():
+    handle = create_upload('youtube', 'watch-history.json', len(payload), 'owner')
+    append_upload_chunk(handle, 'owner', io.BytesIO(payload[:10]), 0)
+
+    with pytest.raises(ValueError, match="Upload is incomplete"):
+        open_upload(handle, 'owner')
+
+def test_rejects_invalid_handles_and_types():
+    with pytest.raises(ValueError, match="Invalid upload handle"):
+        discard_upload('../../etc/passwd')
+    with pytest.raises(ValueError, match="File type not allowed"):
+        create_upload('youtube', 'watch-history.exe', 10, 'owner')
+    with pytest.raises(ValueError, match="Unsupported platform"):
+        create_upload('myspace', 'data.json', 10, 'owner')
+
+def test_upload_route_accepts_chunks():
+    from main import server
+
+    client = server.test_client()
+    with client.session_transaction(base_url='https://localhost') as session:
+        session['authenticated'] = True
+
+    headers = {'X-Upload-Offset': '0', 'X-Upload-Length': str(len(payload)), 'X-File-Name': 'watch-history.json'}
+    response = client.post('/upload/youtube', data=payload, headers=headers,
+                           content_type='application/octet-stream', base_url='https://localhost')
+
+    assert response.status_code == 200
+    assert response.json['complete'] is True
+    assert response.json['size'] == len(payload)
+
+def test_upload_route_requires_login():
+    from main import server
+
+    response = server.test_client().post('/upload/youtube', data=payload, base_url='https://localhost')
+
+    assert response.status_code == 403
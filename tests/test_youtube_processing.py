@@ -0,0 +1,40 @@
+import base64
+import json
+import pandas as pd
+import pytest
+from src.components.data.youtube_processing import parse_youtube_contents
+
+sample_data = [
+    {
+        "title": "Watched Cats compilation",
+        "titleUrl": "https://www.youtube.com/watch?v=abcdefghijk",
+        "time": "2023-02-01T12:30:00.123Z",
+        "subtitles": [{"name": "Cat Channel", "url": "https://www.youtube.com/channel/UC123"}]
+    },
+    {
+        "title": "Watched a removed video",
+        "time": "2021-07-14T08:00:00Z"
+    }
+]
+
+def encode_to_base64(data):
+    json_str = json.dumps(data)
+    return f"data:application/json;base64,{base64.b64encode(json_str.encode()).decode()}"
+
+def test_parse_youtube_contents():
+    df = parse_youtube_contents(encode_to_base64(sample_data))
+
+    assert list(df.columns) == ['Title', 'Link', 'Date', 'Channel Name', 'Channel URL']
+    assert len(df) == 2
+    assert df['Date'].iloc[0] == pd.Timestamp('2023-02-01T12:30:00.123Z')
+    assert df['Channel Name'].iloc[1] == 'No Channel Name'
+    assert df['Link'].iloc[1] == 'No URL'
+
+def test_parse_youtube_contents_missing_time():
+    df = parse_youtube_contents(encode_to_base64({"watch-history": [{"title": "Watched something"}]}))
+
+    assert pd.isna(df['Date'].iloc[0])
+
+def test_parse_youtube_contents_no_data():
+    with pytest.raises(ValueError, match="No relevant data found in the selected sections."):
+        parse_youtube_contents(encode_to_base64([]))